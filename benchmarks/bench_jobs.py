@@ -0,0 +1,61 @@
+"""benchmark scaling of `search_files` with the number of worker processes
+
+usage:
+	python benchmarks/bench_jobs.py [searchDir] [max_jobs] [repeats]
+
+scans `searchDir` (defaults to `.`) with the default `read` config, once for each
+`jobs` value from 1 to `max_jobs` (defaults to `os.cpu_count()`), and prints the
+best wall time of `repeats` runs along with the speedup relative to `jobs=1`.
+also checks that every run returns exactly the same items as the serial path.
+"""
+
+import os
+import sys
+import time
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from inline_todo.inline_todo import CONFIG_DEFAULT, get_valid_files, search_files
+
+
+def items_signature(td_items : list) -> List[Tuple[str,str,int,str]]:
+	return [ (x.tag, x.file, x.lineNum, x.content) for x in td_items ]
+
+
+def main(argv : List[str]) -> None:
+	searchdir : str = argv[1] if len(argv) > 1 else '.'
+	max_jobs : int = int(argv[2]) if len(argv) > 2 else (os.cpu_count() or 1)
+	repeats : int = int(argv[3]) if len(argv) > 3 else 3
+
+	cfg_read = CONFIG_DEFAULT['read']
+	filenames : List[str] = get_valid_files(
+		searchdir = searchdir,
+		file_types = cfg_read['SOURCE_FILES'],
+		exclude = set(cfg_read['EXCLUDE']),
+	)
+	print(f'# {len(filenames)} files in {searchdir}')
+
+	reference : Optional[list] = None
+	time_serial : Optional[float] = None
+
+	print(f'{"jobs":>6}  {"time (s)":>10}  {"speedup":>8}  {"items":>8}')
+	for jobs in range(1, max_jobs + 1):
+		best : float = float('inf')
+		for _ in range(repeats):
+			t0 : float = time.perf_counter()
+			td_items = search_files(filenames, cfg_read, jobs = jobs)
+			best = min(best, time.perf_counter() - t0)
+
+		sig = items_signature(td_items)
+		if reference is None:
+			reference = sig
+			time_serial = best
+		elif sig != reference:
+			raise AssertionError(f'output with jobs={jobs} differs from serial output')
+
+		print(f'{jobs:>6}  {best:>10.3f}  {time_serial / best:>7.2f}x  {len(td_items):>8}')
+
+
+if __name__ == '__main__':
+	main(sys.argv)
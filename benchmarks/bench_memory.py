@@ -0,0 +1,83 @@
+"""benchmark memory used per `TodoItem`
+
+usage:
+	python benchmarks/bench_memory.py [num_items] [num_files]
+
+builds `num_items` (defaults to 200000) items spread over `num_files` (defaults to 2000)
+files, and reports the bytes allocated per item, as measured by `tracemalloc`, for:
+ - `LegacyTodoItem`: the previous layout -- a plain object with a `__dict__`, the raw
+   line, and `content` cached in the instance dict
+ - `TodoItem`: the current `__slots__` layout with interned tag and file strings
+
+file paths and tags are built as fresh string objects for every item, which is what
+happens when items are unpickled from worker processes.
+"""
+
+import os
+import sys
+import tracemalloc
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from inline_todo.inline_todo import TodoItem
+
+
+class LegacyTodoItem(object):
+	"""copy of the old `TodoItem` storage layout, for comparison"""
+
+	def __init__(self, tag : str, file : str, lineNum : int, line : str, context : Optional[str] = None) -> None:
+		self.tag : str = tag
+		self.file : str = file
+		self.lineNum : int = lineNum
+		self.line : str = line
+		self.context : str = line if context is None else context
+		# what accessing the old `cached_property` left behind
+		self.__dict__['content'] = TodoItem.extract_content(line, tag)
+
+
+def gen_args(num_items : int, num_files : int) -> Iterator[Tuple[str,str,int,str]]:
+	tags : List[str] = ['TODO', 'FIXME', 'HACK', 'NOTE', 'BUG']
+	for i in range(num_items):
+		# `''.join` makes new string objects, like unpickling does
+		tag : str = ''.join(tags[i % len(tags)])
+		file : str = ''.join(['./src/module_', str(i % num_files), '/source_file.py'])
+		line : str = f'    # {tag}: fix the thing in function number {i} before release\n'
+		yield tag, file, i + 1, line
+
+
+def measure(factory : Callable[[str,str,int,str], Any], num_items : int, num_files : int) -> float:
+	"""bytes allocated per item which are still alive after building all items"""
+	tracemalloc.start()
+	args : List[Tuple[str,str,int,str]] = list(gen_args(num_items, num_files))
+	items : List[Any] = [ factory(*a) for a in args ]
+	# drop the inputs, only what the items keep alive should count
+	del args
+	size : int = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	# list of pointers to items is the same for both, dont count it
+	size -= sys.getsizeof(items)
+	return size / num_items
+
+
+def main(argv : List[str]) -> None:
+	num_items : int = int(argv[1]) if len(argv) > 1 else 200000
+	num_files : int = int(argv[2]) if len(argv) > 2 else 2000
+
+	print(f'# {num_items} items in {num_files} files')
+	bytes_legacy : float = measure(
+		lambda tag, file, lineNum, line: LegacyTodoItem(tag, file, lineNum, line),
+		num_items, num_files,
+	)
+	bytes_slots : float = measure(
+		lambda tag, file, lineNum, line: TodoItem(tag, file, lineNum, line, context_lines = 5),
+		num_items, num_files,
+	)
+	print(f'{"layout":>16}  {"bytes/item":>10}')
+	print(f'{"LegacyTodoItem":>16}  {bytes_legacy:>10.1f}')
+	print(f'{"TodoItem":>16}  {bytes_slots:>10.1f}')
+	print(f'# reduction: {100 * (1 - bytes_slots / bytes_legacy):.1f}%')
+
+
+if __name__ == '__main__':
+	main(sys.argv)
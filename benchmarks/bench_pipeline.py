@@ -0,0 +1,216 @@
+"""time each stage of the inline_todo pipeline on a synthetic (or existing) source tree
+
+usage:
+	python benchmarks/bench_pipeline.py [options]
+	python benchmarks/bench_pipeline.py --output new.json --compare old.json --threshold 0.1
+
+stages timed:
+ - `get_valid_files` : file discovery
+ - `search_files` : scanning files for tags
+ - `write_items_ms_template` : sorting and rendering
+ - `file_write` : writing the rendered output to disk
+
+for each stage, reports the best wall time over `--repeat` runs, throughput in files/s,
+lines/s and items/s, and peak memory allocated by python during the stage (measured in a
+separate run with `tracemalloc`, so it doesnt distort the timings -- memory of worker
+processes is not included).
+
+results can be saved as JSON with `--output`, and compared against a previous result with
+`--compare`. if any stage is slower than in the previous result by more than `--threshold`
+(a fraction), the regressions are printed and the exit code is 1.
+
+run with `--help` for the full list of options.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import platform
+import tempfile
+import tracemalloc
+import argparse
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from inline_todo.inline_todo import (
+	CONFIG_DEFAULT,
+	get_valid_files,
+	search_files,
+	write_items_ms_template,
+)
+from gen_synthetic import generate_tree, add_tree_args, tree_kwargs
+
+
+STAGES : List[str] = ['get_valid_files', 'search_files', 'write_items_ms_template', 'file_write']
+
+
+def run_pipeline(
+		searchdir : str,
+		cfg : Dict[str,Any],
+		out_path : str,
+		track_memory : bool = False,
+	) -> Tuple[Dict[str, Dict[str,float]], Dict[str,int]]:
+	"""run every stage once, returning per-stage time (and peak memory if `track_memory`), and counts of files and items"""
+
+	results : Dict[str, Dict[str,float]] = dict()
+
+	def stage(name : str, func : Callable[[], Any]) -> Any:
+		if track_memory:
+			tracemalloc.start()
+		t0 : float = time.perf_counter()
+		output : Any = func()
+		results[name] = { 'time_s' : time.perf_counter() - t0 }
+		if track_memory:
+			results[name]['peak_mem_bytes'] = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+		return output
+
+	def write_file(data : str) -> None:
+		with open(out_path, 'w', encoding = 'utf-8') as fout:
+			fout.write(data)
+
+	filenames : List[str] = stage('get_valid_files', lambda: get_valid_files(
+		searchdir = searchdir,
+		file_types = cfg['read']['SOURCE_FILES'],
+		exclude = set(cfg['read']['EXCLUDE']),
+	))
+	td_items : list = stage('search_files', lambda: search_files(
+		files_search = filenames,
+		cfg_read = cfg['read'],
+		jobs = cfg['config']['jobs'],
+	))
+	rendered : str = stage('write_items_ms_template', lambda: write_items_ms_template(
+		td_items = td_items,
+		item_format = cfg['write']['item_format'],
+		attr_sort_order = cfg['write']['attr_sort_order'],
+		tag_order = cfg['read']['tags']['list'],
+	))
+	stage('file_write', lambda: write_file(rendered))
+
+	return results, { 'files' : len(filenames), 'items' : len(td_items) }
+
+
+def count_lines(filenames : List[str]) -> int:
+	total : int = 0
+	for file in filenames:
+		with open(file, 'rb') as f:
+			total += sum(1 for _ in f)
+	return total
+
+
+def compare_results(
+		new : Dict[str,Any],
+		old : Dict[str,Any],
+		threshold : float,
+	) -> List[str]:
+	"""compare stage times of `new` against `old`, print a table, return the names of stages which regressed by more than `threshold`"""
+	regressions : List[str] = list()
+	print(f'\n{"stage":>24}  {"old (s)":>10}  {"new (s)":>10}  {"ratio":>7}')
+	for name in STAGES:
+		if name not in new['stages'] or name not in old['stages']:
+			continue
+		t_old : float = old['stages'][name]['time_s']
+		t_new : float = new['stages'][name]['time_s']
+		ratio : float = t_new / t_old if t_old > 0 else float('inf')
+		flag : str = ''
+		if ratio > 1 + threshold:
+			regressions.append(name)
+			flag = '  REGRESSION'
+		print(f'{name:>24}  {t_old:>10.4f}  {t_new:>10.4f}  {ratio:>6.2f}x{flag}')
+	return regressions
+
+
+def main(argv : List[str]) -> int:
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--tree', type = str, default = None, help = 'existing directory to benchmark on, instead of generating one')
+	add_tree_args(parser)
+	parser.add_argument('--jobs', type = int, default = 1, help = 'worker processes for scanning')
+	parser.add_argument('--engine', type = str, default = 'lines', help = "scanning engine, 'lines' or 'mmap'")
+	parser.add_argument('--comments', type = str, default = 'language', help = "where to look for tags, 'language' or 'prefix'")
+	parser.add_argument('--item-format', type = str, default = 'md_det', help = 'item format to render')
+	parser.add_argument('--repeat', type = int, default = 3, help = 'runs per stage, the best time is kept')
+	parser.add_argument('--no-memory', action = 'store_true', help = 'skip the peak memory run')
+	parser.add_argument('--output', type = str, default = None, help = 'write results to this JSON file')
+	parser.add_argument('--compare', type = str, default = None, help = 'previous results JSON file to compare against')
+	parser.add_argument('--threshold', type = float, default = 0.1, help = 'allowed slowdown per stage, as a fraction')
+	args : argparse.Namespace = parser.parse_args(argv[1:])
+
+	cfg : Dict[str,Any] = copy.deepcopy(CONFIG_DEFAULT)
+	cfg['config']['jobs'] = args.jobs
+	cfg['read']['engine'] = args.engine
+	cfg['read']['comments'] = args.comments
+	cfg['write']['item_format'] = args.item_format
+
+	with tempfile.TemporaryDirectory(prefix = 'itodo-bench-') as tmpdir:
+		searchdir : str
+		if args.tree is None:
+			searchdir = os.path.join(tmpdir, 'tree')
+			print(f'# generating tree in {searchdir}', file = sys.stderr)
+			generate_tree(searchdir, **tree_kwargs(args))
+		else:
+			searchdir = args.tree
+
+		out_path : str = os.path.join(tmpdir, 'todo-inline.md')
+
+		# timing runs, keep the best of each stage
+		stages : Dict[str, Dict[str,float]] = dict()
+		counts : Dict[str,int] = dict()
+		for _ in range(args.repeat):
+			results, counts = run_pipeline(searchdir, cfg, out_path)
+			for name,res in results.items():
+				if name not in stages or res['time_s'] < stages[name]['time_s']:
+					stages[name] = res
+
+		if not args.no_memory:
+			results_mem, _ = run_pipeline(searchdir, cfg, out_path, track_memory = True)
+			for name,res in results_mem.items():
+				stages[name]['peak_mem_bytes'] = res['peak_mem_bytes']
+
+		counts['lines'] = count_lines(get_valid_files(
+			searchdir = searchdir,
+			file_types = cfg['read']['SOURCE_FILES'],
+			exclude = set(cfg['read']['EXCLUDE']),
+		))
+
+	for res in stages.values():
+		for unit in ('files', 'lines', 'items'):
+			res[f'{unit}_per_s'] = counts[unit] / res['time_s'] if res['time_s'] > 0 else float('inf')
+
+	output : Dict[str,Any] = {
+		'params' : { k : v for k,v in vars(args).items() if k not in ('output', 'compare', 'threshold') },
+		'env' : {
+			'python' : platform.python_version(),
+			'platform' : platform.platform(),
+			'cpu_count' : os.cpu_count(),
+		},
+		'counts' : counts,
+		'stages' : stages,
+	}
+
+	print(f'# {counts["files"]} files, {counts["lines"]} lines, {counts["items"]} items')
+	print(f'{"stage":>24}  {"time (s)":>10}  {"files/s":>10}  {"lines/s":>12}  {"items/s":>10}  {"peak MB":>8}')
+	for name in STAGES:
+		res = stages[name]
+		peak : str = f'{res["peak_mem_bytes"] / 2**20:>8.1f}' if 'peak_mem_bytes' in res else f'{"-":>8}'
+		print(f'{name:>24}  {res["time_s"]:>10.4f}  {res["files_per_s"]:>10.0f}  {res["lines_per_s"]:>12.0f}  {res["items_per_s"]:>10.0f}  {peak}')
+
+	if args.output is not None:
+		with open(args.output, 'w', encoding = 'utf-8') as fout:
+			json.dump(output, fout, indent = '\t')
+
+	if args.compare is not None:
+		with open(args.compare, 'r', encoding = 'utf-8') as fin:
+			old : Dict[str,Any] = json.load(fin)
+		regressions : List[str] = compare_results(output, old, args.threshold)
+		if regressions:
+			print(f'\nregressions over {args.threshold:.0%} in: {", ".join(regressions)}')
+			return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
@@ -0,0 +1,133 @@
+"""benchmark threaded read-ahead (`read.prefetch`) against reading each file when it is scanned, on simulated slow storage
+
+usage:
+	python benchmarks/bench_prefetch.py [options]
+	python benchmarks/bench_prefetch.py --delay-ms 5 --threads 1,4,16 --prefetch-depth 32
+
+every file read goes through a reader which sleeps for `--delay-ms` first, like a network
+filesystem with that much latency per file. for each thread count, files are scanned in a
+single process:
+ - `serial` : read a file, then scan it, then the next one
+ - `prefetch` : `iter_prefetch()` reads up to `--prefetch-depth` files ahead on a thread pool, while
+   the main thread scans
+
+reports the best wall time over `--repeat` runs, next to the total simulated I/O time and the
+time spent scanning files which are already in memory. with enough threads, `prefetch`
+should approach the larger of the two, rather than their sum.
+
+run with `--help` for the full list of options.
+"""
+
+import os
+import sys
+import copy
+import time
+import tempfile
+import argparse
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from inline_todo.inline_todo import (
+	CONFIG_DEFAULT,
+	ReadSettings,
+	TagMatcher,
+	get_valid_files,
+	iter_prefetch,
+	read_file_bytes,
+	scrape_items,
+)
+from gen_synthetic import generate_tree, add_tree_args, tree_kwargs
+
+
+def delayed_reader(delay_s : float) -> Callable[[str], bytes]:
+	"""a reader which sleeps for `delay_s` before reading each file"""
+	def reader(filename : str) -> bytes:
+		time.sleep(delay_s)
+		return read_file_bytes(filename)
+	return reader
+
+
+def scan_serial(files : List[str], cfg_read : ReadSettings, matcher : TagMatcher, reader : Callable[[str], bytes]) -> int:
+	return sum(
+		len(scrape_items(file, cfg_read, matcher, data = reader(file)))
+		for file in files
+	)
+
+
+def scan_prefetch(files : List[str], cfg_read : ReadSettings, matcher : TagMatcher, reader : Callable[[str], bytes], threads : int, depth : int) -> int:
+	return sum(
+		len(scrape_items(file, cfg_read, matcher, data = data))
+		for file,data in iter_prefetch(files, threads, depth, reader)
+	)
+
+
+def best_time(func : Callable[[], int], repeat : int) -> Tuple[float, int]:
+	"""best wall time of `repeat` calls of `func`, and its output"""
+	best : float = float('inf')
+	output : int = 0
+	for _ in range(repeat):
+		t0 : float = time.perf_counter()
+		output = func()
+		best = min(best, time.perf_counter() - t0)
+	return best, output
+
+
+def main(argv : List[str]) -> int:
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--tree', type = str, default = None, help = 'existing directory to benchmark on, instead of generating one')
+	add_tree_args(parser)
+	parser.add_argument('--delay-ms', type = float, default = 2.0, help = 'simulated latency of reading each file, in ms')
+	parser.add_argument('--threads', type = str, default = '1,4,16', help = 'comma separated thread counts to try')
+	parser.add_argument('--prefetch-depth', type = int, default = 32, help = 'maximum files read ahead')
+	parser.add_argument('--engine', type = str, default = 'lines', help = "scanning engine, 'lines' or 'mmap'")
+	parser.add_argument('--repeat', type = int, default = 3, help = 'runs of each measurement, the best time is kept')
+	args : argparse.Namespace = parser.parse_args(argv[1:])
+
+	cfg : Dict[str,Any] = copy.deepcopy(CONFIG_DEFAULT)
+	cfg['read']['engine'] = args.engine
+	cfg_read : ReadSettings = ReadSettings.from_dict(cfg['read'])
+	matcher : TagMatcher = TagMatcher.from_config(cfg_read)
+	reader : Callable[[str], bytes] = delayed_reader(args.delay_ms / 1000)
+
+	with tempfile.TemporaryDirectory(prefix = 'itodo-bench-') as tmpdir:
+		searchdir : str
+		if args.tree is None:
+			searchdir = os.path.join(tmpdir, 'tree')
+			print(f'# generating tree in {searchdir}', file = sys.stderr)
+			generate_tree(searchdir, **tree_kwargs(args))
+		else:
+			searchdir = args.tree
+
+		files : List[str] = get_valid_files(
+			searchdir = searchdir,
+			file_types = cfg_read.source_files,
+			exclude = cfg_read.exclude,
+		)
+
+		# scanning alone, with everything already in memory
+		contents : Dict[str,bytes] = { file : read_file_bytes(file) for file in files }
+		t_cpu, num_items = best_time(lambda: scan_serial(files, cfg_read, matcher, contents.__getitem__), args.repeat)
+		t_io : float = len(files) * args.delay_ms / 1000
+
+		print(f'# {len(files)} files, {num_items} items, {args.delay_ms}ms per read')
+		print(f'# simulated I/O: {t_io:.3f}s, scanning: {t_cpu:.3f}s, ideal overlap: {max(t_io, t_cpu):.3f}s')
+		print(f'{"mode":>10}  {"threads":>7}  {"time (s)":>10}  {"speedup":>8}')
+
+		t_serial, items_serial = best_time(lambda: scan_serial(files, cfg_read, matcher, reader), args.repeat)
+		assert items_serial == num_items
+		print(f'{"serial":>10}  {"-":>7}  {t_serial:>10.3f}  {1.0:>7.2f}x')
+
+		for threads in [ int(x) for x in args.threads.split(',') ]:
+			t_prefetch, items_prefetch = best_time(
+				lambda: scan_prefetch(files, cfg_read, matcher, reader, threads, args.prefetch_depth),
+				args.repeat,
+			)
+			assert items_prefetch == num_items
+			print(f'{"prefetch":>10}  {threads:>7}  {t_prefetch:>10.3f}  {t_serial / t_prefetch:>7.2f}x')
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
@@ -0,0 +1,134 @@
+"""check the startup cost of inline_todo against a budget
+
+usage:
+	python benchmarks/bench_startup.py [options]
+
+measures, in fresh interpreters:
+ - cumulative import time of `inline_todo.inline_todo`, as reported by `python -X importtime`
+ - wall time of `python -m inline_todo.run --help`
+
+and checks that importing the module (and printing help) does not pull in any of the
+modules which are meant to be imported lazily, like `omegaconf`, `yaml` and `chevron`.
+
+the best of `--repeat` runs is compared against `--budget-ms`. if the budget is exceeded
+or a lazy module was imported, the problems are printed and the exit code is 1, so this
+can be run as a check in CI or a pre-commit hook.
+
+run with `--help` for the full list of options.
+"""
+
+import os
+import sys
+import time
+import subprocess
+import argparse
+from typing import *
+
+ROOT : str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# modules which only some code paths need, and should not be imported at startup
+LAZY_MODULES : List[str] = [
+	'omegaconf',
+	'yaml',
+	'chevron',
+	'hashlib',
+	'ctypes',
+	'subprocess',
+	'concurrent.futures',
+]
+
+
+def run_python(args : List[str]) -> subprocess.CompletedProcess:
+	return subprocess.run(
+		[sys.executable, *args],
+		cwd = ROOT,
+		env = { **os.environ, 'PYTHONPATH' : ROOT },
+		stdout = subprocess.PIPE,
+		stderr = subprocess.PIPE,
+		check = True,
+	)
+
+
+def parse_importtime(stderr : str) -> Dict[str,int]:
+	"""cumulative import time in microseconds of each module, from `-X importtime` output"""
+	output : Dict[str,int] = dict()
+	for line in stderr.splitlines():
+		if not line.startswith('import time:'):
+			continue
+		fields : List[str] = line[len('import time:'):].split('|')
+		try:
+			output[fields[2].strip()] = int(fields[1])
+		except (IndexError, ValueError):
+			# header line
+			continue
+	return output
+
+
+def measure_import(module : str) -> Tuple[float, Set[str]]:
+	"""import time of `module` in ms, and the names of all modules imported along with it"""
+	times : Dict[str,int] = parse_importtime(
+		run_python(['-X', 'importtime', '-c', f'import {module}']).stderr.decode('utf-8')
+	)
+	return times[module] / 1000, set(times)
+
+
+def measure_help() -> Tuple[float, Set[str]]:
+	"""wall time of printing help in ms, and the names of all modules imported"""
+	t0 : float = time.perf_counter()
+	result : subprocess.CompletedProcess = run_python(['-X', 'importtime', '-m', 'inline_todo.run', '--help'])
+	elapsed : float = (time.perf_counter() - t0) * 1000
+	return elapsed, set(parse_importtime(result.stderr.decode('utf-8')))
+
+
+def lazy_modules_loaded(modules : Set[str]) -> List[str]:
+	return sorted(
+		m
+		for m in LAZY_MODULES
+		if m in modules
+	)
+
+
+def main(argv : List[str]) -> int:
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--repeat', type = int, default = 5, help = 'runs of each measurement, the best time is kept')
+	parser.add_argument('--budget-ms', type = float, default = 40.0, help = 'allowed import time of the module, in ms')
+	parser.add_argument('--help-budget-ms', type = float, default = 150.0, help = 'allowed wall time of `--help`, including interpreter startup, in ms')
+	args : argparse.Namespace = parser.parse_args(argv[1:])
+
+	# first run compiles and caches the bytecode, dont count it
+	run_python(['-c', 'import inline_todo.inline_todo'])
+
+	import_ms : float = float('inf')
+	help_ms : float = float('inf')
+	problems : List[str] = list()
+	for _ in range(args.repeat):
+		t_import, modules_import = measure_import('inline_todo.inline_todo')
+		t_help, modules_help = measure_help()
+		import_ms = min(import_ms, t_import)
+		help_ms = min(help_ms, t_help)
+
+	for name,modules in (('import', modules_import), ('--help', modules_help)):
+		loaded : List[str] = lazy_modules_loaded(modules)
+		if loaded:
+			problems.append(f'{name} loaded modules which should be lazy: {", ".join(loaded)}')
+
+	print(f'{"measurement":>14}  {"best (ms)":>10}  {"budget (ms)":>12}')
+	print(f'{"import":>14}  {import_ms:>10.1f}  {args.budget_ms:>12.1f}')
+	print(f'{"--help":>14}  {help_ms:>10.1f}  {args.help_budget_ms:>12.1f}')
+
+	if import_ms > args.budget_ms:
+		problems.append(f'import took {import_ms:.1f}ms, over the budget of {args.budget_ms:.1f}ms')
+	if help_ms > args.help_budget_ms:
+		problems.append(f'--help took {help_ms:.1f}ms, over the budget of {args.help_budget_ms:.1f}ms')
+
+	if problems:
+		print()
+		for p in problems:
+			print(p)
+		return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
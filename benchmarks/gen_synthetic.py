@@ -0,0 +1,166 @@
+"""generate a synthetic source tree for benchmarking
+
+usage:
+	python benchmarks/gen_synthetic.py <output_dir> [options]
+
+run with `--help` for the list of options. the tree is fully determined by the options
+(including `--seed`), so the same options always give the same files.
+"""
+
+import os
+import sys
+import random
+import argparse
+from typing import *
+
+
+# comment prefix to use for each extension
+COMMENT_PREFIX : Dict[str,str] = {
+	'py' : '#',
+	'sh' : '#',
+	'c' : '//',
+	'h' : '//',
+	'cpp' : '//',
+	'hpp' : '//',
+	'java' : '//',
+	'js' : '//',
+	'm' : '//',
+	'tex' : '%',
+}
+
+TAGS : List[str] = ['TODO', 'FIXME', 'HACK', 'NOTE', 'BUG', 'OPTIMIZE', 'REVIEW']
+
+CODE_LINES : List[str] = [
+	'x = compute_something(a, b, c)',
+	'result.append(value * scale + offset)',
+	'if (count > threshold) { return early; }',
+	'for item in collection: process(item)',
+	'buffer[index] = transform(buffer[index - 1])',
+	'config.update(key = value, other = None)',
+	'',
+]
+
+
+def gen_file_lines(
+		rng : random.Random,
+		ext : str,
+		n_lines : int,
+		tag_density : float,
+	) -> Iterator[str]:
+	"""yield `n_lines` lines of fake code, with a tagged comment on roughly `tag_density` of them"""
+	prefix : str = COMMENT_PREFIX.get(ext, '#')
+	for i in range(n_lines):
+		indent : str = '\t' * rng.randint(0, 3)
+		if rng.random() < tag_density:
+			yield f'{indent}{prefix} {rng.choice(TAGS)}: item {i} in this file, needs attention\n'
+		else:
+			yield f'{indent}{rng.choice(CODE_LINES)}\n'
+
+
+def gen_dir_paths(
+		rng : random.Random,
+		n_dirs : int,
+		depth : int,
+	) -> List[str]:
+	"""generate `n_dirs` relative directory paths, nested up to `depth` levels"""
+	dirs : List[str] = ['']
+	while len(dirs) < n_dirs:
+		parent : str = rng.choice(dirs)
+		if parent.count('/') + 1 > depth:
+			continue
+		dirs.append(f'{parent}d{len(dirs)}/')
+	return dirs
+
+
+def generate_tree(
+		root : str,
+		n_files : int = 1000,
+		lines_per_file : int = 200,
+		tag_density : float = 0.01,
+		extensions : Sequence[str] = ('py', 'c', 'cpp', 'h', 'js', 'java'),
+		depth : int = 4,
+		seed : int = 0,
+	) -> Dict[str,int]:
+	"""generate a synthetic source tree under `root`
+
+	### Parameters:
+	 - `root : str`
+	   directory to create the tree in
+	 - `n_files : int`
+	   number of files
+	   (defaults to `1000`)
+	 - `lines_per_file : int`
+	   mean number of lines per file, actual sizes vary from half to 1.5 times this
+	   (defaults to `200`)
+	 - `tag_density : float`
+	   fraction of lines with a tag
+	   (defaults to `0.01`)
+	 - `extensions : Sequence[str]`
+	   file extensions, chosen uniformly
+	   (defaults to `('py', 'c', 'cpp', 'h', 'js', 'java')`)
+	 - `depth : int`
+	   maximum directory depth
+	   (defaults to `4`)
+	 - `seed : int`
+	   random seed
+	   (defaults to `0`)
+
+	### Returns:
+	 - `Dict[str,int]`
+	   counts of files, lines, and bytes written
+	"""
+	rng : random.Random = random.Random(seed)
+	dirs : List[str] = gen_dir_paths(rng, max(1, n_files // 20), depth)
+
+	stats : Dict[str,int] = { 'files' : 0, 'lines' : 0, 'bytes' : 0 }
+	for i in range(n_files):
+		ext : str = rng.choice(list(extensions))
+		path : str = os.path.join(root, rng.choice(dirs), f'file_{i}.{ext}')
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		n_lines : int = rng.randint(max(1, lines_per_file // 2), max(1, lines_per_file * 3 // 2))
+		with open(path, 'w', encoding = 'utf-8') as fout:
+			for line in gen_file_lines(rng, ext, n_lines, tag_density):
+				fout.write(line)
+				stats['bytes'] += len(line)
+
+		stats['files'] += 1
+		stats['lines'] += n_lines
+
+	return stats
+
+
+def add_tree_args(parser : argparse.ArgumentParser) -> None:
+	"""add the options of `generate_tree()` to `parser`"""
+	parser.add_argument('--files', type = int, default = 1000, help = 'number of files')
+	parser.add_argument('--lines', type = int, default = 200, help = 'mean lines per file')
+	parser.add_argument('--tag-density', type = float, default = 0.01, help = 'fraction of lines with a tag')
+	parser.add_argument('--extensions', type = str, default = 'py,c,cpp,h,js,java', help = 'comma separated extensions')
+	parser.add_argument('--depth', type = int, default = 4, help = 'maximum directory depth')
+	parser.add_argument('--seed', type = int, default = 0, help = 'random seed')
+
+
+def tree_kwargs(args : argparse.Namespace) -> Dict[str,Any]:
+	"""keyword arguments for `generate_tree()` from parsed options"""
+	return dict(
+		n_files = args.files,
+		lines_per_file = args.lines,
+		tag_density = args.tag_density,
+		extensions = args.extensions.split(','),
+		depth = args.depth,
+		seed = args.seed,
+	)
+
+
+def main(argv : List[str]) -> None:
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('output_dir', type = str)
+	add_tree_args(parser)
+	args : argparse.Namespace = parser.parse_args(argv[1:])
+
+	stats : Dict[str,int] = generate_tree(args.output_dir, **tree_kwargs(args))
+	print(f'wrote {stats["files"]} files, {stats["lines"]} lines, {stats["bytes"]} bytes to {args.output_dir}')
+
+
+if __name__ == '__main__':
+	main(sys.argv)
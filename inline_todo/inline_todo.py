@@ -15,29 +15,46 @@ usage:
 	python inline_todo.py [cfg-options] # run scraper, parsing configs
 	python inline_todo.py --help # prints help message
 	python inline_todo.py --emit-cfg # prints current config to stdout as yaml
+	python inline_todo.py watch [cfg-options] # keep the output file updated as files change
+	python inline_todo.py query [query-options] [cfg-options] # query items from the index, see `query --help`
+	python inline_todo.py --changed-since <ref> # only scan files changed since a git ref
+	python inline_todo.py --profile # write a timing profile (config, discovery, scan, sort, write, ...), and print a summary to stderr
+	python inline_todo.py write.format=jsonl config.file_todo=null # stream JSON lines to stdout
+	python inline_todo.py write.format=html # write html directly, without pandoc
+	python inline_todo.py --exit-code # exit with status 3 if the output file was already up to date
+	python inline_todo.py --shard <i>/<N> [cfg-options] # scan one of N parts of the files, writing a partial result
+	python inline_todo.py merge <partial> [<partial> ...] [cfg-options] # combine partial results into the output file
 
 if you have the package installed, you can also do
 	python -m inline_todo [cfg-options]
 '''
 
+from __future__ import annotations
 
 #* SETTINGS
 
 from datetime import datetime
 import os
 import sys
-import glob
 import re
+import codecs
 import warnings
 import json
+import time
+import select
+import struct
+import mmap
 from typing import *
-from io import FileIO
-from functools import cached_property
+from io import FileIO, StringIO, TextIOWrapper, DEFAULT_BUFFER_SIZE
 from collections import defaultdict
+from itertools import islice, groupby, count
+from contextlib import contextmanager
 
-import yaml
-import chevron # type: ignore
-from omegaconf import OmegaConf,DictConfig,ListConfig
+# heavy imports (`omegaconf`, `yaml`, `chevron`, and stdlib modules only some paths need)
+# are done inside the functions which use them, so that startup (and `--help`) stays fast.
+# see `benchmarks/bench_startup.py`
+if TYPE_CHECKING:
+	from omegaconf import DictConfig, ListConfig
 
 """
  ######   #######  ##    ##  ######  ########  ######
@@ -54,12 +71,22 @@ from omegaconf import OmegaConf,DictConfig,ListConfig
 
 
 
-CONFIG_DEFAULT : DictConfig = OmegaConf.create({
+# plain dict, converted to a `DictConfig` in `process_configs()`
+CONFIG_DEFAULT : Dict[str,Any] = {
 	'config' : {
 		'cfg_read' : 'itodo.yml',
-		'searchDir' : '.',
-		'file_todo' : 'todo-inline.md',
+		'searchDir' : '.', # directory to scan, or a list of roots -- each a path, or a dict with `path`, and optionally `name` and `read` overrides
+		'file_todo' : 'todo-inline.md', # `null` to write to stdout
 		'verbose' : False,
+		'jobs' : None, # number of worker processes for scanning, `None` to use all CPUs
+		'discovery' : 'walk', # 'walk' the filesystem, or ask 'git' for tracked files
+		'git_untracked' : False, # with `discovery: git`, also include untracked files that arent ignored
+		'changed_since' : None, # git ref, if given only files changed since then are scanned
+		'profile' : False, # record time spent in each stage and on each file. rendering and writing the output are one `write` stage, since the stream renderer writes as it goes
+		'profile_file' : None, # where to write the profile as JSON, defaults to `file_todo` with a `.profile.json` extension
+		'profile_top' : 10, # number of slowest files to show in the profile summary
+		'shard' : None, # 'i/N' to only scan the i-th of N parts of the files (1-based), writing a partial result for `inline_todo merge`
+		'shard_file' : None, # where to write the partial result, defaults to `file_todo` with a `.shard-<i>-of-<N>.json` extension
 	},
 	# 'output' : {
 	# 	'links'  	: True,
@@ -87,18 +114,14 @@ CONFIG_DEFAULT : DictConfig = OmegaConf.create({
 				"!!!",
 				"OLD"
 			],
+			'word_boundary' : False, # only match tags not surrounded by word characters
+			'ignore_case' : False,
 		},
-		# 'comments' : {
-		# 	'require' : False,
-		# 	'list' : [
-		# 		'//',
-		# 		'/*'
-		# 		'#',
-		# 		'<!--',
-		# 		'%',
-		# 		'\\',
-		# 	],
-		# },
+		# where to look for tags:
+		#  - 'language' : only in comments, found by a tokenizer for the language of each file (see `COMMENT_SYNTAX`), so trailing comments are found and tags in strings are not
+		#  - 'prefix' : in the first `MAX_SEARCH_LEN` characters of every line
+		# files in languages without a tokenizer are always searched with 'prefix'
+		'comments' : 'language',
 		# 'prefix' : {
 		# 	'PREFIX' : '@',
 		# 	'require' : False,
@@ -122,22 +145,53 @@ CONFIG_DEFAULT : DictConfig = OmegaConf.create({
 			'todo-inline.md',
 		],
 		'MAX_SEARCH_LEN' : 15,
+		'max_file_size' : None, # bytes, larger files (like generated bundles) are skipped and counted on stderr. `null` for no limit
+		'binary_check' : 8192, # files with a NUL byte in this many leading bytes are skipped as binary. 0 to not check
+		'encoding_errors' : 'replace', # what to do with invalid utf-8: 'replace' or 'ignore' it, or 'strict' to skip the file as an error
+		'engine' : 'lines', # 'lines' reads and decodes whole files, 'mmap' searches raw bytes and only decodes matched lines
+		'prefetch' : {
+			'threads' : 0, # threads reading files ahead of scanning (in each worker process), for slow or network filesystems. 0 to read each file when it is scanned
+			'depth' : 32, # maximum number of files read ahead
+		},
 		'context' : {
 			'enabled' : True,
 			'lines' : 5, # number of lines to show before and after the tag
 		},
 	},
+	'watch' : {
+		'debounce' : 0.5, # seconds without changes before rescanning
+		'poll_interval' : 1.0, # seconds between polls, if inotify is not available
+	},
+	'index' : {
+		'enabled' : False, # keep a SQLite index of items up to date on every run, for `inline_todo query`
+		'path' : '.itodo-cache/index.sqlite',
+	},
+	'cache' : {
+		'enabled' : False,
+		'dir' : '.itodo-cache',
+		'hash' : False, # if mtime changed but size didnt, compare file contents before rescanning
+	},
 	'write' : {
+		'format' : 'markdown', # 'markdown' document, 'jsonl' with one JSON record per item, written as each file is scanned, or an 'html' page. jsonl and html are written to `file_todo` with the extension `.jsonl` or `.html`
 		'attr_sort_order' : ['file', 'tag', 'lineNum'],
 		'item_format' : 'md_det',
+		'renderer' : 'stream', # 'stream' writes items directly to the file, 'chevron' builds the whole document with a template first
+		'timestamp' : 'now', # 'now' (or the `SOURCE_DATE_EPOCH` environment variable, if set), a fixed string, or `null` to leave it out, for reproducible output
+		'skip_unchanged' : True, # dont rewrite `file_todo` if its `content_hash` shows nothing changed, so that its mtime stays the same
+		'exit_code' : False, # exit with status 3 if `file_todo` was unchanged and not rewritten
+		# write one file per top level group of `attr_sort_order` (like each tag), named `<file_todo>.<group>.md`, and make `file_todo` an index with counts and links.
+		# for reports too large to open or convert as a single file
+		'split' : False,
+		# with `write.format: html`, item contexts are kept out of the page, in files of this many contexts each (in `<file_todo>.context/`), loaded only when an item is expanded
+		'html_chunk' : 500,
 	}
-})
+}
 
 
 
 HEADER_YAML : Dict[str,Any] = {
 	"title" : "todo-inline",
-	"updated" : datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+	# "updated" and "content_hash" are added at write time
 	"source": "https://github.com/knc-neural-calculus/knc-tools",
 	"header-includes": """<style>
 body {
@@ -156,12 +210,52 @@ MAP_EXTENSION_TO_LANGUAGE : Dict[str, str] = {
 	'cxx' : 'cpp',
 	'hxx' : 'cpp',
 	'py' : 'python',
-	'm' : 'c',
+	'm' : 'matlab',
 	'tex' : 'latex',
 	'tikz' : 'latex',
 	'sh' : 'shell',
 	'java' : 'java',
 	'js' : 'javascript',
+	'html' : 'html',
+	'xml' : 'xml',
+}
+
+
+class CommentSyntax(NamedTuple):
+	"""how comments look in a language, for `read.comments: language`. see `get_comment_tokenizer()`"""
+	# markers starting a comment which runs to the end of the line
+	line : Tuple[str, ...] = ()
+	# (start, end) markers of comments which can span lines
+	block : Tuple[Tuple[str,str], ...] = ()
+	# (opening quote, regex of the rest) of string literals, which are skipped so that comment markers and tags inside them are ignored
+	strings : Tuple[Tuple[str,str], ...] = ()
+	# regex of a single character which must not come right before a line comment marker, like an escaping backslash
+	line_not_after : str = ''
+
+
+# string literals (with the loop over escapes unrolled, which is much faster in `re`). unterminated ones stop at the end of the line
+_STRING_DOUBLE : Tuple[str,str] = ('"', r'[^"\\\n]*(?:\\.[^"\\\n]*)*"?')
+_STRING_SINGLE : Tuple[str,str] = ("'", r"[^'\\\n]*(?:\\.[^'\\\n]*)*'?")
+
+# comment syntax of each language in `MAP_EXTENSION_TO_LANGUAGE`. files of other languages fall back to searching the start of every line
+COMMENT_SYNTAX : Dict[str, CommentSyntax] = {
+	'c' : CommentSyntax(line = ('//',), block = (('/*', '*/'),), strings = (_STRING_DOUBLE, _STRING_SINGLE)),
+	'cpp' : CommentSyntax(line = ('//',), block = (('/*', '*/'),), strings = (_STRING_DOUBLE, _STRING_SINGLE)),
+	'java' : CommentSyntax(line = ('//',), block = (('/*', '*/'),), strings = (_STRING_DOUBLE, _STRING_SINGLE)),
+	'javascript' : CommentSyntax(
+		line = ('//',),
+		block = (('/*', '*/'),),
+		strings = (_STRING_DOUBLE, _STRING_SINGLE, ('`', r'[^`\\]*(?:\\[\s\S][^`\\]*)*`?')),
+	),
+	# docstrings (and other triple quoted strings) count as comments
+	'python' : CommentSyntax(line = ('#',), block = (('"""', '"""'), ("'''", "'''")), strings = (_STRING_DOUBLE, _STRING_SINGLE)),
+	# `#` only starts a comment at the start of a word, not in `$#` or `${#var}`
+	'shell' : CommentSyntax(line = ('#',), strings = (_STRING_DOUBLE, ("'", r"[^'\n]*'?")), line_not_after = r'[^\s;&|()]'),
+	'latex' : CommentSyntax(line = ('%',), line_not_after = r'\\'),
+	# `'` is also the transpose operator (`x'`), so only double quoted strings are skipped. `%{` starts a block rather than a line comment, since blocks are tried first
+	'matlab' : CommentSyntax(line = ('%',), block = (('%{', '%}'),), strings = (('"', r'[^"\n]*"?'),)),
+	'html' : CommentSyntax(block = (('<!--', '-->'),)),
+	'xml' : CommentSyntax(block = (('<!--', '-->'),)),
 }
 
 
@@ -204,7 +298,7 @@ TEMPLATES : Dict[str,str] = { '3lvl' : r"""
 {{/ul0}}
 """ }
 
-def gen_template_from_attrlist(attrlist : List[str]) -> str:
+def gen_template_from_attrlist(attrlist : List[str], header_offset : int = 0) -> str:
 	output : List[str] = list()
 
 	depth : int = len(attrlist)
@@ -214,7 +308,7 @@ def gen_template_from_attrlist(attrlist : List[str]) -> str:
 
 	# list openers, headers
 	for idx in range(1, depth):
-		output.append(f'{"#" * idx} {{h{idx}}}')
+		output.append(f'{"#" * (idx + header_offset)} {{h{idx}}}')
 		output.append(f'{{#ul{idx}}}')
 
 	# item
@@ -313,6 +407,7 @@ def unixPath(path: str) -> str:
 
 
 def assert_DictConfig(config: Any) -> DictConfig:
+	from omegaconf import OmegaConf,DictConfig
 	if isinstance(config, DictConfig):
 		return config
 	else:
@@ -320,6 +415,7 @@ def assert_DictConfig(config: Any) -> DictConfig:
 		return OmegaConf.create({None : config})
 
 def assert_Optional_DictConfig(config: Any) -> Optional[DictConfig]:
+	from omegaconf import OmegaConf,DictConfig
 	if isinstance(config, DictConfig) or config is None:
 		return config
 	else:
@@ -350,10 +446,11 @@ def extract_frontmatter_yaml(filename : str, fm_delim : str = '---'):
 					# if its the end delimeter, stop reading
 					break
 			elif strpline:
-				# if non empty string, add it
-				yaml_str.append(strpline)
+				# if non empty string, add it. indentation is kept, since nested yaml needs it
+				yaml_str.append(line.rstrip('\n'))
 	
 	# load the lines as  yaml
+	from omegaconf import OmegaConf
 	return OmegaConf.create('\n'.join(yaml_str))
 
 
@@ -365,6 +462,7 @@ def add_default_excludes(config : DictConfig) -> None:
 		config['config']['cfg_read'], # input config file
 		config['config']['file_todo'], # output file
 	```
+	and, only with `write.format: html`, its directory of context files, see `write_html_file()`. this is called after all configs are merged, so the format is the one this run uses
 	
 	### Parameters:
 	 - `config : DictConfig`
@@ -378,6 +476,8 @@ def add_default_excludes(config : DictConfig) -> None:
 		config['config']['cfg_read'], # input config file
 		config['config']['file_todo'], # output file
 	])
+	if config['write']['format'] == 'html' and isinstance(config['config']['file_todo'], str):
+		config['read']['EXCLUDE'].append(os.path.splitext(config['config']['file_todo'])[0] + '.context')
 
 	# remove all non-strings from the exclude list
 	config['read']['EXCLUDE'] = [
@@ -397,6 +497,7 @@ def load_file_config(filename : str) -> Optional[DictConfig]:
 	   returns `None` if file is not found or another error occurs
 	"""
 	# print(f"loading config from file: {filename}", file=sys.stderr)
+	from omegaconf import OmegaConf
 	try:
 		if os.path.isfile(filename):
 			cfg_temp : Union[DictConfig, ListConfig] = OmegaConf.load(filename)
@@ -411,6 +512,43 @@ def load_file_config(filename : str) -> Optional[DictConfig]:
 	return None
 
 
+# flags which take a value, and the config key they set
+CLI_FLAGS_VALUE : Dict[str,str] = {
+	'--changed-since' : 'config.changed_since',
+	'--shard' : 'config.shard',
+}
+
+# flags which dont take a value, and the config key they set to `true`
+CLI_FLAGS_BOOL : Dict[str,str] = {
+	'--profile' : 'config.profile',
+	'--exit-code' : 'write.exit_code',
+}
+
+def translate_cli_flags(argv : List[str]) -> List[str]:
+	"""translate flags like `--changed-since <ref>` into `config.changed_since=<ref>`, and `--profile` into `config.profile=true`
+
+	both `--flag value` and `--flag=value` are accepted. anything else is passed through as-is.
+	"""
+	output : List[str] = list()
+	idx : int = 0
+	while idx < len(argv):
+		arg : str = argv[idx]
+		flag, sep, value = arg.partition('=')
+		if arg in CLI_FLAGS_BOOL:
+			output.append(f'{CLI_FLAGS_BOOL[arg]}=true')
+		elif flag in CLI_FLAGS_VALUE:
+			if not sep:
+				idx += 1
+				if idx >= len(argv):
+					raise ValueError(f'missing value for {flag}')
+				value = argv[idx]
+			output.append(f'{CLI_FLAGS_VALUE[flag]}={value}')
+		else:
+			output.append(arg)
+		idx += 1
+	return output
+
+
 def process_configs(argv : List[str]) -> DictConfig:
 	"""merge default, yaml, and CLI configs, return merged `DictConfig` object
 		
@@ -435,11 +573,13 @@ def process_configs(argv : List[str]) -> DictConfig:
 	   merged config object
 	"""	
 
+	from omegaconf import OmegaConf
+
 	# clip the "python" command and file from the args
-	argv = argv[1:]
+	argv = translate_cli_flags(argv[1:])
 
 	# default options
-	cfg_default : DictConfig = assert_DictConfig(CONFIG_DEFAULT)
+	cfg_default : DictConfig = OmegaConf.create(CONFIG_DEFAULT)
 
 	# try to load config from default given file
 	cfg_file_default : Optional[DictConfig] = assert_Optional_DictConfig(
@@ -475,6 +615,231 @@ def process_configs(argv : List[str]) -> DictConfig:
 	return cfg
 
 
+class ReadSettings(NamedTuple):
+	"""resolved `read` section of the config, see `CONFIG_DEFAULT` for what each field does
+
+	this is what the scanning code takes, so that it never has to index into `DictConfig` nodes. being an immutable tuple, it is also cheap to pickle for worker processes.
+	"""
+	tags : Tuple[str, ...]
+	max_search_len : int
+	source_files : FrozenSet[str]
+	exclude : FrozenSet[str]
+	word_boundary : bool = False
+	ignore_case : bool = False
+	engine : str = 'lines'
+	context_enabled : bool = True
+	context_lines : int = 5
+	prefetch_threads : int = 0
+	prefetch_depth : int = 32
+	max_file_size : Optional[int] = None
+	binary_check : int = 8192
+	encoding_errors : str = 'replace'
+	comments : str = 'language'
+
+	@property
+	def max_context_lines(self) -> Optional[int]:
+		"""lines of context to keep around each item, or `None` if context is disabled"""
+		return self.context_lines if self.context_enabled else None
+
+	@classmethod
+	def from_dict(cls, cfg_read : Mapping[str,Any]) -> ReadSettings:
+		"""build from a `read` config section, either a plain dict or a `DictConfig`"""
+		engine : str = str(cfg_read.get('engine', 'lines'))
+		if engine not in ('lines', 'mmap'):
+			raise ValueError(f"unknown read engine: {engine}, expected 'lines' or 'mmap'")
+
+		context : Mapping[str,Any] = cfg_read.get('context', dict(enabled = False, lines = 0))
+		prefetch : Mapping[str,Any] = cfg_read.get('prefetch', dict(threads = 0, depth = 32))
+		encoding_errors : str = str(cfg_read.get('encoding_errors', 'replace'))
+		if encoding_errors not in ('strict', 'replace', 'ignore'):
+			raise ValueError(f"unknown read.encoding_errors: {encoding_errors}, expected 'strict', 'replace', or 'ignore'")
+		max_file_size : Optional[Any] = cfg_read.get('max_file_size', None)
+		comments : str = str(cfg_read.get('comments', 'language'))
+		if comments not in ('language', 'prefix'):
+			raise ValueError(f"unknown read.comments: {comments}, expected 'language' or 'prefix'")
+		if int(prefetch['threads']) < 0 or int(prefetch['depth']) < 1:
+			raise ValueError(f"invalid read.prefetch: {dict(prefetch)}, expected threads >= 0 and depth >= 1")
+		return cls(
+			tags = tuple(cfg_read['tags']['list']),
+			max_search_len = int(cfg_read['MAX_SEARCH_LEN']),
+			source_files = frozenset(cfg_read['SOURCE_FILES']),
+			exclude = frozenset(cfg_read['EXCLUDE']),
+			word_boundary = bool(cfg_read['tags'].get('word_boundary', False)),
+			ignore_case = bool(cfg_read['tags'].get('ignore_case', False)),
+			engine = engine,
+			context_enabled = bool(context['enabled']),
+			context_lines = int(context['lines']),
+			prefetch_threads = int(prefetch['threads']),
+			prefetch_depth = int(prefetch['depth']),
+			max_file_size = None if max_file_size is None else int(max_file_size),
+			binary_check = int(cfg_read.get('binary_check', 0)),
+			encoding_errors = encoding_errors,
+			comments = comments,
+		)
+
+	@classmethod
+	def coerce(cls, cfg_read : Union[ReadSettings, Mapping[str,Any]]) -> ReadSettings:
+		"""return `cfg_read` if it is already resolved, otherwise build from it"""
+		if isinstance(cfg_read, ReadSettings):
+			return cfg_read
+		return cls.from_dict(cfg_read)
+
+
+def merge_dicts(base : Dict[str,Any], override : Mapping[str,Any]) -> Dict[str,Any]:
+	"""recursively merge `override` into a copy of `base`. nested dicts are merged, anything else (including lists) is replaced"""
+	output : Dict[str,Any] = dict(base)
+	for k,v in override.items():
+		if isinstance(v, Mapping) and isinstance(output.get(k), dict):
+			output[k] = merge_dicts(output[k], v)
+		else:
+			output[k] = v
+	return output
+
+
+class RootSettings(NamedTuple):
+	"""one directory to scan, with the read settings to use for it"""
+	name : str
+	path : str
+	read : ReadSettings
+
+	@classmethod
+	def from_entry(cls, entry : Union[str, Mapping[str,Any]], cfg_read : Dict[str,Any]) -> RootSettings:
+		"""build from an entry of `config.searchDir`: either a path, or a dict with `path`, and optionally `name` and `read` overrides for this root"""
+		if isinstance(entry, str):
+			return cls(name = entry, path = entry, read = ReadSettings.from_dict(cfg_read))
+
+		path : str = str(entry['path'])
+		return cls(
+			name = str(entry.get('name', path)),
+			path = path,
+			read = ReadSettings.from_dict(merge_dicts(cfg_read, entry.get('read', dict()))),
+		)
+
+
+class Settings(NamedTuple):
+	"""resolved config, built once from the merged config by `Settings.from_config()`
+
+	OmegaConf is only used to load and merge configs (see `process_configs()`), everything after that reads attributes of this object. sections other than `read` are flattened, with the section name as a prefix where needed.
+
+	`roots` has an entry for every directory in `config.searchDir`. `search_dir` and `read` are those of the first root, and are what single root features (watch, the index, queries) use.
+	"""
+	roots : Tuple[RootSettings, ...]
+	search_dir : str
+	file_todo : Optional[str] # `None` to write to stdout
+	verbose : bool
+	read : ReadSettings
+	jobs : Optional[int]
+	discovery : str
+	git_untracked : bool
+	changed_since : Optional[str]
+	profile : bool
+	profile_file : Optional[str]
+	profile_top : int
+	shard : Optional[Tuple[int,int]] # `(i, N)`, 1-based
+	shard_file : Optional[str]
+	watch_debounce : float
+	watch_poll_interval : float
+	index_enabled : bool
+	index_path : str
+	cache_enabled : bool
+	cache_dir : str
+	cache_hash : bool
+	write_format : str
+	attr_sort_order : Tuple[str, ...]
+	item_format : str
+	renderer : str
+	timestamp : Optional[str]
+	skip_unchanged : bool
+	exit_code : bool
+	split : bool
+	html_chunk : int
+	# whole config as plain containers, written to the header of the output file
+	raw : Dict[str,Any]
+
+	def single_root(self, feature : str) -> RootSettings:
+		"""the only root, raising a `ValueError` naming `feature` if there are several"""
+		if len(self.roots) > 1:
+			raise ValueError(f'{feature} only supports a single directory in config.searchDir, got {len(self.roots)}')
+		return self.roots[0]
+
+	@classmethod
+	def from_config(cls, cfg : Union[DictConfig, Dict[str,Any]]) -> Settings:
+		"""resolve a full config, either a `DictConfig` from `process_configs()` or a plain dict shaped like `CONFIG_DEFAULT`"""
+		raw : Dict[str,Any]
+		if isinstance(cfg, dict):
+			raw = cfg
+		else:
+			from omegaconf import OmegaConf
+			raw = OmegaConf.to_container(cfg, resolve = True) # type: ignore
+
+		config : Dict[str,Any] = raw['config']
+
+		write_format : str = str(raw['write'].get('format', 'markdown'))
+		if write_format not in ('markdown', 'jsonl', 'html'):
+			raise ValueError(f"unknown write format: {write_format}, expected 'markdown', 'jsonl', or 'html'")
+		if raw['write'].get('split', False) and write_format != 'markdown':
+			raise ValueError(f'write.split only supports write.format: markdown, got {write_format}')
+		html_chunk : int = int(raw['write'].get('html_chunk', 500))
+		if html_chunk < 1:
+			raise ValueError(f'write.html_chunk must be at least 1, got {html_chunk}')
+
+		# a single directory, or a list of roots
+		search_dirs : List[Any] = (
+			list(config['searchDir'])
+			if isinstance(config['searchDir'], list)
+			else [config['searchDir']]
+		)
+		if not search_dirs:
+			raise ValueError('config.searchDir is empty, expected a directory or a list of them')
+		roots : Tuple[RootSettings, ...] = tuple(
+			RootSettings.from_entry(entry, raw['read'])
+			for entry in search_dirs
+		)
+		if len(set(r.name for r in roots)) < len(roots):
+			raise ValueError(f'names of roots in config.searchDir must be unique, got: {[r.name for r in roots]}')
+
+		shard : Optional[Tuple[int,int]] = None
+		if config['shard'] is not None:
+			m_shard : Optional[re.Match] = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', str(config['shard']))
+			if m_shard is None or not (1 <= int(m_shard.group(1)) <= int(m_shard.group(2))):
+				raise ValueError(f"invalid shard: {config['shard']}, expected 'i/N' with 1 <= i <= N")
+			shard = (int(m_shard.group(1)), int(m_shard.group(2)))
+
+		return cls(
+			roots = roots,
+			search_dir = roots[0].path,
+			file_todo = None if config['file_todo'] is None else str(config['file_todo']),
+			verbose = bool(config['verbose']),
+			read = roots[0].read,
+			jobs = None if config['jobs'] is None else int(config['jobs']),
+			discovery = str(config['discovery']),
+			git_untracked = bool(config['git_untracked']),
+			changed_since = None if config['changed_since'] is None else str(config['changed_since']),
+			profile = bool(config['profile']),
+			profile_file = config['profile_file'],
+			profile_top = int(config['profile_top']),
+			shard = shard,
+			shard_file = config['shard_file'],
+			watch_debounce = float(raw['watch']['debounce']),
+			watch_poll_interval = float(raw['watch']['poll_interval']),
+			index_enabled = bool(raw['index']['enabled']),
+			index_path = str(raw['index']['path']),
+			cache_enabled = bool(raw['cache']['enabled']),
+			cache_dir = str(raw['cache']['dir']),
+			cache_hash = bool(raw['cache']['hash']),
+			write_format = write_format,
+			attr_sort_order = tuple(raw['write']['attr_sort_order']),
+			item_format = str(raw['write']['item_format']),
+			renderer = str(raw['write']['renderer']),
+			timestamp = None if raw['write']['timestamp'] is None else str(raw['write']['timestamp']),
+			skip_unchanged = bool(raw['write']['skip_unchanged']),
+			exit_code = bool(raw['write']['exit_code']),
+			split = bool(raw['write'].get('split', False)),
+			html_chunk = html_chunk,
+			raw = raw,
+		)
+
+
 """
  ######  ##        ######
 ##    ## ##       ##    ##
@@ -488,19 +853,28 @@ def process_configs(argv : List[str]) -> DictConfig:
 
 
 class TodoItem(object):
-	"""todo item class"""
+	"""todo item class
+
+	uses `__slots__` and interns `tag` and `file`, since there can be millions of these. the raw line is not kept, only the `content` extracted from it (unless context is disabled, in which case the line is the context).
+	"""
+
+	Attr = Literal['tag', 'file', 'lineNum', 'context', 'content']
 
-	Attr = Literal['tag', 'file', 'lineNum', 'line', 'context', 'content']
+	__slots__ = ('tag', 'file', 'lineNum', 'content', 'context_lines', '_context')
 
 	def __init__(
 			self,
 			tag : str,
 			file : str,
 			lineNum : int,
-			line : str,
+			line : Optional[str] = None,
 			context : Optional[str] = None,
+			context_lines : Optional[int] = None,
+			content : Optional[str] = None,
 		) -> None:
 		"""a class to hold a todo item
+
+		context can either be given directly, or loaded lazily: if `context_lines` is given, the context is read from `file` only when it is first accessed (see `load_contexts()` for loading in batches)
 		
 		### Parameters:
 		 - `tag : str`   
@@ -509,35 +883,64 @@ class TodoItem(object):
 		   file containing todo item
 		 - `lineNum : int`   
 		   line number of the todo item
-		 - `line : str`   
-		   content of the todo item's line
+		 - `line : Optional[str]`   
+		   content of the todo item's line. only optional if `content` is given
 		 - `context : Optional[str]`
 		   lines arond the todo item
+		 - `context_lines : Optional[int]`
+		   number of lines (starting at `lineNum`) to load as context when needed.
+		   if both this and `context` are `None`, the context is just `line`
+		 - `content : Optional[str]`
+		   already extracted content, if `None` it is extracted from `line`
 		"""
 
-		self.tag : str = tag
-		self.file : str = file
+		self.tag : str = sys.intern(tag)
+		self.file : str = sys.intern(file)
 		self.lineNum : int = lineNum
-		self.line : str = line
-		self.context : str = line if context is None else context
+		self.content : str = (
+			self.extract_content(line, tag) # type: ignore
+			if content is None
+			else content
+		)
+		self.context_lines : Optional[int] = context_lines
+		self._context : Optional[str] = context
+		if context is None and context_lines is None:
+			self._context = line
+
+	def __reduce__(self) -> Tuple[Any, ...]:
+		# goes through `__init__` on unpickling, so strings from worker processes get interned
+		return (
+			TodoItem,
+			(self.tag, self.file, self.lineNum, None, self._context, self.context_lines, self.content),
+		)
+
+	@property
+	def context(self) -> str:
+		"""lines around the todo item, read from `self.file` if not loaded yet"""
+		if self._context is None:
+			load_contexts([self])
+		return self._context # type: ignore
+
+	@context.setter
+	def context(self, value : str) -> None:
+		self._context = value
 
 	def __str__(self) -> str:
 		return f'[ {self.tag}\t:\t{self.file}\t:\t{self.lineNum} ]\t{self.content}'
 
 	
-	@cached_property
-	def content(self) -> str:
+	@staticmethod
+	def extract_content(line : str, tag : str) -> str:
 		"""extract the content, trimming excess stuff
 
-		reads until `self.tag` and then discards stuff
+		reads until `tag` and then discards stuff
 
 		note that this will probably break if more than one primary tag is present in a line
 		this function does very little, but im writing it in anticipation of possible doing fancier things here such as extracting other tags (time created, assigned person, priority, etc)
 
 		### Built-in Constants:
 		 - `lstrip_chars : str`
-		   characters to strip from the beginning of the `self.line` string, after we discard everything up to the tag
-		   cant pass this a function because `content` is a cached property
+		   characters to strip from the beginning of the `line` string, after we discard everything up to the tag
 
 
 		### Returns:
@@ -547,16 +950,20 @@ class TodoItem(object):
 
 		lstrip_chars : str = ':'
 
-		idx = self.line.find(self.tag)
-		output : str = self.line[idx:].lstrip(lstrip_chars).strip()
+		idx = line.find(tag)
+		if idx == -1:
+			# tag was matched case-insensitively
+			m_tag : Optional[re.Match] = re.search(re.escape(tag), line, re.IGNORECASE)
+			idx = 0 if m_tag is None else m_tag.start()
+		output : str = line[idx:].lstrip(lstrip_chars).strip()
 
 		return output
 
-	@cached_property
-	def context_processed(
-			self, 
-			tabs_spaces : int = 4) -> str:
+	@property
+	def context_processed(self) -> str:
 		"""removes shared leading whitespace, adds a single leading tab"""
+		tabs_spaces : int = 4
+
 		# split by line, replace tabs with spaces
 		context_lines : List[str] = [
 			line.replace('\t', ' ' * tabs_spaces)
@@ -611,12 +1018,27 @@ class TodoItem(object):
 """
 
 
+def _has_extension(filename : str, extensions : Set[str]) -> bool:
+	"""check if anything after a `.` in `filename` is one of `extensions`
+
+	checks every suffix, so multi-part extensions like `tar.gz` work too
+	"""
+	idx : int = filename.find('.')
+	while idx != -1:
+		if filename[idx + 1:] in extensions:
+			return True
+		idx = filename.find('.', idx + 1)
+	return False
+
+
 def get_valid_files(
 		searchdir : str, 
 		file_types : List[str],
 		exclude : Set[str] = set(),
 	) -> List[str]:
 	"""from `searchdir` return all files with types found in `file_types`
+
+	does a single walk of the directory tree, no matter how many file types are given. hidden files and directories (starting with `.`) are skipped, and excluded directories are pruned before descending into them. directories are deduplicated by inode, so symlink loops are only followed once.
 	
 	### Parameters:
 	 - `searchdir : str`   
@@ -629,60 +1051,190 @@ def get_valid_files(
 	
 	### Returns:
 	 - `List[str]` 
-	   list of valid filenames
+	   sorted list of valid filenames
 	"""
 
-	files_search : List[str] = []
-	
-	# search individually for every file type
-	for ft in file_types:
-		glob_str_root = os.path.join(searchdir, f'/*.{ft}')
-		files_search.extend( glob.glob( glob_str_root, recursive = True ) )
-		glob_str = os.path.join(searchdir, f'**/*.{ft}')
-		files_search.extend( glob.glob( glob_str, recursive = True ) )
-
-	# make filepaths unix style
-	files_search = [
-		unixPath(x)
-		for x in files_search
-	]
+	extensions : Set[str] = set(file_types)
 
-	# filter out the files we need to ignore
+	# `str.startswith` accepts a tuple, and checks all prefixes in one call
 	# TODO: do this using globs
-	for ex in exclude:
-		sw : str = os.path.join(searchdir, ex)
-		files_search = [
-			unixPath(x)
-			for x in files_search
-			if not x.startswith(sw)
-		]
+	exclude_prefixes : Tuple[str, ...] = tuple(
+		unixPath(os.path.join(searchdir, ex))
+		for ex in exclude
+	)
+
+	files_search : List[str] = []
+	visited_dirs : Set[Tuple[int,int]] = set()
+	dirs_stack : List[str] = [searchdir]
+
+	while dirs_stack:
+		dirpath : str = dirs_stack.pop()
+
+		try:
+			# skip directories we have already seen (symlink loops, etc)
+			dir_stat : os.stat_result = os.stat(dirpath)
+			dir_id : Tuple[int,int] = (dir_stat.st_dev, dir_stat.st_ino)
+			if dir_id in visited_dirs:
+				continue
+			visited_dirs.add(dir_id)
+
+			with os.scandir(dirpath) as it:
+				entries : List[os.DirEntry] = list(it)
+		except OSError:
+			continue
+
+		for entry in entries:
+			if entry.name.startswith('.'):
+				continue
+
+			path : str = unixPath(entry.path)
+			# if a directory matches an exclude prefix, so does everything in it
+			if exclude_prefixes and path.startswith(exclude_prefixes):
+				continue
+
+			try:
+				if entry.is_dir():
+					dirs_stack.append(entry.path)
+				elif entry.is_file() and _has_extension(entry.name, extensions):
+					files_search.append(path)
+			except OSError:
+				continue
+
+	files_search.sort()
 
 	return files_search
 
 
+def _git_lines(args : List[str], cwd : str) -> List[str]:
+	"""run a git command in `cwd`, return its NUL-separated output"""
+	import subprocess
+	result : subprocess.CompletedProcess = subprocess.run(
+		['git', *args],
+		cwd = cwd,
+		stdout = subprocess.PIPE,
+		stderr = subprocess.PIPE,
+		check = True,
+	)
+	return [
+		os.fsdecode(x)
+		for x in result.stdout.split(b'\0')
+		if x
+	]
+
+
+def get_git_files(
+		searchdir : str,
+		file_types : List[str],
+		exclude : Set[str] = set(),
+		untracked : bool = False,
+		changed_since : Optional[str] = None,
+	) -> List[str]:
+	"""like `get_valid_files()`, but gets candidate files from git instead of walking the filesystem
+
+	uses a single `git ls-files` call, so files ignored by git (`node_modules`, build directories, virtualenvs) are never visited. if `changed_since` is given, uses `git diff --name-only <changed_since>` instead, so only files changed since that ref (including uncommitted changes) are returned.
+
+	the same filtering as `get_valid_files()` is applied: hidden paths are skipped, and `file_types` and `exclude` are respected. files which no longer exist on disk are dropped.
+	
+	### Parameters:
+	 - `searchdir : str`   
+	   directory inside a git repo. only files under it are returned
+	 - `file_types : List[str]`   
+	   file extensions
+	 - `exclude : Set[str]`   
+	   anything that starts with a string in this set will be excluded
+	   (defaults to `set()`)
+	 - `untracked : bool`   
+	   also include untracked files, unless git ignores them
+	   (defaults to `False`)
+	 - `changed_since : Optional[str]`   
+	   git ref to diff against
+	   (defaults to `None`)
+	
+	### Returns:
+	 - `List[str]` 
+	   sorted list of valid filenames
+	
+	### Raises:
+	 - `subprocess.CalledProcessError` : if git fails, for example if `searchdir` is not in a git repo
+	 - `FileNotFoundError` : if git is not installed
+	"""
+
+	git_args : List[str]
+	if changed_since is not None:
+		# `--relative` restricts to, and gives paths relative to, `searchdir`
+		git_args = ['diff', '--name-only', '-z', '--relative', changed_since, '--']
+	else:
+		git_args = ['ls-files', '-z', '--cached']
+		if untracked:
+			git_args.extend(['--others', '--exclude-standard'])
+
+	extensions : Set[str] = set(file_types)
+	exclude_prefixes : Tuple[str, ...] = tuple(
+		unixPath(os.path.join(searchdir, ex))
+		for ex in exclude
+	)
+
+	files_search : Set[str] = set()
+	for relpath in _git_lines(git_args, cwd = searchdir):
+		path : str = unixPath(os.path.join(searchdir, relpath))
+		if (
+				any(part.startswith('.') for part in relpath.split('/'))
+				or not _has_extension(path.rsplit('/', 1)[-1], extensions)
+				or (exclude_prefixes and path.startswith(exclude_prefixes))
+				or not os.path.isfile(path)
+			):
+			continue
+		files_search.add(path)
+
+	return sorted(files_search)
+
+
+def discover_files(settings : Settings, root : Optional[RootSettings] = None) -> List[str]:
+	"""get the list of files to scan in `root` (the first root if `None`), according to `settings.discovery` and `settings.changed_since`
+
+	if git fails, warns and falls back to walking the filesystem
+	"""
+	if root is None:
+		root = settings.roots[0]
+	searchdir : str = root.path
+	file_types : FrozenSet[str] = root.read.source_files
+	exclude : FrozenSet[str] = root.read.exclude
+
+	if settings.discovery == 'git' or settings.changed_since is not None:
+		import subprocess
+		try:
+			return get_git_files(
+				searchdir = searchdir,
+				file_types = file_types,
+				exclude = exclude,
+				untracked = settings.git_untracked,
+				changed_since = settings.changed_since,
+			)
+		except (subprocess.CalledProcessError, FileNotFoundError) as e:
+			stderr : str = getattr(e, 'stderr', b'').decode('utf-8', errors = 'replace').strip()
+			warnings.warn(f"git file discovery failed, walking the filesystem instead:\t {e} {stderr}")
+	elif settings.discovery != 'walk':
+		raise ValueError(f"unknown discovery mode: {settings.discovery}, expected 'walk' or 'git'")
+
+	return get_valid_files(
+		searchdir = searchdir,
+		file_types = file_types,
+		exclude = exclude,
+	)
+
+
 def scrape_context(
 		lineNum : int, 
 		max_context_lines : int, 
 		lst_lines : List[str],
-		lst_lines_stripped : List[str],
+		lst_lines_stripped : Optional[List[str]] = None,
 	) -> str:
+	"""get up to `max_context_lines` lines starting at (0-indexed) `lineNum`, skipping empty lines
 
-	# figure out when to read until
-	# either until we reach the max context window,
-	# or until the next empty line
-
-	# find the index of the next empty line
-	next_empty_line_idx : int = lineNum + max_context_lines
-	try:
-		next_empty_line_idx = lst_lines_stripped.index('', lineNum + 1, lineNum + max_context_lines)
-	except ValueError:
-		pass
+	empty lines are dropped rather than ending the context, so that a blank line right after the tag doesnt hide the code it refers to
 
-	read_until : int = min(
-		lineNum + max_context_lines,
-		len(lst_lines) - 1,
-		next_empty_line_idx,
-	)							
+	`lst_lines_stripped` is unused, and only kept for compatibility
+	"""
 
 	return '\n'.join(
 		[ 
@@ -696,127 +1248,1401 @@ def scrape_context(
 	)
 
 
+def load_contexts(td_items : Iterable[TodoItem]) -> None:
+	"""load the context of every item in `td_items` which doesnt have it yet
+
+	items are batched by file, and each file is read once -- and only up to the last line needed
+	"""
+	items_pending : Dict[str, List[TodoItem]] = defaultdict(list)
+	for itm in td_items:
+		if itm._context is None:
+			items_pending[itm.file].append(itm)
+
+	for file,file_items in items_pending.items():
+		last_line : int = max(
+			itm.lineNum - 1 + (itm.context_lines or 0)
+			for itm in file_items
+		)
+		# only for display, and files which failed to decode strictly never have items
+		with open(file, 'r', encoding = 'utf-8', errors = 'replace') as f:
+			lst_lines : List[str] = list(islice(f, last_line))
+
+		for itm in file_items:
+			itm._context = scrape_context(
+				lineNum = itm.lineNum - 1,
+				max_context_lines = itm.context_lines or 0,
+				lst_lines = lst_lines,
+			)
+
+
+def format_uses_context(fmt : ItemPrintFormats) -> bool:
+	"""whether the item format `fmt` needs the context of items"""
+	return 'context' in ITM_FORMATS[fmt]
+
+
+class TagMatcher(object):
+	"""finds the identifying tag of a line, using a single compiled regex for all tags
+
+	all the config lookups happen once, in the constructor. every occurrence of every tag in the search window is found in one scan (the alternation is wrapped in a lookahead, so overlapping tags are found too), and the tag which comes first in `tags` wins -- same as checking each tag in order.
+	"""
+
+	def __init__(
+			self,
+			tags : List[str],
+			max_search_len : int,
+			word_boundary : bool = False,
+			ignore_case : bool = False,
+		) -> None:
+		"""compile a matcher for `tags`
+		
+		### Parameters:
+		 - `tags : List[str]`   
+		   tags to look for, in order of priority
+		 - `max_search_len : int`   
+		   only the first `max_search_len` characters of each line are searched
+		 - `word_boundary : bool`   
+		   only match tags which are not preceded or followed by a word character
+		   (defaults to `False`)
+		 - `ignore_case : bool`   
+		   match tags case-insensitively
+		   (defaults to `False`)
+		"""
+		self.tags : Tuple[str, ...] = tuple(tags)
+		self.max_search_len : int = max_search_len
+		self.ignore_case : bool = ignore_case
+
+		# map matched text back to the index of the first tag it corresponds to
+		self._tag_index : Dict[str,int] = dict()
+		for idx,tag in enumerate(self.tags):
+			self._tag_index.setdefault(self._normalize(tag), idx)
+
+		tag_pattern : str = '|'.join(re.escape(tag) for tag in self.tags)
+		if word_boundary:
+			tag_pattern = rf'(?<!\w)(?:{tag_pattern})(?!\w)'
+
+		self.pattern : re.Pattern = re.compile(
+			f'(?=({tag_pattern}))',
+			re.IGNORECASE if ignore_case else 0,
+		)
+
+		# utf-8 encoded tags, for finding candidate lines in raw bytes.
+		# this finds a superset of the matches, every candidate line is checked with `match()`
+		self.pattern_bytes : re.Pattern = re.compile(
+			b'|'.join(re.escape(tag.encode('utf-8')) for tag in self.tags),
+			re.IGNORECASE if ignore_case else 0,
+		)
+		# same for decoded text, for finding the tags which might be in comments, see `_scrape_items_comments()`
+		self.pattern_any : re.Pattern = re.compile(
+			'|'.join(re.escape(tag) for tag in self.tags),
+			re.IGNORECASE if ignore_case else 0,
+		)
+		# bytes patterns only ignore case for ascii
+		self.bytes_safe : bool = not (ignore_case and not all(tag.isascii() for tag in self.tags))
+
+	@classmethod
+	def from_config(cls, cfg_read : ReadSettings) -> 'TagMatcher':
+		return cls(
+			tags = list(cfg_read.tags),
+			max_search_len = cfg_read.max_search_len,
+			word_boundary = cfg_read.word_boundary,
+			ignore_case = cfg_read.ignore_case,
+		)
+
+	def _normalize(self, text : str) -> str:
+		return text.casefold() if self.ignore_case else text
+
+	def match(self, line : str) -> Optional[str]:
+		"""return the highest priority tag found at the start of `line`, or `None`"""
+		found : Optional[Tuple[int,int]] = self.search(line, 0, self.max_search_len)
+		return None if found is None else self.tags[found[0]]
+
+	def search(self, text : str, start : int, end : int) -> Optional[Tuple[int,int]]:
+		"""find the highest priority tag in `text[start:end]`, returning its index in `tags` and its position in `text`, or `None`"""
+		if not self.tags:
+			return None
+
+		best : Optional[int] = None
+		best_pos : int = -1
+		for m in self.pattern.finditer(text, start, end):
+			idx : Optional[int] = self._tag_index.get(self._normalize(m.group(1)))
+			if idx is None:
+				# case folding disagreed with the regex engine, find the tag the slow way
+				idx = next(
+					i for i,tag in enumerate(self.tags)
+					if re.fullmatch(re.escape(tag), m.group(1), re.IGNORECASE)
+				)
+			if best is None or idx < best:
+				best = idx
+				best_pos = m.start()
+				if best == 0:
+					break
+
+		return None if best is None else (best, best_pos)
+
 
 def scrape_items(
 		filename : str,
-		cfg_read : DictConfig,
+		cfg_read : Union[ReadSettings, Mapping[str,Any]],
+		matcher : Optional[TagMatcher] = None,
+		stats : Optional[Dict[str,int]] = None,
+		data : Optional[bytes] = None,
 	) -> List[TodoItem]:
 	"""get a list of todo items from a file according to the settings in `cfg_read`
 	
 	### Parameters:
 	 - `filename : str`   
-	 - `cfg_read : DictConfig`   
+	 - `cfg_read : Union[ReadSettings, Mapping[str,Any]]`   
+	   resolved read settings, or a `read` config section to resolve
+	 - `matcher : Optional[TagMatcher]`   
+	   compiled tag matcher, built from `cfg_read` if `None`
+	   (defaults to `None`)
+	 - `stats : Optional[Dict[str,int]]`   
+	   if given, `bytes` and `lines` of the file are written to it
+	   (defaults to `None`)
+	 - `data : Optional[bytes]`   
+	   contents of the file, if already read (see `iter_prefetch()`). the file is read if `None`
+	   (defaults to `None`)
+
+	with `cfg_read.comments == 'language'`, files with a comment tokenizer (see `get_comment_tokenizer()`) are scanned by `_scrape_items_comments()`, whatever the `engine`.
 	
 	### Returns:
 	 - `List[TodoItem]` 
+
+	### Raises:
+	 - `FileSkipped` : if the file is larger than `cfg_read.max_file_size`, or looks binary (see `cfg_read.binary_check`)
+	 - `UnicodeDecodeError` : if the file is not valid utf-8 and `cfg_read.encoding_errors` is `'strict'`
+	 - `OSError` : if the file cant be read
 	"""	
 
+	cfg_read = ReadSettings.coerce(cfg_read)
+
+	if matcher is None:
+		matcher = TagMatcher.from_config(cfg_read)
+
+	if cfg_read.comments == 'language':
+		tokenizer : Optional[CommentTokenizer] = get_comment_tokenizer(filename)
+		if tokenizer is not None:
+			return _scrape_items_comments(filename, cfg_read, matcher, tokenizer, stats, data)
+
+	if cfg_read.engine == 'mmap' and matcher.bytes_safe:
+		return _scrape_items_mmap(filename, cfg_read, matcher, stats, data)
+	else:
+		return _scrape_items_lines(filename, cfg_read, matcher, stats, data)
+
+
+class FileSkipped(Exception):
+	"""raised by `scrape_items()` for a file which is not scanned, see `read.max_file_size` and `read.binary_check`"""
+	pass
+
+
+def _check_file(size : int, head : bytes, cfg_read : ReadSettings) -> None:
+	"""raise `FileSkipped` if a file of `size` bytes, starting with `head`, should not be scanned"""
+	if cfg_read.max_file_size is not None and size > cfg_read.max_file_size:
+		raise FileSkipped(f'larger than {cfg_read.max_file_size} bytes ({size} bytes)')
+	# same heuristic as git: text files dont contain NUL bytes
+	if b'\0' in head[:cfg_read.binary_check]:
+		raise FileSkipped('binary')
+
+
+# number of invalid utf-8 sequences replaced or ignored so far in this process, see `get_decode_errors()`
+_decode_errors_count : int = 0
+
+def get_decode_errors(encoding_errors : str) -> str:
+	"""name of a codec error handler which does the same as `encoding_errors`, but also counts invalid sequences in `_decode_errors_count`
+
+	this lets files be decoded in a single pass, while still finding out which ones had invalid bytes
+	"""
+	if encoding_errors == 'strict':
+		return encoding_errors
+
+	name : str = f'inline_todo.{encoding_errors}'
+	try:
+		codecs.lookup_error(name)
+	except LookupError:
+		handler_base : Callable[[UnicodeError], Tuple[str,int]] = codecs.lookup_error(encoding_errors)
+
+		def handler(exc : UnicodeError) -> Tuple[str,int]:
+			global _decode_errors_count
+			_decode_errors_count += 1
+			return handler_base(exc)
+
+		codecs.register_error(name, handler)
+	return name
+
+
+def read_file_bytes(filename : str) -> bytes:
+	"""read the whole of `filename`, the default reader for `iter_prefetch()`"""
+	with open(filename, 'rb') as f:
+		return f.read()
+
+
+def iter_prefetch(
+		files : Iterable[str],
+		threads : int,
+		depth : int,
+		reader : Callable[[str], Optional[bytes]] = read_file_bytes,
+	) -> Iterator[Tuple[str, Optional[bytes]]]:
+	"""yield `(file, contents)` for each of `files`, in order, while a pool of `threads` threads reads up to `depth` files ahead
+
+	on slow (network) filesystems, this lets scanning run while the next files are being read, so wall time approaches the larger of read and scan time instead of their sum. memory use is bounded by `depth` files. an error reading a file is raised when that file's turn comes, as if it had been read then.
+
+	### Parameters:
+	 - `files : Iterable[str]`
+	   files to read, consumed lazily
+	 - `threads : int`
+	   number of reader threads
+	 - `depth : int`
+	   maximum number of files read (or being read) ahead of the consumer
+	 - `reader : Callable[[str], Optional[bytes]]`
+	   reads a whole file, can be replaced to simulate slow storage. may return `None` to leave reading a file to the consumer
+	   (defaults to `read_file_bytes`)
+	"""
+	from collections import deque
+	from concurrent.futures import ThreadPoolExecutor, Future
+
+	files_iter : Iterator[str] = iter(files)
+	pool : ThreadPoolExecutor = ThreadPoolExecutor(max_workers = max(1, threads), thread_name_prefix = 'itodo-prefetch')
+	pending : Deque[Tuple[str, Future]] = deque(
+		(file, pool.submit(reader, file))
+		for file in islice(files_iter, max(1, depth))
+	)
+	try:
+		while pending:
+			file, future = pending.popleft()
+			# keep the queue full before waiting on the oldest read
+			for file_next in islice(files_iter, 1):
+				pending.append((file_next, pool.submit(reader, file_next)))
+			yield file, future.result()
+	finally:
+		# stopped early or failed: dont wait for reads nobody will use
+		for _,future in pending:
+			future.cancel()
+		pool.shutdown(wait = False)
+
+
+class CommentTokenizer(NamedTuple):
+	"""compiled form of a `CommentSyntax`, see `get_comment_tokenizer()`"""
+	# matches the next comment or string literal. for comments, `lastgroup` is `line` or `block<i>`
+	pattern : re.Pattern
+	# matches the first character of any comment or string
+	firsts : re.Pattern
+	# end marker of each `block<i>` group
+	block_ends : Dict[str,str]
+
+
+# compiled tokenizers by language, built when first needed
+_comment_tokenizers : Dict[str,CommentTokenizer] = dict()
+
+def get_comment_tokenizer(filename : str) -> Optional[CommentTokenizer]:
+	"""tokenizer for the language of `filename` (by extension, see `MAP_EXTENSION_TO_LANGUAGE`), or `None` if there is none in `COMMENT_SYNTAX`
+
+	a single regex matches whichever comment or string literal starts first, so one left-to-right pass over the file finds every comment, and markers inside strings (or inside other comments) are skipped over with them. the regex starts with a class of the first characters of all markers, which lets the regex engine skip over code quickly -- each alternative then checks that character with a lookbehind.
+	"""
+	language : Optional[str] = MAP_EXTENSION_TO_LANGUAGE.get(filename.split('.')[-1])
+	if language is None or language not in COMMENT_SYNTAX:
+		return None
+
+	if language not in _comment_tokenizers:
+		syntax : CommentSyntax = COMMENT_SYNTAX[language]
+		# (first character, regex of the rest) of each alternative
+		parts : List[Tuple[str,str]] = list()
+		block_ends : Dict[str,str] = dict()
+		for i,(block_start,block_end) in enumerate(syntax.block):
+			# unterminated block comments run to the end of the file
+			parts.append((block_start[0], rf'(?P<block{i}>{re.escape(block_start[1:])}[\s\S]*?(?:{re.escape(block_end)}|\Z))'))
+			block_ends[f'block{i}'] = block_end
+		for marker in syntax.line:
+			not_after : str = f'(?<!{syntax.line_not_after}{re.escape(marker[0])})' if syntax.line_not_after else ''
+			parts.append((marker[0], rf'{not_after}(?P<line>{re.escape(marker[1:])}[^\n]*)'))
+		parts.extend(syntax.strings)
+
+		firsts : str = ''.join(sorted(set(re.escape(first) for first,_ in parts)))
+		_comment_tokenizers[language] = CommentTokenizer(
+			pattern = re.compile(
+				f'[{firsts}](?:'
+				+ '|'.join(f'(?<={re.escape(first)}){rest}' for first,rest in parts)
+				+ ')'
+			),
+			firsts = re.compile(f'[{firsts}]'),
+			block_ends = block_ends,
+		)
+
+	return _comment_tokenizers[language]
+
+
+def _scrape_items_comments(
+		filename : str,
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		tokenizer : CommentTokenizer,
+		stats : Optional[Dict[str,int]] = None,
+		data : Optional[bytes] = None,
+	) -> List[TodoItem]:
+	"""`scrape_items()` engine which only looks for tags inside comments, found with `tokenizer`
+
+	the whole file (or `data`, if given) is decoded, then occurrences of tags drive the work: the tokenizer is only advanced as far as the next occurrence which could be in a search window, and only comment lines containing one are searched. so files without tags are never tokenized, and neither is the rest of a file after its last tag.
+
+	on each line of a comment, the first `max_search_len` characters are searched -- counting from the comment marker on the first line, and from the start of the line on the following lines of a block comment. at most one item is made per line.
+	"""
+
+	if data is None:
+		with open(filename, 'rb') as f:
+			# checked before reading, so oversize files are never read
+			_check_file(os.fstat(f.fileno()).st_size, b'', cfg_read)
+			data = f.read()
+	_check_file(len(data), data, cfg_read)
+
+	text : str = data.decode('utf-8', get_decode_errors(cfg_read.encoding_errors))
+	if '\r' in text:
+		# same as reading in text mode
+		text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+	if stats is not None:
+		stats['bytes'] = len(data)
+		stats['lines'] = text.count('\n') + (0 if text.endswith('\n') or not text else 1)
+
+	td_items : List[TodoItem] = list()
+	if not matcher.tags:
+		return td_items
+
+	# context is loaded later, and only if needed
+	max_context_lines : Optional[int] = cfg_read.max_context_lines
+	max_search_len : int = matcher.max_search_len
+	size : int = len(text)
+
+	tokens : Iterator[re.Match] = tokenizer.pattern.finditer(text)
+	tok_start : int = -1
+	tok_end : int = -1
+	kind : Optional[str] = None # `None` for string literals
+
+	lineNum : int = 0 # (0-indexed) line number of `pos_counted`
+	pos_counted : int = 0
+	lineNum_last : int = -1 # line of the last item
+	seg_last : int = -1 # start of the last comment line searched
+
+	for m_tag in matcher.pattern_any.finditer(text):
+		pos : int = m_tag.start()
+
+		# a search window starts at the start of a line or at a comment marker, dont tokenize for tags which cant be in one
+		line_start : int = text.rfind('\n', 0, pos) + 1
+		if pos - line_start >= max_search_len and tokenizer.firsts.search(text, max(line_start, pos - max_search_len + 1), pos) is None:
+			continue
+
+		# advance to the first token not ending before the tag
+		while tok_end <= pos:
+			tok : Optional[re.Match] = next(tokens, None)
+			if tok is None:
+				# the rest of the file is code
+				return td_items
+			(tok_start, tok_end), kind = tok.span(), tok.lastgroup
+
+		if pos < tok_start or kind is None:
+			# in code, or in a string
+			continue
+
+		# the line of the comment containing the tag
+		seg_start : int = max(tok_start, line_start)
+		if seg_start == seg_last:
+			continue
+		seg_last = seg_start
+
+		end : int = tok_end
+		if kind != 'line':
+			block_end : str = tokenizer.block_ends[kind]
+			if text.endswith(block_end, tok_start, end) and end - tok_start > len(block_end):
+				# leave the end marker out of the content
+				end -= len(block_end)
+		seg_end : int = text.find('\n', seg_start, end)
+		if seg_end == -1:
+			seg_end = end
+
+		found : Optional[Tuple[int,int]] = matcher.search(text, seg_start, min(seg_end, seg_start + max_search_len))
+		if found is None:
+			continue
+
+		lineNum += text.count('\n', pos_counted, seg_start)
+		pos_counted = seg_start
+		if lineNum == lineNum_last:
+			continue
+		lineNum_last = lineNum
+
+		tag : str = matcher.tags[found[0]]
+		line_end : int = text.find('\n', seg_start) + 1 or size
+		td_items.append(TodoItem(
+			tag = tag,
+			file = filename,
+			lineNum = lineNum + 1,
+			line = text[line_start:line_end],
+			context_lines = max_context_lines,
+			content = TodoItem.extract_content(text[found[1]:seg_end], tag),
+		))
+
+	return td_items
+
+
+def _scrape_lines(
+		filename : str,
+		lines : Iterable[str],
+		matcher : TagMatcher,
+		max_context_lines : Optional[int],
+	) -> Tuple[List[TodoItem], int]:
+	"""check every line of `lines` for tags, returning the items found and the number of lines"""
 	td_items : List[TodoItem] = list()
+	lineNum : int = -1
+	# on every line, check for tags
+	for lineNum,line in enumerate(lines):
+		# the first tag from `tags` will be used as the identifying one
+		tag : Optional[str] = matcher.match(line)
+		if tag is None:
+			continue
+
+		td_items.append(TodoItem(
+			tag = tag,
+			file = filename,
+			lineNum = lineNum + 1,
+			line = line,
+			context_lines = max_context_lines,
+		))
+
+	return td_items, lineNum + 1
+
+
+def _scrape_items_lines(
+		filename : str,
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		stats : Optional[Dict[str,int]] = None,
+		data : Optional[bytes] = None,
+	) -> List[TodoItem]:
+	"""`scrape_items()` engine which reads and decodes the whole file (or `data`, if given), then checks every line"""
 
+	td_items : List[TodoItem]
+	num_lines : int
+	size : int
 		
-	max_context_lines : Optional[int] = cfg_read['context']['lines'] if cfg_read['context']['enabled'] else None
+	# context is loaded later, and only if needed
+	max_context_lines : Optional[int] = cfg_read.max_context_lines
+	errors : str = get_decode_errors(cfg_read.encoding_errors)
+
+	if data is not None:
+		size = len(data)
+		_check_file(size, data, cfg_read)
+		# `newline = None` translates line endings the same way as reading the file in text mode
+		td_items, num_lines = _scrape_lines(filename, StringIO(data.decode('utf-8', errors), newline = None), matcher, max_context_lines)
+	else:
+		with open(filename, 'rb', buffering = max(DEFAULT_BUFFER_SIZE, cfg_read.binary_check)) as f:
+			size = os.fstat(f.fileno()).st_size
+			# `peek` fills the buffer without consuming it, so the file is still only read once
+			_check_file(size, f.peek(cfg_read.binary_check) if cfg_read.binary_check > 0 else b'', cfg_read)
+			with TextIOWrapper(f, encoding = 'utf-8', errors = errors, newline = None) as f_text:
+				td_items, num_lines = _scrape_lines(filename, f_text, matcher, max_context_lines)
 
-	with open(filename, 'r', encoding='utf-8') as f:
-		lst_lines : List[str] = f.readlines()
-		lst_lines_stripped : List[str] = [
-			x.strip()
-			for x in lst_lines
-		]
+	if stats is not None:
+		stats['bytes'] = size
+		stats['lines'] = num_lines
 
-		# on every line, check for each tag
-		for lineNum,line in enumerate(lst_lines):
-			for tag in cfg_read['tags']['list']:
-				if tag in line[:cfg_read['MAX_SEARCH_LEN']]:
-					
-					if max_context_lines is not None:
-						context = scrape_context(
-							lineNum = lineNum,
-							max_context_lines = max_context_lines,
-							lst_lines = lst_lines,
-							lst_lines_stripped = lst_lines_stripped,
-						)
-					else:
-						context = None
-
-					# the first tag from `tags` will be used as the identifying one
-					td_items.append(TodoItem(
-						tag = tag,
-						file = filename,
-						lineNum = lineNum + 1,
-						line = line,
-						context = context,
-					))
-					break
+	return td_items
+
+def _scrape_items_mmap(
+		filename : str,
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		stats : Optional[Dict[str,int]] = None,
+		data : Optional[bytes] = None,
+	) -> List[TodoItem]:
+	"""`scrape_items()` engine which memory-maps the file and searches the raw bytes for tags
+
+	only lines containing a candidate tag are decoded, and line numbers are found by counting newlines up to each match. gives the same items as `_scrape_items_lines()`, except that invalid utf-8 outside of decoded lines is neither an error nor counted. if `data` is given, it is searched instead of the file.
+
+	files containing `\r` are handed to `_scrape_items_lines()`, since text mode translates those to newlines.
+	"""
+
+	if not matcher.tags and stats is None:
+		return list()
+
+	mm : Optional[mmap.mmap] = None
+	if data is None:
+		with open(filename, 'rb') as f:
+			# checked before mapping, so oversize files are never touched
+			_check_file(os.fstat(f.fileno()).st_size, b'', cfg_read)
+			try:
+				mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+			except ValueError:
+				# empty file
+				data = b''
+
+	if mm is None:
+		_check_file(len(data), data, cfg_read) # type: ignore
+		return _scrape_buffer(filename, data, cfg_read, matcher, stats, data) # type: ignore
+	with mm:
+		_check_file(len(mm), mm[:cfg_read.binary_check], cfg_read)
+		return _scrape_buffer(filename, mm, cfg_read, matcher, stats)
+
+
+def _scrape_buffer(
+		filename : str,
+		buf : Union[bytes, mmap.mmap],
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		stats : Optional[Dict[str,int]] = None,
+		data : Optional[bytes] = None,
+	) -> List[TodoItem]:
+	"""search the contents `buf` of `filename` for tags, see `_scrape_items_mmap()`. `data` is passed on if falling back to `_scrape_items_lines()`"""
+
+	td_items : List[TodoItem] = list()
+	size : int = len(buf)
+	if size == 0:
+		if stats is not None:
+			stats['bytes'] = stats['lines'] = 0
+		return td_items
+
+	if buf.find(b'\r') != -1:
+		return _scrape_items_lines(filename, cfg_read, matcher, stats, data)
+
+	# context is loaded later, and only if needed
+	max_context_lines : Optional[int] = cfg_read.max_context_lines
+	# a character is at most 4 bytes in utf-8, so a tag starting further in than this cant be in the search window
+	max_search_bytes : int = 4 * matcher.max_search_len
+	errors : str = get_decode_errors(cfg_read.encoding_errors)
+
+	pos : int = 0 # start of the line to search from
+	lineNum : int = 0 # (0-indexed) line number of `pos_counted`
+	pos_counted : int = 0
+
+	while pos < size and matcher.tags:
+		m : Optional[re.Match] = matcher.pattern_bytes.search(buf, pos)
+		if m is None:
+			break
+
+		line_start : int = buf.rfind(b'\n', pos, m.start()) + 1 or pos
+		line_end : int = buf.find(b'\n', m.start()) + 1 or size
+		pos = line_end
+
+		if m.start() - line_start >= max_search_bytes:
+			continue
+
+		lineNum += buf[pos_counted:line_start].count(b'\n')
+		pos_counted = line_start
+
+		line : str = buf[line_start:line_end].decode('utf-8', errors)
+		tag : Optional[str] = matcher.match(line)
+		if tag is None:
+			continue
+
+		td_items.append(TodoItem(
+			tag = tag,
+			file = filename,
+			lineNum = lineNum + 1,
+			line = line,
+			context_lines = max_context_lines,
+		))
+
+	if stats is not None:
+		# count all lines the way `readlines()` would, including a last line without a newline
+		stats['bytes'] = size
+		stats['lines'] = (
+			lineNum
+			+ buf[pos_counted:].count(b'\n')
+			+ (0 if buf[size - 1:] == b'\n' else 1)
+		)
 
 	return td_items
 
+
+# a problem with one file: kind ('skipped', 'error', or 'encoding' for invalid utf-8 which was replaced or ignored), and details
+FileIssue = Tuple[str, str]
+
+def _iter_scrape_chunk(
+		files_chunk : List[str],
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		profile : bool = False,
+	) -> Iterator[Tuple[List[TodoItem], Optional[Dict[str,Any]], Optional[FileIssue]]]:
+	"""scrape every file in `files_chunk` in order, yielding its items, a dict of stats if `profile` is set (otherwise `None`), and any issue with the file
+
+	a file which is skipped or cant be read has no items, and doesnt stop the others from being scanned.
+
+	if `cfg_read.prefetch_threads` is set, files are read ahead by `iter_prefetch()` while earlier ones are scanned. the time in the stats then only includes waiting for a file, not all of reading it.
+	"""
+
+	def reader(filename : str) -> Optional[bytes]:
+		# oversize files arent read at all, and errors are raised again (in order) by `scrape_items()`
+		try:
+			if cfg_read.max_file_size is not None and os.stat(filename).st_size > cfg_read.max_file_size:
+				return None
+			return read_file_bytes(filename)
+		except OSError:
+			return None
+
+	files_data : Iterable[Tuple[str, Optional[bytes]]] = (
+		iter_prefetch(files_chunk, cfg_read.prefetch_threads, cfg_read.prefetch_depth, reader)
+		if cfg_read.prefetch_threads > 0
+		else ((file, None) for file in files_chunk)
+	)
+
+	for file,data in files_data:
+		stats : Optional[Dict[str,Any]] = dict() if profile else None
+		issue : Optional[FileIssue] = None
+		decode_errors_start : int = _decode_errors_count
+		t0 : float = time.perf_counter()
+		c0 : float = time.process_time()
+
+		file_items : List[TodoItem] = list()
+		try:
+			file_items = scrape_items(file, cfg_read, matcher, stats, data)
+		except FileSkipped as e:
+			issue = ('skipped', str(e))
+		except (OSError, UnicodeDecodeError) as e:
+			issue = ('error', f'{type(e).__name__}: {e}')
+
+		if issue is None and _decode_errors_count > decode_errors_start:
+			issue = ('encoding', f'{_decode_errors_count - decode_errors_start} invalid utf-8 sequences {cfg_read.encoding_errors}d')
+
+		if stats is not None:
+			stats['time_s'] = time.perf_counter() - t0
+			stats['cpu_s'] = time.process_time() - c0
+			stats['matches'] = len(file_items)
+		yield file_items, stats, issue
+
+
+def _scrape_chunk(
+		files_chunk : List[str],
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		profile : bool = False,
+	) -> Tuple[List[List[TodoItem]], List[Dict[str,Any]], List[Optional[FileIssue]]]:
+	"""scrape every file in `files_chunk`, used as the unit of work for the process pool
+
+	returns a list of items for each file, if `profile` is set a dict of stats for each file (otherwise an empty list), and the issue with each file, if any
+	"""
+	items_perfile : List[List[TodoItem]] = list()
+	stats_perfile : List[Dict[str,Any]] = list()
+	issues_perfile : List[Optional[FileIssue]] = list()
+	for file_items,stats,issue in _iter_scrape_chunk(files_chunk, cfg_read, matcher, profile):
+		items_perfile.append(file_items)
+		if stats is not None:
+			stats_perfile.append(stats)
+		issues_perfile.append(issue)
+
+	return items_perfile, stats_perfile, issues_perfile
+
+
+# files to scrape, with the settings and compiled matcher to scrape them with
+ScrapeGroup = Tuple[List[str], ReadSettings, TagMatcher]
+
+def _iter_scrape_groups(
+		groups : List[ScrapeGroup],
+		jobs : int,
+		file_stats : Optional[Dict[str, Dict[str,Any]]] = None,
+		file_issues : Optional[Dict[str, FileIssue]] = None,
+	) -> Iterator[List[TodoItem]]:
+	"""scrape the files of every group, through one shared pool if `jobs > 1`, yielding one list of items per file (group by group, in order) as soon as it is available
+
+	if `file_stats` is given, per-file scan stats are added to it. if `file_issues` is given, files which were skipped, couldnt be read, or had invalid utf-8 are added to it -- before their items are yielded
+	"""
+
+	profile : bool = file_stats is not None
+	num_files : int = sum(len(files) for files,_,_ in groups)
+
+	# serial path -- not worth spinning up a pool
+	if jobs <= 1 or num_files < 2:
+		for files_search,cfg_read,matcher in groups:
+			for file,(file_items,stats,issue) in zip(files_search, _iter_scrape_chunk(files_search, cfg_read, matcher, profile)):
+				if file_stats is not None:
+					file_stats[file] = stats # type: ignore
+				if file_issues is not None and issue is not None:
+					file_issues[file] = issue
+				yield file_items
+		return
+
+	# several chunks per worker, so that one slow chunk doesnt stall the pool. chunks dont cross groups
+	chunk_size : int = max(1, -(-num_files // (jobs * 4)))
+	chunks : List[ScrapeGroup] = [
+		(files_search[i:i + chunk_size], cfg_read, matcher)
+		for files_search,cfg_read,matcher in groups
+		for i in range(0, len(files_search), chunk_size)
+	]
+
+	from concurrent.futures import ProcessPoolExecutor
+
+	# `map` yields results in submission order, which keeps the output deterministic
+	with ProcessPoolExecutor(max_workers = min(jobs, len(chunks))) as pool:
+		for (chunk,_,_),(chunk_items,chunk_stats,chunk_issues) in zip(chunks, pool.map(
+				_scrape_chunk,
+				[c[0] for c in chunks],
+				[c[1] for c in chunks],
+				[c[2] for c in chunks],
+				[profile] * len(chunks),
+			)):
+			if file_stats is not None:
+				file_stats.update(zip(chunk, chunk_stats))
+			if file_issues is not None:
+				file_issues.update(
+					(file, issue)
+					for file,issue in zip(chunk, chunk_issues)
+					if issue is not None
+				)
+			yield from chunk_items
+
+
+def _scrape_files(
+		files_search : List[str],
+		cfg_read : ReadSettings,
+		matcher : TagMatcher,
+		jobs : int,
+		file_stats : Optional[Dict[str, Dict[str,Any]]] = None,
+		file_issues : Optional[Dict[str, FileIssue]] = None,
+	) -> List[List[TodoItem]]:
+	"""scrape `files_search`, possibly in parallel, returning one list of items per file"""
+	return list(_iter_scrape_groups([(files_search, cfg_read, matcher)], jobs, file_stats, file_issues))
+
+
+def iter_search_groups(
+		groups : List[Tuple[List[str], Union[ReadSettings, Mapping[str,Any]], Optional['ScanCache']]],
+		jobs : Optional[int] = 1,
+		file_stats : Optional[Dict[str, Dict[str,Any]]] = None,
+		file_issues : Optional[Dict[str, FileIssue]] = None,
+	) -> Iterator[Tuple[int, str, List[TodoItem]]]:
+	"""search several groups of files, each with its own read settings and (optional) cache, through one shared worker pool
+
+	yields `(group index, file, items)` for each file, group by group and in the order of each group's files, as soon as that file is done. files which are cached are yielded immediately when their turn comes. caches are updated as files are yielded, so stopping early leaves them with only the files seen so far.
+
+	files with issues (see `FileIssue`) are added to `file_issues` if given, and are never cached, so that they are reported again on the next run
+	"""
+
+	if jobs is None:
+		jobs = os.cpu_count() or 1
+	if file_issues is None:
+		file_issues = dict()
+
+	groups_scrape : List[ScrapeGroup] = list()
+	groups_cached : List[Dict[str, List[TodoItem]]] = list()
+	stats_scrape : Dict[str, os.stat_result] = dict()
+	for files_search,cfg_read,cache in groups:
+		# resolved once, then cheap to read (and pickle) for every file
+		cfg_read = ReadSettings.coerce(cfg_read)
+
+		# figure out which files actually need scraping
+		items_cached : Dict[str, List[TodoItem]] = dict()
+		if cache is not None:
+			for file in files_search:
+				cached : Optional[List[TodoItem]] = cache.get(file)
+				if cached is not None:
+					items_cached[file] = cached
+				else:
+					# taken before the file is read, for `ScanCache.put()`
+					try:
+						stats_scrape[file] = os.stat(file)
+					except OSError:
+						pass
+		groups_cached.append(items_cached)
+
+		# compile the tags once for the whole run
+		groups_scrape.append((
+			[ file for file in files_search if file not in items_cached ],
+			cfg_read,
+			TagMatcher.from_config(cfg_read),
+		))
+
+	items_scraped : Iterator[List[TodoItem]] = _iter_scrape_groups(groups_scrape, jobs, file_stats, file_issues)
+
+	# merge back in the order of each group. scraped files come out in the same relative order
+	for idx,((files_search,_,cache),items_cached) in enumerate(zip(groups, groups_cached)):
+		for file in files_search:
+			if file in items_cached:
+				yield idx, file, items_cached[file]
+			else:
+				file_items : List[TodoItem] = next(items_scraped)
+				if cache is not None and file not in file_issues and file in stats_scrape:
+					cache.put(file, file_items, stats_scrape[file])
+				yield idx, file, file_items
+
+
+def iter_search_files(
+		files_search : List[str],
+		cfg_read : Union[ReadSettings, Mapping[str,Any]],
+		jobs : Optional[int] = 1,
+		cache : Optional['ScanCache'] = None,
+		file_stats : Optional[Dict[str, Dict[str,Any]]] = None,
+		file_issues : Optional[Dict[str, FileIssue]] = None,
+	) -> Iterator[Tuple[str, List[TodoItem]]]:
+	"""like `search_files()`, but yields `(file, items)` for each file in `files_search`, in order, as soon as that file is done. see `iter_search_groups()`"""
+	for _,file,file_items in iter_search_groups([(files_search, cfg_read, cache)], jobs, file_stats, file_issues):
+		yield file, file_items
+
+
 def search_files(
 		files_search : List[str],
-		cfg_read : DictConfig,
+		cfg_read : Union[ReadSettings, Mapping[str,Any]],
+		jobs : Optional[int] = 1,
+		cache : Optional['ScanCache'] = None,
+		file_stats : Optional[Dict[str, Dict[str,Any]]] = None,
+		file_issues : Optional[Dict[str, FileIssue]] = None,
 	) -> List[TodoItem]:
 	"""### search_files
 	
 	search files in `files_search` for valid todo comments
+
+	if `jobs` is greater than 1, the file list is split into contiguous chunks which are scraped by a process pool. chunks are merged back in order, so the output is identical to the serial path.
+
+	if a `cache` is given, only files which changed since they were cached are scraped, and the cache is updated with the new results.
+
+	see `iter_search_files()` for getting items file by file as they are scraped
 		
 	### Parameters:
 	 - `files_search : List[str]`   
 	   list of filenames to search
-	 - `cfg_read : DictConfig`
-	   config 'read' section
+	 - `cfg_read : Union[ReadSettings, Mapping[str,Any]]`
+	   resolved read settings, or a `read` config section to resolve
+	 - `jobs : Optional[int]`
+	   number of worker processes. `None` uses `os.cpu_count()`
+	   (defaults to `1`)
+	 - `cache : Optional[ScanCache]`
+	   cache of previously scraped items
+	   (defaults to `None`)
+	 - `file_stats : Optional[Dict[str, Dict[str,Any]]]`
+	   if given, time, cpu time, bytes, lines and matches of each scraped file (not cache hits) are added to it
+	   (defaults to `None`)
+	 - `file_issues : Optional[Dict[str, FileIssue]]`
+	   if given, files which were skipped (too large or binary), couldnt be read, or had invalid utf-8 are added to it. such files have no items, but dont stop the search
+	   (defaults to `None`)
 	
 	### Returns:
 	 - `List[TodoItem]` 
-	   list of inline comments scraped. not guaranteed to be in any particular order.
+	   list of inline comments scraped, in the order of `files_search`
 	"""	
-
-
 	td_items : List[TodoItem] = list()
-
-	# loop over every file
-	for file in files_search:
-		td_items.extend(scrape_items(file, cfg_read))
+	for _,file_items in iter_search_files(files_search, cfg_read, jobs, cache, file_stats, file_issues):
+		td_items.extend(file_items)
 	
 	return td_items
 
 
-"""
-########  ########   #######   ######
-##     ## ##     ## ##     ## ##    ##
-##     ## ##     ## ##     ## ##
-########  ########  ##     ## ##
-##        ##   ##   ##     ## ##
-##        ##    ##  ##     ## ##    ##
-##        ##     ##  #######   ######
-"""
-
+class ScanCache(object):
+	"""on-disk cache of scraped items, keyed by file path
 
-def split_byTag(td_items : List[TodoItem]) -> Dict[str, List[TodoItem]]:
-	"""given a list of items, returns a dict of list where keys are tags
-	
-	REVIEW: `split_by_attribute()` does this and more, code should be removed at some point 
+	an entry is valid if the file's size and mtime are unchanged. if `use_hash` is set, an entry whose mtime changed (but not its size) is still valid if the hash of the file contents matches -- useful in CI, where checkouts reset mtimes.
 
+	the whole cache is dropped if any of the read settings which affect the scraped items (anything except `source_files` and `exclude`) change.
 	"""
-	items_byTag : Dict[str, List[TodoItem]] = dict()
 
-	for x in td_items:
-		if x.tag not in items_byTag:
-			items_byTag[x.tag] = list()
-		items_byTag[x.tag].append(x)
-	
-	return items_byTag
+	VERSION : int = 3
+	FILENAME : str = 'scan.json'
 
+	def __init__(
+			self,
+			cache_dir : str,
+			cfg_read : ReadSettings,
+			use_hash : bool = False,
+			filename : Optional[str] = None,
+		) -> None:
+		"""load the cache from `cache_dir`, if it exists and matches `cfg_read`
+		
+		### Parameters:
+		 - `cache_dir : str`   
+		   directory to store the cache in
+		 - `cfg_read : ReadSettings`   
+		   read settings, used to invalidate the cache
+		 - `use_hash : bool`   
+		   also compare hashes of file contents
+		   (defaults to `False`)
+		 - `filename : Optional[str]`   
+		   name of the cache file in `cache_dir`, for keeping separate caches (one per search root, for example)
+		   (defaults to `None`, meaning `ScanCache.FILENAME`)
+		"""
+		self.cache_dir : str = cache_dir
+		self.path : str = os.path.join(cache_dir, filename or self.FILENAME)
+		self.use_hash : bool = use_hash
+		self.read_key : str = self.get_read_key(cfg_read)
+		self.context_lines : Optional[int] = cfg_read.max_context_lines
+		self.max_file_size : Optional[int] = cfg_read.max_file_size
+
+		self.hits : int = 0
+		self.misses : int = 0
+
+		# entries for files seen in this run, anything else is dropped on save
+		self.entries : Dict[str, Dict[str,Any]] = dict()
+		self.entries_old : Dict[str, Dict[str,Any]] = dict()
+
+		try:
+			with open(self.path, 'r', encoding = 'utf-8') as fin:
+				data : Dict[str,Any] = json.load(fin)
+			if data.get('version') == self.VERSION and data.get('read_key') == self.read_key:
+				self.entries_old = data['files']
+		except (OSError, ValueError, KeyError):
+			pass
+
+	@staticmethod
+	def get_read_key(cfg_read : ReadSettings) -> str:
+		"""hash of the parts of the read settings which affect scraped items"""
+		relevant : Dict[str,Any] = {
+			k : v
+			for k,v in cfg_read._asdict().items()
+			if k not in ('source_files', 'exclude', 'prefetch_threads', 'prefetch_depth')
+		}
+		import hashlib
+		return hashlib.sha1(
+			json.dumps(relevant, sort_keys = True).encode('utf-8')
+		).hexdigest()
+
+	@staticmethod
+	def hash_file(filename : str, max_size : Optional[int] = None) -> Optional[str]:
+		"""sha1 of the contents of `filename`, or `None` if it is larger than `max_size` -- such files are not scanned, so there is no point reading them"""
+		import hashlib
+		with open(filename, 'rb') as f:
+			if max_size is not None and os.fstat(f.fileno()).st_size > max_size:
+				return None
+			return hashlib.sha1(f.read()).hexdigest()
+
+	def get(self, filename : str) -> Optional[List[TodoItem]]:
+		"""return cached items for `filename`, or `None` if missing or stale"""
+		entry : Optional[Dict[str,Any]] = self.entries_old.get(filename)
+		try:
+			st : os.stat_result = os.stat(filename)
+		except OSError:
+			entry = None
+
+		if entry is not None and entry['size'] == st.st_size:
+			if entry['mtime_ns'] != st.st_mtime_ns:
+				hash_ : Optional[str] = self.hash_file(filename, self.max_file_size) if self.use_hash else None
+				if hash_ is not None and entry.get('hash') == hash_:
+					entry['mtime_ns'] = st.st_mtime_ns
+				else:
+					entry = None
+		else:
+			entry = None
+
+		if entry is None:
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		self.entries[filename] = entry
+		return [
+			TodoItem(
+				tag = tag,
+				file = filename,
+				lineNum = lineNum,
+				content = content,
+				# only stored if context is disabled, in which case it is the raw line
+				context = context,
+				context_lines = self.context_lines,
+			)
+			for tag,lineNum,content,context in entry['items']
+		]
 
-def get_sortkey_from_attr(attr : TodoItem.Attr) -> Callable[[TodoItem], Any]:
-	"""return a function that will sort a list of items by a given attribute"""
-	if attr == 'tag':
-		# if `tag` is the sort key, sort by the order of tags in the default config
-		return lambda x: CONFIG_DEFAULT['read']['tags']['list'].index(x.tag)
-	elif attr == 'line':
+	def put(self, filename : str, td_items : List[TodoItem], st : Optional[os.stat_result] = None) -> None:
+		"""store freshly scraped `td_items` for `filename`
+
+		`st` should be the stat of the file from before it was read, so that if it is edited during the scan, the entry is stale and the file is scanned again next time. if `None`, the file is stat'ed now
+		"""
+		if st is None:
+			try:
+				st = os.stat(filename)
+			except OSError:
+				return
+
+		entry : Dict[str,Any] = {
+			'mtime_ns' : st.st_mtime_ns,
+			'size' : st.st_size,
+			'items' : [
+				[ x.tag, x.lineNum, x.content, x._context if x.context_lines is None else None ]
+				for x in td_items
+			],
+		}
+		if self.use_hash:
+			try:
+				entry['hash'] = self.hash_file(filename, self.max_file_size)
+				st_now : os.stat_result = os.stat(filename)
+			except OSError:
+				return
+			# the hash has to be of the contents which were scanned
+			if (st_now.st_mtime_ns, st_now.st_size) != (st.st_mtime_ns, st.st_size):
+				return
+
+		self.entries[filename] = entry
+
+	def save(self) -> None:
+		"""write the cache to disk, atomically replacing the old one"""
+		os.makedirs(self.cache_dir, exist_ok = True)
+		path_tmp : str = self.path + '.tmp'
+		with open(path_tmp, 'w', encoding = 'utf-8') as fout:
+			json.dump(
+				{
+					'version' : self.VERSION,
+					'read_key' : self.read_key,
+					'files' : self.entries,
+				},
+				fout,
+			)
+		os.replace(path_tmp, self.path)
+
+	def stats_str(self) -> str:
+		total : int = self.hits + self.misses
+		rate : float = 100 * self.hits / total if total else 0.0
+		return f'cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)'
+
+
+def split_dirs(path : str, searchdir : str) -> Tuple[str, str]:
+	"""directory of `path` relative to `searchdir`, and the first component of it. both are `'.'` for files directly in `searchdir`"""
+	prefix : str = unixPath(os.path.join(searchdir, ''))
+	relpath : str = path[len(prefix):] if path.startswith(prefix) else unixPath(os.path.relpath(path, searchdir))
+	dirname : str = relpath.rsplit('/', 1)[0] if '/' in relpath else '.'
+	return dirname, dirname.split('/', 1)[0]
+
+
+class TodoIndex(object):
+	"""SQLite database of scraped items, for answering queries without rescanning or rendering
+
+	the `files` table holds the size, mtime and content hash of every indexed file, and `items` holds one row per item. items also store the directory of their file (relative to `searchDir`) and its top-level component, so that filters on directory prefixes and counts per directory are indexed lookups.
+
+	`refresh()` only rescans files whose size and mtime changed -- and of those, only ones whose content hash changed. like `ScanCache`, everything is dropped if the read settings which affect the scraped items change.
+	"""
+
+	VERSION : int = 1
+
+	SCHEMA : str = """
+		CREATE TABLE IF NOT EXISTS meta (
+			key TEXT PRIMARY KEY,
+			value TEXT
+		);
+		CREATE TABLE IF NOT EXISTS files (
+			path TEXT PRIMARY KEY,
+			mtime_ns INTEGER,
+			size INTEGER,
+			hash TEXT
+		);
+		CREATE TABLE IF NOT EXISTS items (
+			file TEXT,
+			dir TEXT,
+			topdir TEXT,
+			tag TEXT,
+			lineNum INTEGER,
+			content TEXT
+		);
+		CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+		CREATE INDEX IF NOT EXISTS items_file ON items (file, lineNum);
+		CREATE INDEX IF NOT EXISTS items_tag_dir ON items (tag, dir);
+		CREATE INDEX IF NOT EXISTS items_dir ON items (dir);
+		CREATE INDEX IF NOT EXISTS items_topdir_tag ON items (topdir, tag);
+	"""
+
+	# attributes items can be filtered on or grouped by
+	GROUP_KEYS : Tuple[str, ...] = ('tag', 'file', 'dir', 'topdir')
+
+	def __init__(
+			self,
+			path : str,
+			cfg_read : ReadSettings,
+			searchdir : str,
+		) -> None:
+		"""open (or create) the index at `path`, clearing it if it was built with different read settings
+
+		### Parameters:
+		 - `path : str`   
+		   database file
+		 - `cfg_read : ReadSettings`   
+		   read settings, used to invalidate the index
+		 - `searchdir : str`   
+		   directory the indexed paths are under, used to find their directories
+		"""
+		import sqlite3
+
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		self.path : str = path
+		self.searchdir : str = searchdir
+		self.cfg_read : ReadSettings = cfg_read
+		self.conn : sqlite3.Connection = sqlite3.connect(path)
+		self.conn.execute('PRAGMA journal_mode = WAL')
+		self.conn.execute('PRAGMA synchronous = NORMAL')
+		self.conn.executescript(self.SCHEMA)
+
+		key : str = f'{self.VERSION}:{ScanCache.get_read_key(cfg_read)}'
+		row : Optional[Tuple[str]] = self.conn.execute("SELECT value FROM meta WHERE key = 'read_key'").fetchone()
+		if row is None or row[0] != key:
+			with self.conn:
+				self.conn.execute('DELETE FROM items')
+				self.conn.execute('DELETE FROM files')
+				self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('read_key', ?)", (key,))
+
+	def close(self) -> None:
+		self.conn.close()
+
+	def refresh(
+			self,
+			filenames : List[str],
+			jobs : Optional[int] = 1,
+			complete : bool = True,
+		) -> Dict[str,int]:
+		"""bring the index up to date with `filenames`, rescanning only files which changed
+		
+		### Parameters:
+		 - `filenames : List[str]`   
+		   files which should be in the index
+		 - `jobs : Optional[int]`   
+		   worker processes for rescanning, see `search_files()`
+		   (defaults to `1`)
+		 - `complete : bool`   
+		   whether `filenames` is every file which should be indexed. if so, indexed files not in it are removed -- this should be `False` when only some files were discovered, for example with `changed_since`
+		   (defaults to `True`)
+		
+		### Returns:
+		 - `Dict[str,int]` 
+		   counts of files `scanned`, `unchanged`, and `removed`
+		"""
+		known : Dict[str, Tuple[int,int,str]] = {
+			path : (mtime_ns, size, hash_)
+			for path,mtime_ns,size,hash_ in self.conn.execute('SELECT path, mtime_ns, size, hash FROM files')
+		}
+
+		files_scan : List[str] = list()
+		# taken before the file is read, see `store()`
+		stats_scan : Dict[str, os.stat_result] = dict()
+		# files whose contents are unchanged, but mtime isnt
+		files_touched : List[Tuple[int,str]] = list()
+		for file in filenames:
+			try:
+				st : os.stat_result = os.stat(file)
+			except OSError:
+				continue
+			entry : Optional[Tuple[int,int,str]] = known.get(file)
+			if entry is not None and entry[1] == st.st_size:
+				if entry[0] == st.st_mtime_ns:
+					continue
+				hash_ : Optional[str] = ScanCache.hash_file(file, self.cfg_read.max_file_size)
+				if hash_ is not None and entry[2] == hash_:
+					files_touched.append((st.st_mtime_ns, file))
+					continue
+			files_scan.append(file)
+			stats_scan[file] = st
+
+		files_removed : List[str] = (
+			sorted(set(known) - set(filenames))
+			if complete
+			else list()
+		)
+
+		with self.conn:
+			self.conn.executemany('UPDATE files SET mtime_ns = ? WHERE path = ?', files_touched)
+			self.conn.executemany('DELETE FROM items WHERE file = ?', ((x,) for x in files_removed))
+			self.conn.executemany('DELETE FROM files WHERE path = ?', ((x,) for x in files_removed))
+
+			for file,file_items in iter_search_files(files_scan, self.cfg_read, jobs):
+				self.store(file, file_items, stats_scan.get(file))
+
+		return {
+			'scanned' : len(files_scan),
+			'unchanged' : len(filenames) - len(files_scan),
+			'removed' : len(files_removed),
+		}
+
+	def store(self, file : str, td_items : List[TodoItem], st : Optional[os.stat_result] = None) -> None:
+		"""replace the indexed items of `file` with `td_items`. does not commit
+
+		`st` should be taken before the file was read -- like in `ScanCache.put()`, so that if the file changes while it is read, its mtime wont match on the next refresh, and it is rescanned. if `None`, the file is stat'ed now
+		"""
+		if st is None:
+			try:
+				st = os.stat(file)
+			except OSError:
+				return
+		hash_ : Optional[str] = ScanCache.hash_file(file, self.cfg_read.max_file_size)
+		try:
+			st_now : os.stat_result = os.stat(file)
+		except OSError:
+			return
+		# the hash has to be of the contents which were scanned, without one the file is always rescanned
+		if (st_now.st_mtime_ns, st_now.st_size) != (st.st_mtime_ns, st.st_size):
+			hash_ = None
+		dirname, topdir = split_dirs(file, self.searchdir)
+		self.conn.execute('DELETE FROM items WHERE file = ?', (file,))
+		self.conn.execute(
+			'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+			(file, st.st_mtime_ns, st.st_size, hash_),
+		)
+		self.conn.executemany(
+			'INSERT INTO items VALUES (?, ?, ?, ?, ?, ?)',
+			(
+				(file, dirname, topdir, x.tag, x.lineNum, x.content)
+				for x in td_items
+			),
+		)
+
+	def _where(
+			self,
+			tags : Sequence[str] = (),
+			under : Optional[str] = None,
+			files : Optional[Sequence[str]] = None,
+		) -> Tuple[str, List[Any]]:
+		"""`WHERE` clause and its parameters for the given filters. `files` are put in a temporary table"""
+		clauses : List[str] = list()
+		params : List[Any] = list()
+
+		if tags:
+			clauses.append(f'tag IN ({", ".join("?" * len(tags))})')
+			params.extend(tags)
+
+		if under is not None:
+			under = unixPath(os.path.normpath(under))
+			if under != '.':
+				# everything in `under`, or in a subdirectory of it. `0` is the character after `/`
+				clauses.append('(dir = ? OR (dir >= ? AND dir < ?))')
+				params.extend([under, under + '/', under + '0'])
+
+		if files is not None:
+			self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS query_files (path TEXT PRIMARY KEY)')
+			self.conn.execute('DELETE FROM query_files')
+			self.conn.executemany('INSERT OR IGNORE INTO query_files VALUES (?)', ((x,) for x in files))
+			clauses.append('file IN (SELECT path FROM query_files)')
+
+		return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+	def query_items(
+			self,
+			tags : Sequence[str] = (),
+			under : Optional[str] = None,
+			files : Optional[Sequence[str]] = None,
+		) -> Iterator[TodoItem]:
+		"""items matching all of the given filters, ordered by file and line
+		
+		### Parameters:
+		 - `tags : Sequence[str]`   
+		   only items with one of these tags, all tags if empty
+		   (defaults to `()`)
+		 - `under : Optional[str]`   
+		   only items in files under this directory, relative to `searchDir`
+		   (defaults to `None`)
+		 - `files : Optional[Sequence[str]]`   
+		   only items in these files
+		   (defaults to `None`)
+		"""
+		where, params = self._where(tags, under, files)
+		for file,tag,lineNum,content in self.conn.execute(
+				f'SELECT file, tag, lineNum, content FROM items{where} ORDER BY file, lineNum',
+				params,
+			):
+			yield TodoItem(
+				tag = tag,
+				file = file,
+				lineNum = lineNum,
+				content = content,
+				context_lines = self.cfg_read.max_context_lines,
+				# without context, it is just the line -- which isnt stored
+				context = None if self.cfg_read.context_enabled else content,
+			)
+
+	def count_by(
+			self,
+			keys : Sequence[str],
+			tags : Sequence[str] = (),
+			under : Optional[str] = None,
+			files : Optional[Sequence[str]] = None,
+		) -> List[Tuple[Any, ...]]:
+		"""number of items for each combination of values of `keys` (see `GROUP_KEYS`), as tuples of the values followed by the count. filters are as in `query_items()`"""
+		for k in keys:
+			if k not in self.GROUP_KEYS:
+				raise ValueError(f'cant group by {k}, expected one of {self.GROUP_KEYS}')
+		cols : str = ', '.join(keys)
+		where, params = self._where(tags, under, files)
+		return self.conn.execute(
+			f'SELECT {cols}, COUNT(*) FROM items{where} GROUP BY {cols} ORDER BY {cols}',
+			params,
+		).fetchall()
+
+
+"""
+########  ########   #######   ######
+##     ## ##     ## ##     ## ##    ##
+##     ## ##     ## ##     ## ##
+########  ########  ##     ## ##
+##        ##   ##   ##     ## ##
+##        ##    ##  ##     ## ##    ##
+##        ##     ##  #######   ######
+"""
+
+
+def split_byTag(td_items : List[TodoItem]) -> Dict[str, List[TodoItem]]:
+	"""given a list of items, returns a dict of list where keys are tags
+	
+	REVIEW: `split_by_attribute()` does this and more, code should be removed at some point 
+
+	"""
+	items_byTag : Dict[str, List[TodoItem]] = dict()
+
+	for x in td_items:
+		if x.tag not in items_byTag:
+			items_byTag[x.tag] = list()
+		items_byTag[x.tag].append(x)
+	
+	return items_byTag
+
+
+def get_sortkey_from_attr(
+		attr : TodoItem.Attr,
+		tag_order : Optional[Sequence[str]] = None,
+	) -> Callable[[TodoItem], Any]:
+	"""return a function that will sort a list of items by a given attribute
+	
+	### Parameters:
+	 - `attr : TodoItem.Attr`   
+	   attribute to sort by
+	 - `tag_order : Optional[Sequence[str]]`   
+	   order of tags, if sorting by `tag`. tags not in the list go last, alphabetically. if `None`, uses the order of tags in the default config
+	   (defaults to `None`)
+	"""
+	if attr == 'tag':
+		# if `tag` is the sort key, sort by the order of tags in the config
+		if tag_order is None:
+			tag_order = list(CONFIG_DEFAULT['read']['tags']['list'])
+		# first occurrence wins if a tag is listed twice
+		tag_index : Dict[str,int] = dict()
+		for idx,tag in enumerate(tag_order):
+			tag_index.setdefault(tag, idx)
+		n_tags : int = len(tag_order)
+		return lambda x: (tag_index.get(x.tag, n_tags), x.tag)
+	elif attr in ('line', 'lineNum'):
 		# if `line` is the sort key, sort by the order of lines in the file
 		return lambda x: x.lineNum
+	elif attr in ('file', 'content'):
+		return lambda x: x.__getattribute__(attr)
 	else:
 		# otherwise, convert to string and sort
-		return lambda x: str(x)
+		return lambda x: str(x.__getattribute__(attr))
+
+
+def sort_items(
+		td_items : Iterable[TodoItem],
+		attr_sort_order : List[SortableAttrTodoItems],
+		tag_order : Optional[Sequence[str]] = None,
+	) -> List[TodoItem]:
+	"""sort `td_items` by all of `attr_sort_order` at once, using a single composite key per item
+
+	ties keep their input order
+	"""
+	keyfuncs : List[Callable[[TodoItem], Any]] = [
+		get_sortkey_from_attr(attr, tag_order)
+		for attr in attr_sort_order
+	]
+	return sorted(
+		td_items,
+		key = lambda x: tuple(f(x) for f in keyfuncs),
+	)
+
+
+def group_sorted_items(
+		items_sorted : List[TodoItem],
+		attr : TodoItem.Attr,
+	) -> List[Tuple[Any, List[TodoItem]]]:
+	"""split already sorted items into runs with the same value of `attr`, in one linear sweep
+
+	if `items_sorted` came from `sort_items()` with `attr` in the sort order, and all previous attributes in the sort order are equal across `items_sorted`, each value of `attr` appears in exactly one run
+	"""
+	return [
+		(attrVal, list(group))
+		for attrVal,group in groupby(items_sorted, key = lambda x: x.__getattribute__(attr))
+	]
 
 def split_by_attribute(
 		td_items : List[TodoItem], 
@@ -925,6 +2751,8 @@ def recursive_sortattr(
 		attr_sort_order : List[SortableAttrTodoItems],
 		lvl : int = 0,
 		fmt : ItemPrintFormats = 'md',
+		tag_order : Optional[Sequence[str]] = None,
+		presorted : bool = False,
 	) -> Union[
 		List[Dict[
 			str, # MustacheKey.union_header_list,
@@ -939,13 +2767,11 @@ def recursive_sortattr(
 	
 	split up each list into a dictionary whose keys are values for the attribute `attr_sort_order[lvl]` and whose values are lists of items with that value
 
-	note that for the base case, items are still sorted by the last entry in `attr_sort_order` but not split up into headers (this is to allow sorting by line number)
+	items are sorted once, at the top level, with `sort_items()`. every level below that splits contiguous runs with `group_sorted_items()`, without sorting again
 
-	structure needs to be as follows:
+	note that for the base case, items are still sorted by the last entry in `attr_sort_order` but not split up into headers (this is to allow sorting by line number)
 
-	```json
-	{json_example}
-	```
+	structure needs to be as in `TEMPLATE_EXAMPLE_HASH`
 
 	### Parameters:
 	 - `td_items : List[TodoItem]`  
@@ -956,6 +2782,10 @@ def recursive_sortattr(
 	   the current level -- determines the keys and index into `attr_sort_order`
 	 - `fmt : ItemPrintFormats`
 	   format to print items in
+	 - `tag_order : Optional[Sequence[str]]`
+	   order in which tags are sorted, see `get_sortkey_from_attr()`
+	 - `presorted : bool`
+	   `td_items` are already sorted by `attr_sort_order` with `sort_items()`, so the top level doesnt sort them again
 
 	### Returns: (one of)
 	 - `List[ Dict[ MustacheKey.item, TodoItem ] ]`
@@ -966,19 +2796,21 @@ def recursive_sortattr(
 
 	current_attr : SortableAttrTodoItems = attr_sort_order[lvl]
 
+	# sort everything once, at the top level
+	if lvl == 0 and not presorted:
+		td_items = sort_items(td_items, attr_sort_order, tag_order)
+
 	# base case: end of `attr_sort_order`
 	if lvl >= len(attr_sort_order) - 1:
 		return [
 			{ 'item' : x.to_str(fmt = fmt) }
-			for x in sorted(td_items, key = get_sortkey_from_attr(current_attr))
-			# sort by whatever the final level attribute is
+			for x in td_items
 		]
 
-	# sort by the corresponding attribute
-	items_byAttr : Dict[str,List[TodoItem]] = split_by_attribute(
-		td_items = td_items,
+	# split by the corresponding attribute
+	items_byAttr : List[Tuple[Any, List[TodoItem]]] = group_sorted_items(
+		items_sorted = td_items,
 		attr = current_attr,
-		# sortKey = lambda x : x.__getattribute__(current_attr),
 	)
 
 	# recurse
@@ -997,16 +2829,17 @@ def recursive_sortattr(
 				fmt = fmt,
 			),
 		}
-		for attrVal,lst_items in items_byAttr.items()
+		for attrVal,lst_items in items_byAttr
 	]
 
-recursive_sortattr.__doc__ = str(recursive_sortattr.__doc__).format(json_example = json.dumps(TEMPLATE_EXAMPLE_HASH, indent = '\t'))
-
 
 def write_items_ms_template(
 		td_items : List[TodoItem], 
 		item_format : ItemPrintFormats = 'md',
 		attr_sort_order : List[SortableAttrTodoItems] = ['tag', 'file', 'lineNum'],
+		tag_order : Optional[Sequence[str]] = None,
+		header_offset : int = 0,
+		presorted : bool = False,
 	) -> str:
 	"""given a list of todo items, sort them, convert to strings, and plug into the template using chevron
 	
@@ -1018,14 +2851,27 @@ def write_items_ms_template(
 	   (defaults to `'md'`)
 	 - `attr_sort_order : Optional[Tuple[str,...]]`
 	   order in which to sort the tags and files before putting in the template
+	 - `tag_order : Optional[Sequence[str]]`
+	   order in which tags are sorted, see `get_sortkey_from_attr()`
+	   (defaults to `None`)
+	 - `header_offset : int`
+	   extra levels added to every header, for nesting the output under another header
+	   (defaults to `0`)
+	 - `presorted : bool`
+	   `td_items` are already sorted, see `recursive_sortattr()`
+	   (defaults to `False`)
 	
 	### Returns:
 	 - `str` 
 	   formatted string
 	"""
 
+	# load context for all items at once, but only if the format uses it
+	if format_uses_context(item_format):
+		load_contexts(td_items)
+
 	# generate template of correct depth
-	ms_template : str = gen_template_from_attrlist(attr_sort_order)
+	ms_template : str = gen_template_from_attrlist(attr_sort_order, header_offset)
 
 	# the first list needs to be added manually
 	data : Dict[str,Any] = { 'ul0': 
@@ -1033,11 +2879,15 @@ def write_items_ms_template(
 			td_items = td_items,
 			attr_sort_order = attr_sort_order,
 			fmt = item_format,
+			tag_order = tag_order,
+			presorted = presorted,
 		)
 	}
 
 	# TODO: replace any chars that need to be escaped that arent inside code blocks
 
+	import chevron # type: ignore
+
 	# HACK: patches the chevron renderer to not replace html strings
 	chevron.renderer._html_escape = lambda string: string
 
@@ -1050,6 +2900,187 @@ def write_items_ms_template(
 
 
 
+def release_contexts(td_items : Iterable[TodoItem]) -> None:
+	"""drop lazily loaded contexts, so they can be garbage collected. they will be reloaded if accessed again"""
+	for itm in td_items:
+		if itm.context_lines is not None:
+			itm._context = None
+
+
+def iter_items_rendered(
+		td_items : List[TodoItem],
+		attr_sort_order : List[SortableAttrTodoItems],
+		fmt : ItemPrintFormats = 'md',
+		lvl : int = 0,
+		tag_order : Optional[Sequence[str]] = None,
+		header_offset : int = 0,
+		presorted : bool = False,
+	) -> Iterator[str]:
+	"""sort `td_items` by the attributes in `attr_sort_order`, and yield the rendered markdown piece by piece
+
+	gives exactly the same output as `write_items_ms_template()`, but never holds more than one item's string at a time. if `fmt` uses context, it is loaded (in batches per file) for one top level group at a time, and released after that group is rendered.
+	
+	### Parameters:
+	 - `td_items : List[TodoItem]`   
+	   list of items
+	 - `attr_sort_order : List[SortableAttrTodoItems]`   
+	   attributes to sort by. all but the last are used for headers
+	 - `fmt : ItemPrintFormats`   
+	   format to print items in
+	   (defaults to `'md'`)
+	 - `lvl : int`   
+	   the current level -- index into `attr_sort_order`
+	   (defaults to `0`)
+	 - `tag_order : Optional[Sequence[str]]`
+	   order in which tags are sorted, see `get_sortkey_from_attr()`
+	   (defaults to `None`)
+	 - `header_offset : int`
+	   extra levels added to every header, for nesting the output under another header
+	   (defaults to `0`)
+	 - `presorted : bool`
+	   `td_items` are already sorted by `attr_sort_order` with `sort_items()`, so the top level doesnt sort them again
+	   (defaults to `False`)
+	"""
+
+	current_attr : SortableAttrTodoItems = attr_sort_order[lvl]
+	load_context : bool = (lvl == 0) and format_uses_context(fmt)
+
+	# sort everything once, at the top level
+	if lvl == 0 and not presorted:
+		td_items = sort_items(td_items, attr_sort_order, tag_order)
+
+	# base case: end of `attr_sort_order`
+	if lvl >= len(attr_sort_order) - 1:
+		if load_context:
+			load_contexts(td_items)
+		for x in td_items:
+			yield x.to_str(fmt = fmt) + '\n'
+		if load_context:
+			release_contexts(td_items)
+		return
+
+	items_byAttr : List[Tuple[Any, List[TodoItem]]] = group_sorted_items(
+		items_sorted = td_items,
+		attr = current_attr,
+	)
+
+	for attrVal,lst_items in items_byAttr:
+		if load_context:
+			load_contexts(lst_items)
+
+		header : str = format_attr_header(
+			attr = current_attr, 
+			val = attrVal,
+			lvl = lvl,
+			lst_items = lst_items,
+		)
+		yield f'{"#" * (lvl + 1 + header_offset)} {header}\n'
+
+		yield from iter_items_rendered(
+			td_items = lst_items,
+			attr_sort_order = attr_sort_order,
+			fmt = fmt,
+			lvl = lvl + 1,
+			header_offset = header_offset,
+		)
+
+		if load_context:
+			release_contexts(lst_items)
+
+
+def write_items_stream(
+		td_items : List[TodoItem], 
+		fout : TextIO,
+		item_format : ItemPrintFormats = 'md',
+		attr_sort_order : List[SortableAttrTodoItems] = ['tag', 'file', 'lineNum'],
+		tag_order : Optional[Sequence[str]] = None,
+		header_offset : int = 0,
+		presorted : bool = False,
+	) -> None:
+	"""given a list of todo items, sort them and write them straight to `fout`
+
+	streaming alternative to `write_items_ms_template()`, with the same output
+	
+	### Parameters:
+	 - `td_items : List[TodoItem]`   
+	   input list of todo items
+	 - `fout : TextIO`   
+	   stream to write to
+	 - `item_format : ItemPrintFormats`
+	   key to `ITM_FORMATS` dict to use for formatting each item
+	   (defaults to `'md'`)
+	 - `attr_sort_order : List[SortableAttrTodoItems]`
+	   order in which to sort the tags and files
+	 - `tag_order : Optional[Sequence[str]]`
+	   order in which tags are sorted, see `get_sortkey_from_attr()`
+	   (defaults to `None`)
+	 - `header_offset : int`
+	   extra levels added to every header, see `iter_items_rendered()`
+	   (defaults to `0`)
+	 - `presorted : bool`
+	   `td_items` are already sorted, see `iter_items_rendered()`
+	   (defaults to `False`)
+	"""
+	for chunk in iter_items_rendered(
+			td_items = td_items,
+			attr_sort_order = attr_sort_order,
+			fmt = item_format,
+			tag_order = tag_order,
+			header_offset = header_offset,
+			presorted = presorted,
+		):
+		fout.write(chunk)
+
+
+def item_to_record(itm : TodoItem, root : Optional[str] = None) -> Dict[str,Any]:
+	"""plain dict of an item for JSON output, with `root` only if given, and `context` only if context is enabled for the item"""
+	record : Dict[str,Any] = dict() if root is None else { 'root' : root }
+	record.update({
+		'tag' : itm.tag,
+		'file' : itm.file,
+		'lineNum' : itm.lineNum,
+		'content' : itm.content,
+	})
+	if itm.context_lines is not None:
+		record['context'] = itm.context
+	return record
+
+
+def write_items_jsonl(
+		td_items : Iterable[TodoItem],
+		fout : TextIO,
+		root : Optional[str] = None,
+	) -> int:
+	"""write one JSON record per item to `fout`, in the order given -- no sorting or grouping
+
+	contexts are loaded for one file at a time and dropped right after, so memory use doesnt grow with the number of items. see `item_to_record()` for the fields.
+	
+	### Parameters:
+	 - `td_items : Iterable[TodoItem]`   
+	   items to write, ideally with items from the same file next to each other
+	 - `fout : TextIO`   
+	   stream to write to
+	 - `root : Optional[str]`   
+	   name of the search root the items are from, added to every record if given
+	   (defaults to `None`)
+	
+	### Returns:
+	 - `int` 
+	   number of items written
+	"""
+	count : int = 0
+	for _,file_items_iter in groupby(td_items, key = lambda x: x.file):
+		file_items : List[TodoItem] = list(file_items_iter)
+		load_contexts(file_items)
+		for itm in file_items:
+			fout.write(json.dumps(item_to_record(itm, root), ensure_ascii = False))
+			fout.write('\n')
+		release_contexts(file_items)
+		count += len(file_items)
+	return count
+
+
+
 """
 
  #      ######  ####    ##    ####  #   #
@@ -1117,6 +3148,562 @@ def write_markdown_byTag(
 
 
 
+"""
+##      ##    ###    ########  ######  ##     ##
+##  ##  ##   ## ##      ##    ##    ## ##     ##
+##  ##  ##  ##   ##     ##    ##       ##     ##
+##  ##  ## ##     ##    ##    ##       #########
+##  ##  ## #########    ##    ##       ##     ##
+##  ##  ## ##     ##    ##    ##    ## ##     ##
+ ###  ###  ##     ##    ##     ######  ##     ##
+"""
+
+
+class PollingWatcher(object):
+	"""detects changes by periodically re-walking the tree and comparing mtimes and sizes
+
+	used when inotify is not available
+	"""
+
+	def __init__(
+			self,
+			list_files : Callable[[], List[str]],
+			poll_interval : float = 1.0,
+		) -> None:
+		self.list_files : Callable[[], List[str]] = list_files
+		self.poll_interval : float = poll_interval
+		self.snapshot : Dict[str, Tuple[int,int]] = self._take_snapshot()
+		self.last_poll : float = time.monotonic()
+
+	def _take_snapshot(self) -> Dict[str, Tuple[int,int]]:
+		snapshot : Dict[str, Tuple[int,int]] = dict()
+		for file in self.list_files():
+			try:
+				st : os.stat_result = os.stat(file)
+				snapshot[file] = (st.st_mtime_ns, st.st_size)
+			except OSError:
+				pass
+		return snapshot
+
+	def read_changes(self, timeout : Optional[float]) -> Optional[Set[str]]:
+		"""wait up to `timeout` seconds (forever if `None`) for changes, return the set of changed paths"""
+		deadline : Optional[float] = None if timeout is None else time.monotonic() + timeout
+		while True:
+			# sleep until the next poll, or the deadline
+			wait : float = self.last_poll + self.poll_interval - time.monotonic()
+			if deadline is not None:
+				wait = min(wait, deadline - time.monotonic())
+			if wait > 0:
+				time.sleep(wait)
+
+			if self.last_poll + self.poll_interval <= time.monotonic():
+				self.last_poll = time.monotonic()
+				snapshot_new : Dict[str, Tuple[int,int]] = self._take_snapshot()
+				changed : Set[str] = {
+					file
+					for file in set(self.snapshot) | set(snapshot_new)
+					if self.snapshot.get(file) != snapshot_new.get(file)
+				}
+				self.snapshot = snapshot_new
+				if changed:
+					return changed
+
+			if deadline is not None and time.monotonic() >= deadline:
+				return set()
+
+	def close(self) -> None:
+		pass
+
+
+class InotifyWatcher(object):
+	"""detects changes using linux inotify, through `ctypes` so no extra dependencies are needed
+
+	one watch is added per directory, skipping hidden and excluded ones. new directories are watched as they are created. `read_changes()` returns `None` if the kernel event queue overflowed, meaning everything should be rescanned.
+	"""
+
+	IN_MODIFY : int = 0x00000002
+	IN_CLOSE_WRITE : int = 0x00000008
+	IN_MOVED_FROM : int = 0x00000040
+	IN_MOVED_TO : int = 0x00000080
+	IN_CREATE : int = 0x00000100
+	IN_DELETE : int = 0x00000200
+	IN_DELETE_SELF : int = 0x00000400
+	IN_Q_OVERFLOW : int = 0x00004000
+	IN_IGNORED : int = 0x00008000
+	IN_ISDIR : int = 0x40000000
+
+	MASK : int = (
+		IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+		| IN_CREATE | IN_DELETE | IN_DELETE_SELF
+	)
+
+	EVENT_HEADER : struct.Struct = struct.Struct('iIII')
+
+	@classmethod
+	def is_available(cls) -> bool:
+		if not sys.platform.startswith('linux'):
+			return False
+		import ctypes.util
+		try:
+			libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno = True)
+			return hasattr(libc, 'inotify_init1')
+		except OSError:
+			return False
+
+	def __init__(
+			self,
+			searchdir : str,
+			exclude : Set[str] = set(),
+		) -> None:
+		import ctypes.util
+		self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno = True)
+		self.fd : int = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+		self.exclude_prefixes : Tuple[str, ...] = tuple(
+			unixPath(os.path.join(searchdir, ex))
+			for ex in exclude
+		)
+		self.watch_dirs : Dict[int,str] = dict()
+		self.add_tree(searchdir)
+
+	def add_tree(self, root : str) -> None:
+		"""add watches for `root` and all non-hidden, non-excluded directories under it"""
+		for dirpath, dirnames, _ in os.walk(root):
+			self._add_watch(dirpath)
+			dirnames[:] = [
+				d for d in dirnames
+				if not d.startswith('.')
+				and not unixPath(os.path.join(dirpath, d)).startswith(self.exclude_prefixes)
+			]
+
+	def _add_watch(self, dirpath : str) -> None:
+		wd : int = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.MASK)
+		if wd >= 0:
+			self.watch_dirs[wd] = dirpath
+
+	def read_changes(self, timeout : Optional[float]) -> Optional[Set[str]]:
+		"""wait up to `timeout` seconds (forever if `None`) for events, return the set of changed paths"""
+		readable, _, _ = select.select([self.fd], [], [], timeout)
+		if not readable:
+			return set()
+
+		changed : Set[str] = set()
+		try:
+			buf : bytes = os.read(self.fd, 1 << 16)
+		except BlockingIOError:
+			return changed
+
+		offset : int = 0
+		while offset < len(buf):
+			wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(buf, offset)
+			offset += self.EVENT_HEADER.size
+			name : str = os.fsdecode(buf[offset:offset + name_len].rstrip(b'\0'))
+			offset += name_len
+
+			if mask & self.IN_Q_OVERFLOW:
+				return None
+			if mask & self.IN_IGNORED:
+				self.watch_dirs.pop(wd, None)
+				continue
+
+			dirpath : Optional[str] = self.watch_dirs.get(wd)
+			if dirpath is None or not name or name.startswith('.'):
+				continue
+
+			path : str = os.path.join(dirpath, name)
+			if unixPath(path).startswith(self.exclude_prefixes):
+				continue
+			changed.add(unixPath(path))
+
+			# start watching new directories
+			if (mask & self.IN_ISDIR) and (mask & (self.IN_CREATE | self.IN_MOVED_TO)):
+				self.add_tree(path)
+
+		return changed
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+def watch(argv : List[str]) -> int:
+	"""scan once, then keep `config.file_todo` up to date as files change
+
+	only changed files are rescanned, and the in-memory items are patched before re-rendering. bursts of changes (branch switches, etc) are debounced: rescanning waits until there have been no changes for `watch.debounce` seconds. only a single directory in `config.searchDir` is supported.
+	"""
+	settings : Settings = Settings.from_config(process_configs(argv))
+	root : RootSettings = settings.single_root('watch')
+
+	matcher : TagMatcher = TagMatcher.from_config(root.read)
+	jobs : int = settings.jobs or os.cpu_count() or 1
+
+	def list_files() -> List[str]:
+		return discover_files(settings, root)
+
+	def rescan(files_scrape : List[str]) -> None:
+		for file in files_scrape:
+			issues_byFile.pop(file, None)
+		items_byFile.update(zip(
+			files_scrape,
+			_scrape_files(files_scrape, root.read, matcher, jobs, file_issues = issues_byFile),
+		))
+
+	def write() -> None:
+		write_todo_file(
+			settings = settings,
+			# keep the same order as a full run
+			todo_items = [ x for file in filenames for x in items_byFile[file] ],
+			searched_files = len(filenames),
+			file_issues = { file : issues_byFile[file] for file in filenames if file in issues_byFile },
+		)
+
+	# initial full scan
+	filenames : List[str] = list_files()
+	items_byFile : Dict[str, List[TodoItem]] = dict()
+	issues_byFile : Dict[str, FileIssue] = dict()
+	rescan(filenames)
+	write()
+
+	watcher : Union[InotifyWatcher, PollingWatcher]
+	if InotifyWatcher.is_available():
+		watcher = InotifyWatcher(root.path, set(root.read.exclude))
+	else:
+		watcher = PollingWatcher(list_files, settings.watch_poll_interval)
+
+	print(f'watching {root.path} using {type(watcher).__name__}, press Ctrl+C to stop', file = sys.stderr)
+
+	try:
+		while True:
+			# block until something changes, then collect changes until things are quiet
+			changed : Optional[Set[str]] = watcher.read_changes(None)
+			while changed is not None:
+				changed_more : Optional[Set[str]] = watcher.read_changes(settings.watch_debounce)
+				if changed_more is None:
+					changed = None
+				elif changed_more:
+					changed |= changed_more
+				else:
+					break
+
+			filenames_old : Set[str] = set(filenames)
+
+			# rediscover if we cant tell exactly what changed, or if unknown paths (new files, dirs) showed up or known ones disappeared
+			if changed is None or any(
+					(x not in filenames_old) or (not os.path.isfile(x))
+					for x in changed
+				):
+				filenames = list_files()
+			filenames_new : Set[str] = set(filenames)
+
+			files_scrape : List[str] = [
+				file
+				for file in filenames
+				if (file not in filenames_old)
+				or (changed is None)
+				or (file in changed)
+			]
+			files_removed : Set[str] = filenames_old - filenames_new
+
+			if not files_scrape and not files_removed:
+				continue
+
+			for file in files_removed:
+				items_byFile.pop(file, None)
+			rescan(files_scrape)
+			write()
+
+			print(
+				f'updated {get_output_path(settings)}: {len(files_scrape)} files rescanned, {len(files_removed)} removed, {sum(len(v) for v in items_byFile.values())} items',
+				file = sys.stderr,
+			)
+
+	except KeyboardInterrupt:
+		pass
+	finally:
+		watcher.close()
+
+	return 0
+
+
+"""
+ #######   ##     ## ######## ########   ##    ##
+##     ##  ##     ## ##       ##     ##   ##  ##
+##     ##  ##     ## ##       ##     ##    ####
+##     ##  ##     ## ######   ########      ##
+##  ## ##  ##     ## ##       ##   ##       ##
+##    ##   ##     ## ##       ##    ##      ##
+ ##### ##   #######  ######## ##     ##     ##
+"""
+
+
+def query(argv : List[str]) -> int:
+	"""answer questions about todo items from the index, without rescanning unchanged files or writing the output file
+
+	the index (see `TodoIndex`) is refreshed first, unless `--no-refresh` is given. remaining arguments are config options, as for a normal run. only a single directory in `config.searchDir` is supported. exits with status 1 if git fails for `--changed-since`.
+
+	examples:
+		inline_todo query --tag FIXME --under src/net
+		inline_todo query --count-by tag,topdir
+		inline_todo query --changed-since main --format jsonl
+	"""
+	import argparse
+
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(
+		prog = 'inline_todo query',
+		description = query.__doc__,
+		formatter_class = argparse.RawDescriptionHelpFormatter,
+	)
+	parser.add_argument('--tag', action = 'append', default = [], help = 'only items with this tag, can be given more than once')
+	parser.add_argument('--under', type = str, default = None, help = 'only items in files under this directory, relative to searchDir')
+	parser.add_argument('--changed-since', type = str, default = None, help = 'only items in files changed since this git ref')
+	parser.add_argument('--count-by', type = str, default = None, help = f'comma separated keys to count items by, from: {", ".join(TodoIndex.GROUP_KEYS)}')
+	parser.add_argument('--format', type = str, choices = ('text', 'jsonl'), default = 'text', help = 'output format')
+	parser.add_argument('--no-refresh', action = 'store_true', help = 'use the index as it is, without checking for changed files')
+	args, argv_cfg = parser.parse_known_args(argv[1:])
+
+	settings : Settings = Settings.from_config(process_configs(argv[:1] + argv_cfg))
+	root : RootSettings = settings.single_root('query')
+	index : TodoIndex = TodoIndex(settings.index_path, root.read, root.path)
+
+	try:
+		if not args.no_refresh:
+			index.refresh(discover_files(settings, root), settings.jobs, complete = settings.changed_since is None)
+
+		files : Optional[List[str]] = None
+		if args.changed_since is not None:
+			import subprocess
+			try:
+				files = get_git_files(
+					searchdir = root.path,
+					file_types = root.read.source_files,
+					exclude = root.read.exclude,
+					changed_since = args.changed_since,
+				)
+			except (subprocess.CalledProcessError, FileNotFoundError) as e:
+				# unlike discovery, there is nothing to fall back to -- all items would be wrong
+				stderr : str = getattr(e, 'stderr', b'').decode('utf-8', errors = 'replace').strip()
+				print(f'# query --changed-since {args.changed_since}: git failed: {stderr.splitlines()[0] if stderr else e}', file = sys.stderr)
+				return 1
+
+		if args.count_by is not None:
+			keys : List[str] = args.count_by.split(',')
+			for row in index.count_by(keys, args.tag, args.under, files):
+				if args.format == 'jsonl':
+					print(json.dumps({ **dict(zip(keys, row)), 'count' : row[-1] }, ensure_ascii = False))
+				else:
+					print('\t'.join(str(x) for x in (row[-1], *row[:-1])))
+		else:
+			for itm in index.query_items(args.tag, args.under, files):
+				if args.format == 'jsonl':
+					print(json.dumps(item_to_record(itm), ensure_ascii = False))
+				else:
+					print(f'{itm.file}:{itm.lineNum}\t{itm.tag}\t{itm.content}')
+	finally:
+		index.close()
+
+	return 0
+
+
+
+"""
+##     ## ######## ########   ######   ########
+###   ### ##       ##     ## ##    ##  ##
+#### #### ##       ##     ## ##        ##
+## ### ## ######   ########  ##   #### ######
+##     ## ##       ##   ##   ##    ##  ##
+##     ## ##       ##    ##  ##    ##  ##
+##     ## ######## ##     ##  ######   ########
+"""
+
+# version of the partial result files written with `--shard`
+SHARD_VERSION : int = 1
+
+
+def shard_indices(files : List[str], shard : Tuple[int,int]) -> List[int]:
+	"""positions in `files` of the files in shard `i` of `N` (1-based)
+
+	files are assigned by a hash of their path, so every run -- on any machine, with the same config -- splits them the same way, and every file is in exactly one shard
+	"""
+	import zlib
+	idx_shard, num_shards = shard
+	return [
+		idx
+		for idx,file in enumerate(files)
+		if zlib.crc32(unixPath(file).encode('utf-8')) % num_shards == idx_shard - 1
+	]
+
+
+def get_shard_path(settings : Settings) -> str:
+	"""`config.shard_file` if set, otherwise `config.file_todo` (or its default, if writing to stdout) with its extension replaced by `.shard-<i>-of-<N>.json`"""
+	if settings.shard_file is not None:
+		return settings.shard_file
+	assert settings.shard is not None
+	file_todo : str = settings.file_todo or CONFIG_DEFAULT['config']['file_todo']
+	return os.path.splitext(file_todo)[0] + '.shard-{}-of-{}.json'.format(*settings.shard)
+
+
+def scan_and_write_shard(
+		settings : Settings,
+		files_byRoot : List[List[str]],
+		positions_byRoot : List[List[int]],
+		caches : List[Optional[ScanCache]],
+		profiler : Profiler,
+		file_issues : Dict[str, FileIssue],
+	) -> None:
+	"""scan this shard's files of every root, and write their items as a partial result for `merge()`
+
+	`positions_byRoot` has the position of each file in the full (unsharded) file list of its root, which is stored so that `merge()` can put items back in the order of a single run. contexts are stored too if the item format uses them, since the merging machine may not have the source files.
+	"""
+	store_context : bool = format_uses_context(settings.item_format) # type: ignore
+
+	with profiler.stage('scan'):
+		roots_data : List[Dict[str,Any]] = [
+			{
+				'name' : root.name,
+				'read_key' : ScanCache.get_read_key(root.read),
+				'searched_files' : len(files),
+				'files' : list(),
+				'issues' : dict(),
+			}
+			for root,files in zip(settings.roots, files_byRoot)
+		]
+		positions : List[Iterator[int]] = [ iter(x) for x in positions_byRoot ]
+		for idx,file,file_items in iter_search_groups(
+				groups = [
+					(files, root.read, cache)
+					for root,files,cache in zip(settings.roots, files_byRoot, caches)
+				],
+				jobs = settings.jobs,
+				file_stats = profiler.files if settings.profile else None,
+				file_issues = file_issues,
+			):
+			position : int = next(positions[idx])
+			if file in file_issues:
+				roots_data[idx]['issues'][file] = file_issues[file]
+			if not file_items:
+				continue
+			if store_context:
+				load_contexts(file_items)
+			roots_data[idx]['files'].append([
+				position,
+				file,
+				[ [ x.tag, x.lineNum, x.content, x._context ] for x in file_items ],
+			])
+
+	save_caches(caches, profiler)
+
+	with profiler.stage('write'):
+		with open(get_shard_path(settings), 'w', encoding = 'utf-8') as fout:
+			json.dump(
+				{
+					'version' : SHARD_VERSION,
+					'shard' : list(settings.shard), # type: ignore
+					'roots' : roots_data,
+				},
+				fout,
+			)
+
+
+def load_shard_files(
+		paths : List[str],
+		settings : Settings,
+	) -> Tuple[List[List[TodoItem]], List[int], List[Dict[str, FileIssue]]]:
+	"""read the partial results in `paths`, and combine them into the items, number of searched files, and files with issues of each root in `settings.roots`
+
+	raises a `ValueError` if the partial results are not exactly the shards `1` to `N` of one split, or were scanned with different roots or read settings than `settings`
+	"""
+	shards : Dict[int, Tuple[str, Dict[str,Any]]] = dict()
+	num_shards : Optional[int] = None
+	for path in paths:
+		with open(path, 'r', encoding = 'utf-8') as fin:
+			data : Dict[str,Any] = json.load(fin)
+		if not isinstance(data, dict) or data.get('version') != SHARD_VERSION:
+			raise ValueError(f'{path} is not a partial result written by `--shard`, or is from another version')
+
+		idx_shard, n = data['shard']
+		if num_shards is None:
+			num_shards = n
+		elif n != num_shards:
+			raise ValueError(f'{path} is shard {idx_shard}/{n}, but other partial results are from a split into {num_shards}')
+		if idx_shard in shards:
+			raise ValueError(f'shard {idx_shard}/{n} given twice: {shards[idx_shard][0]} and {path}')
+		shards[idx_shard] = (path, data)
+
+	missing : List[int] = [ i for i in range(1, (num_shards or 0) + 1) if i not in shards ]
+	if missing:
+		raise ValueError(f'missing shards {", ".join(f"{i}/{num_shards}" for i in missing)}, the merged output would be incomplete')
+
+	root_names : List[str] = [ root.name for root in settings.roots ]
+	read_keys : List[str] = [ ScanCache.get_read_key(root.read) for root in settings.roots ]
+	# (position, file, items) of each file with items, for each root
+	files_byRoot : List[List[Tuple[int, str, List[List[Any]]]]] = [ list() for _ in settings.roots ]
+	searched_byRoot : List[int] = [ 0 for _ in settings.roots ]
+	issues_byRoot : List[Dict[str, FileIssue]] = [ dict() for _ in settings.roots ]
+	for path,data in shards.values():
+		if [ r['name'] for r in data['roots'] ] != root_names:
+			raise ValueError(f'{path} was scanned with roots {[ r["name"] for r in data["roots"] ]}, but config.searchDir has {root_names}')
+		for idx,(root_data,read_key) in enumerate(zip(data['roots'], read_keys)):
+			if root_data['read_key'] != read_key:
+				raise ValueError(f'{path} was scanned with different read settings for root {root_data["name"]!r}, merge with the same config as the shards')
+			searched_byRoot[idx] += root_data['searched_files']
+			files_byRoot[idx].extend(tuple(x) for x in root_data['files']) # type: ignore
+			issues_byRoot[idx].update((file, tuple(issue)) for file,issue in root_data['issues'].items()) # type: ignore
+
+	items_byRoot : List[List[TodoItem]] = list()
+	for root,root_files in zip(settings.roots, files_byRoot):
+		# back in the order of a single run
+		root_files.sort(key = lambda x: x[0])
+		items_byRoot.append([
+			TodoItem(
+				tag = tag,
+				file = file,
+				lineNum = lineNum,
+				content = content,
+				context = context,
+				context_lines = root.read.max_context_lines,
+			)
+			for _,file,file_items in root_files
+			for tag,lineNum,content,context in file_items
+		])
+
+	return items_byRoot, searched_byRoot, issues_byRoot
+
+
+def merge(argv : List[str]) -> int:
+	"""combine partial results written by `--shard i/N` runs into the normal output file
+
+	every shard from `1` to `N` must be given. the output is the same as that of a single run over all files, as long as the same config is used -- remaining arguments are config options, as for a normal run.
+
+	examples:
+		inline_todo --shard 1/2 config.shard_file=part1.json
+		inline_todo --shard 2/2 config.shard_file=part2.json
+		inline_todo merge part1.json part2.json
+	"""
+	import argparse
+
+	parser : argparse.ArgumentParser = argparse.ArgumentParser(
+		prog = 'inline_todo merge',
+		description = merge.__doc__,
+		formatter_class = argparse.RawDescriptionHelpFormatter,
+	)
+	parser.add_argument('partials', nargs = '+', help = 'partial result files, one for each shard')
+	# config options are `key=value` (or flags like `--exit-code`), anything else is a partial result file
+	is_cfg : Callable[[str], bool] = lambda x: '=' in x or x in CLI_FLAGS_BOOL
+	args : argparse.Namespace = parser.parse_args([ x for x in argv[1:] if not is_cfg(x) ])
+	argv_cfg : List[str] = [ x for x in argv[1:] if is_cfg(x) ]
+
+	settings : Settings = Settings.from_config(process_configs(argv[:1] + argv_cfg))
+	items_byRoot, searched_byRoot, issues_byRoot = load_shard_files(args.partials, settings)
+	if not write_todo_file_byRoot(settings, items_byRoot, searched_byRoot, issues_byRoot):
+		print(f'# {get_output_path(settings)} is up to date, not rewritten', file = sys.stderr)
+		if settings.exit_code:
+			return EXIT_UNCHANGED
+
+	return 0
+
+
+
 """
 ########  ##     ## ##    ##
 ##     ## ##     ## ###   ##
@@ -1127,66 +3714,1006 @@ def write_markdown_byTag(
 ##     ##  #######  ##    ##
 """
 
+class Profiler(object):
+	"""records wall and cpu time spent in each stage of a run, and optionally per-file scan stats
+
+	stages are timed with `with profiler.stage('name'):`, which is cheap enough to always do. a normal run has `config`, `discovery`, `cache_load` and `index` (if enabled), `scan`, `cache_save`, `sort`, and `write` -- which both renders and writes the output, since the stream renderer does them together. `write.format: jsonl` keeps the order of the scan, and writes each file's items as it goes, in a single `scan_write` stage.
+	per-file stats are only collected if `files` is passed as `file_stats` to `search_files()`.
+	"""
+
+	def __init__(self) -> None:
+		self.stages : Dict[str, Dict[str,float]] = dict()
+		self.files : Dict[str, Dict[str,Any]] = dict()
+		self.time_start : float = time.perf_counter()
+
+	@contextmanager
+	def stage(self, name : str) -> Iterator[None]:
+		t0 : float = time.perf_counter()
+		c0 : float = time.process_time()
+		try:
+			yield
+		finally:
+			self.stages[name] = {
+				'time_s' : time.perf_counter() - t0,
+				'cpu_s' : time.process_time() - c0,
+			}
+
+	def slowest_files(self, n : int) -> List[Tuple[str, Dict[str,Any]]]:
+		return sorted(self.files.items(), key = lambda kv: kv[1]['time_s'], reverse = True)[:n]
+
+	def to_dict(self) -> Dict[str,Any]:
+		totals : Dict[str,Any] = {
+			'time_s' : time.perf_counter() - self.time_start,
+			'files_scanned' : len(self.files),
+		}
+		for key in ('bytes', 'lines', 'matches'):
+			totals[key] = sum(x.get(key, 0) for x in self.files.values())
+
+		return {
+			'totals' : totals,
+			'stages' : self.stages,
+			'files' : self.files,
+		}
+
+	def summary_str(self, n_slowest : int = 10) -> str:
+		"""human readable summary: time per stage, totals, and the `n_slowest` files"""
+		data : Dict[str,Any] = self.to_dict()
+		totals : Dict[str,Any] = data['totals']
+		output : List[str] = [
+			f'# profile: {totals["time_s"]:.3f}s total, {totals["files_scanned"]} files scanned, {totals["bytes"]} bytes, {totals["lines"]} lines, {totals["matches"]} items',
+			f'{"stage":>12}  {"time (s)":>10}  {"cpu (s)":>10}',
+		]
+		for name,st in self.stages.items():
+			output.append(f'{name:>12}  {st["time_s"]:>10.4f}  {st["cpu_s"]:>10.4f}')
+
+		if self.files and n_slowest > 0:
+			output.append('# slowest files:')
+			output.append(f'{"time (s)":>10}  {"bytes":>10}  {"lines":>8}  {"items":>6}  file')
+			for file,st in self.slowest_files(n_slowest):
+				output.append(f'{st["time_s"]:>10.4f}  {st.get("bytes", 0):>10}  {st.get("lines", 0):>8}  {st["matches"]:>6}  {file}')
+
+		return '\n'.join(output)
+
+	def save(self, path : str) -> None:
+		with open(path, 'w', encoding = 'utf-8') as fout:
+			json.dump(self.to_dict(), fout, indent = '\t')
+
+
+def get_profile_path(settings : Settings) -> str:
+	"""`config.profile_file` if set, otherwise `config.file_todo` (or its default, if writing to stdout) with its extension replaced by `.profile.json`"""
+	if settings.profile_file is not None:
+		return settings.profile_file
+	file_todo : str = settings.file_todo or CONFIG_DEFAULT['config']['file_todo']
+	return os.path.splitext(file_todo)[0] + '.profile.json'
+
+
+# extension of the output file for each `write.format`, replacing that of `config.file_todo`. markdown uses `file_todo` as-is
+OUTPUT_EXTENSIONS : Dict[str,str] = {
+	'jsonl' : '.jsonl',
+	'html' : '.html',
+}
+
+def get_output_path(settings : Settings) -> Optional[str]:
+	"""path the output is written to: `config.file_todo`, with its extension replaced according to `OUTPUT_EXTENSIONS`. `None` for stdout"""
+	if settings.file_todo is None or settings.write_format not in OUTPUT_EXTENSIONS:
+		return settings.file_todo
+	return os.path.splitext(settings.file_todo)[0] + OUTPUT_EXTENSIONS[settings.write_format]
+
+
+@contextmanager
+def open_output(path : Optional[str], atomic : bool = False) -> Iterator[TextIO]:
+	"""open `path` for writing, or use stdout if `path` is `None`
+
+	if `atomic`, writes go to a temporary file next to `path`, which replaces it only once everything was written -- so readers never see a partial file
+	"""
+	if path is None:
+		yield sys.stdout
+		sys.stdout.flush()
+	elif atomic:
+		path_tmp : str = path + '.tmp'
+		try:
+			with open(path_tmp, 'w', encoding = 'utf-8') as fout:
+				yield fout
+			os.replace(path_tmp, path)
+		finally:
+			if os.path.exists(path_tmp):
+				os.remove(path_tmp)
+	else:
+		with open(path, 'w', encoding = 'utf-8') as fout:
+			yield fout
+
+
+# exit status with `--exit-code`, when the output file was already up to date
+EXIT_UNCHANGED : int = 3
+
 def main(argv):
+	# subcommands
+	if len(argv) > 1 and argv[1] == 'watch':
+		return watch(argv[:1] + argv[2:])
+	if len(argv) > 1 and argv[1] == 'query':
+		return query(argv[:1] + argv[2:])
+	if len(argv) > 1 and argv[1] == 'merge':
+		return merge(argv[:1] + argv[2:])
+
 	if any(
 			x in argv 
 			for x in ('h', 'help', '-h', '--help')
 		):
 		print(__doc__)
 		return 0
+
+	from omegaconf import OmegaConf
+
+	# stages are always timed, but only reported with `--profile`
+	profiler : Profiler = Profiler()
+
 	# load the config
-	cfg : DictConfig = process_configs(argv)
-
-	for x in ('-e', '--emit-cfg'):
-		if x in argv:
-			# remove the emit-cfg flag from the cfg
-			cfg.pop(x)
-			# print the config as yaml that can be piped to a file
-			print(OmegaConf.to_yaml(cfg))
-			return 0
+	with profiler.stage('config'):
+		cfg : DictConfig = process_configs(argv)
+
+		for x in ('-e', '--emit-cfg'):
+			if x in argv:
+				# remove the emit-cfg flag from the cfg
+				cfg.pop(x)
+				# print the config as yaml that can be piped to a file
+				print(OmegaConf.to_yaml(cfg))
+				return 0
+
+		# OmegaConf is not used past this point
+		settings : Settings = Settings.from_config(cfg)
 	
-	# get all valid files
-	filenames : List[str] = get_valid_files(
-		searchdir = cfg['config']['searchDir'],
-		file_types = cfg['read']['SOURCE_FILES'],
-		exclude = set(cfg['read']['EXCLUDE']),
+	# get all valid files, in each root
+	with profiler.stage('discovery'):
+		files_byRoot : List[List[str]] = [
+			discover_files(settings, root)
+			for root in settings.roots
+		]
+
+		# only keep this shard's files, remembering where they were in the full lists
+		positions_byRoot : List[List[int]] = list()
+		if settings.shard is not None:
+			positions_byRoot = [ shard_indices(files, settings.shard) for files in files_byRoot ]
+			files_byRoot = [
+				[ files[i] for i in positions ]
+				for files,positions in zip(files_byRoot, positions_byRoot)
+			]
+
+	# load the scan caches, if enabled. one per root, since roots can have different read settings
+	caches : List[Optional[ScanCache]] = [None] * len(settings.roots)
+	if settings.cache_enabled:
+		with profiler.stage('cache_load'):
+			caches = [
+				ScanCache(
+					cache_dir = settings.cache_dir,
+					cfg_read = root.read,
+					use_hash = settings.cache_hash,
+					filename = None if len(settings.roots) == 1 else f'scan-{re.sub(r"[^A-Za-z0-9_.-]+", "_", root.name)}.json',
+				)
+				for root in settings.roots
+			]
+
+	if settings.index_enabled:
+		with profiler.stage('index'):
+			root : RootSettings = settings.single_root('index.enabled')
+			index : TodoIndex = TodoIndex(settings.index_path, root.read, root.path)
+			index.refresh(files_byRoot[0], settings.jobs, complete = settings.changed_since is None and settings.shard is None)
+			index.close()
+
+	# files which were skipped, couldnt be read, or had invalid utf-8
+	file_issues : Dict[str, FileIssue] = dict()
+	written : bool = True
+
+	if settings.shard is not None:
+		scan_and_write_shard(settings, files_byRoot, positions_byRoot, caches, profiler, file_issues)
+	elif settings.write_format == 'jsonl':
+		multi_root : bool = len(settings.roots) > 1
+		# items are written as soon as each file is scanned, without keeping them around
+		with profiler.stage('scan_write'), open_output(get_output_path(settings)) as fout:
+			for idx,_,file_items in iter_search_groups(
+					groups = [
+						(files, root.read, cache)
+						for root,files,cache in zip(settings.roots, files_byRoot, caches)
+					],
+					jobs = settings.jobs,
+					file_stats = profiler.files if settings.profile else None,
+					file_issues = file_issues,
+				):
+				if file_items:
+					write_items_jsonl(file_items, fout, root = settings.roots[idx].name if multi_root else None)
+					fout.flush()
+
+		save_caches(caches, profiler)
+	else:
+		written = scan_and_write_markdown(settings, files_byRoot, caches, profiler, file_issues)
+
+	report_file_issues(file_issues, settings.verbose)
+
+	for root,cache in zip(settings.roots, caches):
+		if cache is not None:
+			print(
+				cache.stats_str() if len(settings.roots) == 1 else f'{root.name}: {cache.stats_str()}',
+				file = sys.stderr,
+			)
+
+	if settings.profile:
+		profile_path : str = get_profile_path(settings)
+		profiler.save(profile_path)
+		print(profiler.summary_str(settings.profile_top), file = sys.stderr)
+		print(f'# profile written to {profile_path}', file = sys.stderr)
+
+	if not written:
+		print(f'# {get_output_path(settings)} is up to date, not rewritten', file = sys.stderr)
+		if settings.exit_code:
+			return EXIT_UNCHANGED
+	return 0
+
+
+def save_caches(caches : List[Optional[ScanCache]], profiler : Profiler) -> None:
+	if any(cache is not None for cache in caches):
+		with profiler.stage('cache_save'):
+			for cache in caches:
+				if cache is not None:
+					cache.save()
+
+
+def report_file_issues(file_issues : Dict[str, FileIssue], verbose : bool = False) -> None:
+	"""warn about each file which couldnt be read, and print counts of all files with issues to stderr -- listing each of them if `verbose`"""
+	if not file_issues:
+		return
+
+	counts : Dict[str,int] = defaultdict(int)
+	for file,(kind,detail) in file_issues.items():
+		counts[kind] += 1
+		if kind == 'error':
+			warnings.warn(f'could not scan {file}: {detail}')
+		elif verbose:
+			print(f'# {kind}: {file}: {detail}', file = sys.stderr)
+
+	print(
+		f'# {counts["skipped"]} files skipped (too large or binary), {counts["error"]} could not be read, {counts["encoding"]} had invalid utf-8'
+		+ ('' if verbose else ', set config.verbose=true to list them'),
+		file = sys.stderr,
 	)
 
+
+def scan_and_write_markdown(
+		settings : Settings,
+		files_byRoot : List[List[str]],
+		caches : List[Optional[ScanCache]],
+		profiler : Profiler,
+		file_issues : Dict[str, FileIssue],
+	) -> bool:
+	"""scan all files of every root through one shared worker pool, then sort and write the items as a markdown (or html) document. returns whether the output file was written, see `write_todo_file()`"""
+
 	# get todo items from files
-	todo_items : List[TodoItem] = search_files(
-		files_search = filenames,
-		cfg_read = cfg['read'],
-	)
+	with profiler.stage('scan'):
+		items_byRoot : List[List[TodoItem]] = [ list() for _ in settings.roots ]
+		for idx,_,file_items in iter_search_groups(
+				groups = [
+					(files, root.read, cache)
+					for root,files,cache in zip(settings.roots, files_byRoot, caches)
+				],
+				jobs = settings.jobs,
+				file_stats = profiler.files if settings.profile else None,
+				file_issues = file_issues,
+			):
+			items_byRoot[idx].extend(file_items)
+
+	save_caches(caches, profiler)
+
+	with profiler.stage('sort'):
+		items_byRoot = [
+			sort_items(root_items, settings.attr_sort_order, root.read.tags) # type: ignore
+			for root,root_items in zip(settings.roots, items_byRoot)
+		]
 
-	# sort, put together
-	# CRIT: there is some sort of bug with loading configs that I can't pin down
-	data : str = write_items_ms_template(
-		td_items = todo_items,
-		item_format = cfg['write']['item_format'],
-		attr_sort_order = cfg['write']['attr_sort_order'],
-	)
+	# rendering and writing are one stage, since the stream renderer writes as it goes
+	with profiler.stage('write'):
+		return write_todo_file_byRoot(
+			settings,
+			items_byRoot,
+			[ len(files) for files in files_byRoot ],
+			[
+				{ file : file_issues[file] for file in files if file in file_issues }
+				for files in files_byRoot
+			],
+			presorted = True,
+		)
 
-	# put metadata (# items, # files, etc) in yaml header of output file
-	metadata_dict : Dict[str,Any] = { 'metadata' : {
-		'searched_files' : len(filenames),
+
+def get_items_metadata(
+		todo_items : List[TodoItem],
+		searched_files : int,
+		file_issues : Optional[Mapping[str, FileIssue]] = None,
+	) -> Dict[str,int]:
+	"""counts of items, files, tags, and files with issues, for the header of the output file"""
+	issue_kinds : List[str] = [ kind for kind,_ in (file_issues or dict()).values() ]
+	return {
+		'searched_files' : searched_files,
 		'files_with_todos' : len(set(x.file for x in todo_items)),
 		'num_items' : len(todo_items),
 		'num_unique_tags' : len(set(x.tag for x in todo_items)),
-	}}
-
-	# write to file
-	# TODO: print to console if no output file specified
-	with open(cfg['config']['file_todo'], 'w', encoding = 'utf-8') as fout:
-		print('---', file = fout)
-		print(yaml.dump(HEADER_YAML), file = fout)
-		print(yaml.dump(metadata_dict), file = fout)
+		'skipped_files' : issue_kinds.count('skipped'),
+		'error_files' : issue_kinds.count('error'),
+		'invalid_utf8_files' : issue_kinds.count('encoding'),
+	}
+
+
+def write_todo_file_byRoot(
+		settings : Settings,
+		items_byRoot : List[List[TodoItem]],
+		searched_byRoot : List[int],
+		issues_byRoot : Optional[List[Dict[str, FileIssue]]] = None,
+		presorted : bool = False,
+	) -> bool:
+	"""`write_todo_file()` with the items, number of searched files, and files with issues of each root in `settings.roots`"""
+	if issues_byRoot is None:
+		issues_byRoot = [ dict() for _ in settings.roots ]
+	return write_todo_file(
+		settings = settings,
+		todo_items = [ x for root_items in items_byRoot for x in root_items ],
+		searched_files = sum(searched_byRoot),
+		roots = (
+			list(zip(settings.roots, items_byRoot, searched_byRoot, issues_byRoot))
+			if len(settings.roots) > 1
+			else None
+		),
+		file_issues = { file : issue for root_issues in issues_byRoot for file,issue in root_issues.items() },
+		presorted = presorted,
+	)
+
+
+def write_todo_file(
+		settings : Settings,
+		todo_items : List[TodoItem],
+		searched_files : int,
+		roots : Optional[List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]]] = None,
+		file_issues : Optional[Mapping[str, FileIssue]] = None,
+		presorted : bool = False,
+	) -> bool:
+	"""sort and render `todo_items`, and write them to `settings.file_todo` with a yaml header (or to `get_output_path()`, for other formats)
+
+	if `roots` is given, it has the items, number of searched files, and files with issues for each root. every root then gets a top level header with its items under it, and its own metadata in the yaml header. `todo_items`, `searched_files`, and `file_issues` should be the totals over all roots.
+
+	the header has a `content_hash` of everything except the timestamp. if `settings.skip_unchanged` is set and the existing file has the same hash, it is left alone. returns whether the file was written.
+
+	with `write.format: jsonl`, the items are written as JSON lines in the order given instead, with no header. with `write.format: html`, see `write_html_file()`. with `write.split`, see `write_todo_files_split()`
+
+	if `presorted`, the items (of each root, if `roots` is given) are already sorted by `settings.attr_sort_order` with `sort_items()`, so that the caller can time sorting on its own. otherwise they are sorted here, once, and every writer below only renders them
+	"""
+	if settings.write_format == 'jsonl':
+		with open_output(get_output_path(settings)) as fout:
+			if roots is None:
+				write_items_jsonl(todo_items, fout)
+			else:
+				for root,root_items,_,_ in roots:
+					write_items_jsonl(root_items, fout, root = root.name)
+		return True
+
+	if settings.renderer not in ('stream', 'chevron'):
+		raise ValueError(f"unknown renderer: {settings.renderer}, expected 'stream' or 'chevron'")
+
+	if not presorted:
+		if roots is None:
+			todo_items = sort_items(todo_items, settings.attr_sort_order, settings.read.tags) # type: ignore
+		else:
+			roots = [
+				(root, sort_items(root_items, settings.attr_sort_order, root.read.tags), root_searched, root_issues) # type: ignore
+				for root,root_items,root_searched,root_issues in roots
+			]
+
+	metadata : Dict[str,Any] = get_items_metadata(todo_items, searched_files, file_issues)
+	if roots is not None:
+		metadata['roots'] = {
+			root.name : get_items_metadata(root_items, root_searched, root_issues)
+			for root,root_items,root_searched,root_issues in roots
+		}
+
+	roots_all : List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]] = (
+		roots if roots is not None else [(settings.roots[0], todo_items, searched_files, dict(file_issues or dict()))]
+	)
+	if settings.write_format == 'html':
+		return write_html_file(settings, metadata, roots_all)
+	if settings.split:
+		return write_todo_files_split(settings, metadata, roots_all)
+
+	def write_body(fout : TextIO) -> None:
+		if roots is None:
+			write_items_markdown(settings, fout, todo_items, settings.read.tags, presorted = True)
+		else:
+			# each root is a top level header, with the usual grouping nested under it
+			for root,root_items,_,_ in roots:
+				print(f'# [`{root.name}`]({root.path}) -- {_hdr_items_count(len(root_items))}', file = fout)
+				write_items_markdown(settings, fout, root_items, root.read.tags, header_offset = 1, presorted = True)
+
+	return write_markdown_document(
+		path = settings.file_todo,
+		settings = settings,
+		front_matter = [
+			# put metadata (# items, # files, etc) in yaml header of output file
+			yaml_dump({ 'metadata' : metadata }),
+		],
+		front_matter_unhashed = [ yaml_dump(dict(cfg = settings.raw)) ],
+		write_body = write_body,
+	)
+
+
+def write_items_markdown(
+		settings : Settings,
+		fout : TextIO,
+		td_items : List[TodoItem],
+		tag_order : Sequence[str],
+		header_offset : int = 0,
+		attr_sort_order : Optional[Sequence[str]] = None,
+		presorted : bool = False,
+	) -> None:
+	"""sort and render `td_items` to `fout` with the renderer and item format from `settings`, grouped by `attr_sort_order` (defaults to `settings.attr_sort_order`). if `presorted`, `td_items` are already sorted by it and are only rendered"""
+	if attr_sort_order is None:
+		attr_sort_order = settings.attr_sort_order
+	# sort, put together
+	# CRIT: there is some sort of bug with loading configs that I can't pin down
+	if settings.renderer == 'stream':
+		write_items_stream(
+			td_items = td_items,
+			fout = fout,
+			item_format = settings.item_format, # type: ignore
+			attr_sort_order = list(attr_sort_order), # type: ignore
+			tag_order = tag_order,
+			header_offset = header_offset,
+			presorted = presorted,
+		)
+		print(file = fout)
+	else:
 		print(
-			yaml.dump(
-				dict(cfg = OmegaConf.to_container(cfg, resolve=True)),
-				sort_keys = False),
+			write_items_ms_template(
+				td_items = td_items,
+				item_format = settings.item_format, # type: ignore
+				attr_sort_order = list(attr_sort_order), # type: ignore
+				tag_order = tag_order,
+				header_offset = header_offset,
+				presorted = presorted,
+			),
 			file = fout,
 		)
-		print('# suggested command for conversion to html', file = fout)
-		print('cmd: "pandoc todo-inline.md -o todo-inline.html --from markdown+backtick_code_blocks+fenced_code_attributes --standalone --toc --toc-depth 1"', file = fout)
-		print('---', file = fout)
-		print(data, file = fout)
+
+
+def write_markdown_document(
+		path : Optional[str],
+		settings : Settings,
+		front_matter : List[str],
+		write_body : Callable[[TextIO], None],
+		title : Optional[str] = None,
+		front_matter_unhashed : Sequence[str] = (),
+	) -> bool:
+	"""write a markdown document to `path` (stdout if `None`): a yaml header, the yaml strings in `front_matter` and `front_matter_unhashed`, then whatever `write_body` writes
+
+	the header has a `content_hash` of `front_matter` and the body. if `settings.skip_unchanged` is set and the existing file has the same hash, it is left alone. returns whether the file was written.
+
+	`front_matter_unhashed` is for things which dont change the content, like the config -- whose options such as `config.jobs` or `write.exit_code` only change how the file is made. options which do change the content also change the body.
+	"""
+	import hashlib
+	import shutil
+	import tempfile
+
+	hasher = hashlib.sha1()
+	for section in front_matter:
+		hasher.update(section.encode('utf-8'))
+
+	# the header needs the hash of the body, so it is rendered first -- still streamed, into memory if small and a temporary file otherwise
+	with tempfile.SpooledTemporaryFile(max_size = 2**24, mode = 'w+', encoding = 'utf-8') as body:
+		write_body(HashingWriter(body, hasher)) # type: ignore
+
+		content_hash : str = hasher.hexdigest()
+		if (
+				settings.skip_unchanged
+				and path is not None
+				and read_content_hash(path) == content_hash
+			):
+			return False
+
+		header : Dict[str,Any] = { **HEADER_YAML, "content_hash" : content_hash }
+		if title is not None:
+			header["title"] = title
+		timestamp : Optional[str] = get_timestamp(settings.timestamp)
+		if timestamp is not None:
+			header["updated"] = timestamp
+
+		file_md : str = 'todo-inline.md' if path is None else os.path.basename(path)
+		file_html : str = os.path.splitext(file_md)[0] + '.html'
+
+		# write to file, or stdout if no output file specified
+		with open_output(path, atomic = True) as fout:
+			print('---', file = fout)
+			print(yaml_dump(header, sort_keys = True), file = fout)
+			for section in (*front_matter, *front_matter_unhashed):
+				print(section, file = fout)
+			print('# suggested command for conversion to html', file = fout)
+			print(f'cmd: "pandoc {file_md} -o {file_html} --from markdown+backtick_code_blocks+fenced_code_attributes --standalone --toc --toc-depth 1"', file = fout)
+			print('---', file = fout)
+
+			body.seek(0)
+			shutil.copyfileobj(body, fout) # type: ignore
+
+	return True
+
+
+def write_todo_files_split(
+		settings : Settings,
+		metadata : Dict[str,Any],
+		roots : List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]],
+	) -> bool:
+	"""write each top level group of `settings.attr_sort_order` to its own file, then an index with counts and links to them at `settings.file_todo`
+
+	group files are named `<file_todo without extension>.<group>.md` (with the root name before the group if there are several roots). they go in the same directory as `file_todo`, so links to source files work the same as in a single file. groups are rendered in parallel, with up to `settings.jobs` processes. each file is only rewritten if its content changed, see `write_markdown_document()`, and group files listed in the previous index which are no longer needed are removed.
+
+	### Parameters:
+	 - `settings : Settings`
+	 - `metadata : Dict[str,Any]`
+	   metadata for the header of the index, see `get_items_metadata()`
+	 - `roots : List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]]`
+	   items, number of searched files, and files with issues for each root, with the items sorted by `settings.attr_sort_order`
+
+	### Returns:
+	 - `bool`
+	   whether any file was written
+	"""
+	if settings.file_todo is None:
+		raise ValueError('write.split needs config.file_todo to be a file, not stdout')
+	if len(settings.attr_sort_order) < 2:
+		raise ValueError(f'write.split needs at least two attributes in write.attr_sort_order, one to split by and one to sort by, got {list(settings.attr_sort_order)}')
+
+	attr : str = settings.attr_sort_order[0]
+	multi_root : bool = len(roots) > 1
+	stem, ext = os.path.splitext(settings.file_todo)
+
+	# arguments of `_write_group_file()` for each group, and `(root, [(group, path, items)])` for the index
+	tasks : List[Tuple[Settings, str, str, Any, List[TodoItem], Sequence[str]]] = list()
+	index_entries : List[Tuple[RootSettings, List[Tuple[Any, str, List[TodoItem]]]]] = list()
+	names_used : Set[str] = set()
+	for root,root_items,_,_ in roots:
+		entries : List[Tuple[Any, str, List[TodoItem]]] = list()
+		for val,group_items in group_sorted_items(root_items, attr): # type: ignore
+			slug : str = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(val)).strip('_.') or 'items'
+			if multi_root:
+				slug = f'{re.sub(r"[^A-Za-z0-9_.-]+", "_", root.name)}.{slug}'
+			# distinct values can have the same slug, or differ only in case
+			name : str = slug
+			n_same : int = 1
+			while name.lower() in names_used:
+				n_same += 1
+				name = f'{slug}-{n_same}'
+			names_used.add(name.lower())
+
+			path : str = f'{stem}.{name}{ext or ".md"}'
+			title : str = f'todo-inline: {root.name}: {val}' if multi_root else f'todo-inline: {val}'
+			tasks.append((settings, path, title, val, group_items, root.read.tags))
+			entries.append((val, path, group_items))
+		index_entries.append((root, entries))
+
+	written : List[bool]
+	jobs : int = settings.jobs or os.cpu_count() or 1
+	if jobs <= 1 or len(tasks) < 2:
+		written = [ _write_group_file(*task) for task in tasks ]
+	else:
+		from concurrent.futures import ProcessPoolExecutor
+		with ProcessPoolExecutor(max_workers = min(jobs, len(tasks))) as pool:
+			written = list(pool.map(
+				_write_group_file,
+				*zip(*tasks),
+				chunksize = max(1, len(tasks) // (jobs * 4)),
+			))
+
+	# remove group files of the previous run which are not used anymore
+	split_files : List[str] = [ os.path.basename(path) for _,path,_,_,_,_ in tasks ]
+	split_files_old : Any = None
+	try:
+		from omegaconf import OmegaConf
+		# plain containers, since `extract_frontmatter_yaml()` gives a `DictConfig`
+		split_files_old = OmegaConf.to_container(extract_frontmatter_yaml(settings.file_todo)).get('split_files') # type: ignore
+	except Exception:
+		pass
+	dir_todo : str = os.path.dirname(settings.file_todo)
+	for name_old in (split_files_old if isinstance(split_files_old, list) else list()):
+		path_old : str = os.path.join(dir_todo, str(name_old))
+		# only ever remove files named like ours
+		if name_old not in split_files and os.path.basename(path_old).startswith(os.path.basename(stem) + '.') and os.path.isfile(path_old):
+			os.remove(path_old)
+
+	def write_index(fout : TextIO) -> None:
+		for root,entries in index_entries:
+			if multi_root:
+				print(f'# [`{root.name}`]({root.path}) -- {_hdr_items_count(sum(len(items) for _,_,items in entries))}', file = fout)
+			for val,path,items in entries:
+				label : str = f'`{val}`' if attr == 'file' else f'**{val}**' if attr == 'tag' else str(val)
+				print(f' - [{label}]({os.path.basename(path)}) -- {_hdr_items_count(len(items))}', file = fout)
+			print(file = fout)
+
+	written_index : bool = write_markdown_document(
+		path = settings.file_todo,
+		settings = settings,
+		front_matter = [
+			yaml_dump({ 'metadata' : metadata }),
+			yaml_dump({ 'split_files' : split_files }),
+		],
+		front_matter_unhashed = [ yaml_dump(dict(cfg = settings.raw)) ],
+		write_body = write_index,
+	)
+
+	return written_index or any(written)
+
+
+def _write_group_file(
+		settings : Settings,
+		path : str,
+		title : str,
+		group_val : Any,
+		td_items : List[TodoItem],
+		tag_order : Sequence[str],
+	) -> bool:
+	"""write the items of one group of `write_todo_files_split()`, whose value of the first of `settings.attr_sort_order` is `group_val`, grouped by the rest. used as the unit of work for the process pool"""
+	return write_markdown_document(
+		path = path,
+		settings = settings,
+		front_matter = [
+			yaml_dump({
+				'group' : { settings.attr_sort_order[0] : group_val },
+				'metadata' : {
+					'files_with_todos' : len(set(x.file for x in td_items)),
+					'num_items' : len(td_items),
+					'num_unique_tags' : len(set(x.tag for x in td_items)),
+				},
+			}),
+		],
+		write_body = lambda fout: write_items_markdown(
+			settings, fout, td_items, tag_order,
+			attr_sort_order = settings.attr_sort_order[1:],
+			presorted = True,
+		),
+		title = title,
+	)
+
+
+# styles of `write_html_file()`. top level groups use `content-visibility`, so the browser only lays out the ones on screen
+HTML_STYLE : str = """
+body { max-width: 50em; margin: auto; padding: 0 1em; font-family: sans-serif; }
+section { content-visibility: auto; contain-intrinsic-size: auto 50em; }
+nav li, ul.items li { list-style: none; }
+ul.items li { margin: 0.3em 0; }
+ul.items li::before { content: '\\2610\\00a0'; }
+ul.items details { margin-left: 1.6em; }
+summary { cursor: pointer; color: #777; font-size: 0.85em; }
+pre { background: #f6f8fa; padding: 0.5em; overflow-x: auto; }
+pre span { color: #999; user-select: none; }
+"""
+
+# script of `write_html_file()`: when a `<details>` is first opened, loads the file with its context (if not already loaded) and fills it in.
+# each context file calls `itodoContext(<chunk>, [<contexts>])`. when writing to stdout, these calls are inlined at the end of the page instead
+HTML_SCRIPT : str = """
+(function() {
+	var dir = document.body.dataset.context, size = +document.body.dataset.chunk;
+	var chunks = {}, pending = {};
+	window.itodoContext = function(k, contexts) {
+		if (pending[k]) { pending[k](contexts); } else { chunks[k] = Promise.resolve(contexts); }
+	};
+	function getChunk(k) {
+		if (!chunks[k]) {
+			chunks[k] = new Promise(function(resolve, reject) {
+				pending[k] = resolve;
+				var s = document.createElement('script');
+				s.src = dir + '/' + k + '.js';
+				s.onerror = function() { delete chunks[k]; reject(s.src); };
+				document.head.appendChild(s);
+			});
+		}
+		return chunks[k];
+	}
+	document.addEventListener('toggle', function(e) {
+		var d = e.target;
+		if (!d.open || d.dataset.i === undefined || d.dataset.loaded) return;
+		d.dataset.loaded = 1;
+		var i = +d.dataset.i, start = +d.dataset.line;
+		getChunk(Math.floor(i / size)).then(function(contexts) {
+			var pre = document.createElement('pre');
+			contexts[i % size].split('\\n').forEach(function(line, j) {
+				var n = document.createElement('span');
+				n.textContent = String(start + j).padStart(6) + '  ';
+				pre.append(n, line + '\\n');
+			});
+			d.append(pre);
+		}, function(src) {
+			delete d.dataset.loaded;
+			d.append('could not load ' + src);
+		});
+	}, true);
+})();
+"""
+
+
+def format_attr_header_html(
+		attr : SortableAttrTodoItems,
+		val : Any,
+		lst_items : List[TodoItem],
+	) -> str:
+	"""`format_attr_header()`, as html"""
+	from html import escape
+	if attr == 'tag':
+		return f'<b>{escape(val)}</b> -- {_hdr_items_count(len(lst_items))}'
+	elif attr == 'file':
+		return f'<a href="{escape(val)}"><code>{escape(val)}</code></a> -- {_hdr_items_count(len(lst_items))}'
+	else:
+		return escape(str(val))
+
+
+def iter_items_html(
+		td_items : List[TodoItem],
+		attr_sort_order : List[SortableAttrTodoItems],
+		contexts : Optional[List[str]],
+		toc : List[str],
+		lvl : int = 0,
+		tag_order : Optional[Sequence[str]] = None,
+		header_offset : int = 0,
+		context_ids : Optional[Iterator[int]] = None,
+		presorted : bool = False,
+	) -> Iterator[str]:
+	"""sort `td_items` by the attributes in `attr_sort_order`, and yield the html of their headers and items piece by piece -- see `iter_items_rendered()`, which does the same for markdown
+
+	### Parameters:
+	 - `td_items : List[TodoItem]`
+	   list of items
+	 - `attr_sort_order : List[SortableAttrTodoItems]`
+	   attributes to sort by. all but the last are used for headers
+	 - `contexts : Optional[List[str]]`
+	   if not `None`, the context of each item is appended here instead of being put in the page, and the item gets an empty `<details>` for it
+	 - `toc : List[str]`
+	   the header of each top level group is appended here, and the header links to `#h<index in toc>`
+	 - `lvl : int`
+	   the current level -- index into `attr_sort_order`
+	   (defaults to `0`)
+	 - `tag_order : Optional[Sequence[str]]`
+	   order in which tags are sorted, see `get_sortkey_from_attr()`
+	   (defaults to `None`)
+	 - `header_offset : int`
+	   extra levels added to every header
+	   (defaults to `0`)
+	 - `context_ids : Optional[Iterator[int]]`
+	   gives the index of each context appended to `contexts`, which the `<details>` refers to. share one between calls which write to the same page
+	   (defaults to `None`, counting from 0)
+	 - `presorted : bool`
+	   `td_items` are already sorted, see `iter_items_rendered()`
+	   (defaults to `False`)
+	"""
+	from html import escape
+
+	current_attr : SortableAttrTodoItems = attr_sort_order[lvl]
+	load_context : bool = (lvl == 0) and contexts is not None
+	if context_ids is None:
+		context_ids = count()
+
+	if lvl == 0 and not presorted:
+		td_items = sort_items(td_items, attr_sort_order, tag_order)
+
+	# base case: end of `attr_sort_order`
+	if lvl >= len(attr_sort_order) - 1:
+		if load_context:
+			load_contexts(td_items)
+		yield '<ul class="items">\n'
+		for x in td_items:
+			details : str = ''
+			if contexts is not None:
+				details = f'<details data-i="{next(context_ids)}" data-line="{x.lineNum}"><summary>context</summary></details>'
+				# `context_processed` is indented by a tab for markdown code blocks, which isnt needed here
+				contexts.append(x.context_processed.replace('\n\t', '\n')[1:])
+			yield f'<li>{escape(x.content)} <a href="{escape(x.file)}#L{x.lineNum}">(line {x.lineNum})</a>{details}</li>\n'
+		yield '</ul>\n'
+		if load_context:
+			release_contexts(td_items)
+		return
+
+	for attrVal,lst_items in group_sorted_items(items_sorted = td_items, attr = current_attr):
+		if load_context:
+			load_contexts(lst_items)
+
+		header : str = format_attr_header_html(attr = current_attr, val = attrVal, lst_items = lst_items)
+		level : int = min(lvl + 1 + header_offset, 6)
+		if lvl == 0:
+			yield f'<section>\n<h{level} id="h{len(toc)}">{header}</h{level}>\n'
+			toc.append(header)
+		else:
+			yield f'<h{level}>{header}</h{level}>\n'
+
+		yield from iter_items_html(
+			td_items = lst_items,
+			attr_sort_order = attr_sort_order,
+			contexts = contexts,
+			toc = toc,
+			lvl = lvl + 1,
+			header_offset = header_offset,
+			context_ids = context_ids,
+		)
+
+		if lvl == 0:
+			yield '</section>\n'
+		if load_context:
+			release_contexts(lst_items)
+
+
+def write_html_file(
+		settings : Settings,
+		metadata : Dict[str,Any],
+		roots : List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]],
+	) -> bool:
+	"""write the items as a standalone html page, for `write.format: html`, to `get_output_path()`
+
+	the page has only the headers and items, with a table of contents of the top level groups. if `settings.item_format` uses context, each item gets a collapsed `<details>`, and the contexts go in separate script files in `<page without extension>.context/`, with `settings.html_chunk` contexts in each. one of these is loaded only when an item in it is first expanded, so the size of the page and the time to open it dont depend on the amount of context. when writing to stdout, the contexts are inlined at the end of the page instead -- still not parsed as html.
+
+	the page has a `content_hash` (of the metadata, items, and contexts, see `write_markdown_document()`) in a `<meta>` tag. if `settings.skip_unchanged` is set and the existing page has the same hash, nothing is written. returns whether the page was written.
+
+	### Parameters:
+	 - `settings : Settings`
+	 - `metadata : Dict[str,Any]`
+	   metadata for the page, see `get_items_metadata()`
+	 - `roots : List[Tuple[RootSettings, List[TodoItem], int, Dict[str, FileIssue]]]`
+	   items, number of searched files, and files with issues for each root, with the items sorted by `settings.attr_sort_order`
+	"""
+	import hashlib
+	import shutil
+	import tempfile
+	from html import escape
+
+	path : Optional[str] = get_output_path(settings)
+	dir_context : Optional[str] = None if path is None else os.path.splitext(path)[0] + '.context'
+	multi_root : bool = len(roots) > 1
+
+	hasher = hashlib.sha1()
+	hasher.update(json.dumps(metadata).encode('utf-8'))
+	# `</` would end the script element early, it is escaped in JSON strings
+	metadata_json : str = json.dumps({ 'metadata' : metadata, 'cfg' : settings.raw }).replace('</', '<\\/')
+
+	contexts : Optional[List[str]] = list() if format_uses_context(settings.item_format) else None # type: ignore
+	context_ids : Iterator[int] = count()
+	chunk_sizes : List[int] = list()
+	toc : List[str] = list()
+
+	with (
+			tempfile.SpooledTemporaryFile(max_size = 2**24, mode = 'w+', encoding = 'utf-8') as body,
+			tempfile.SpooledTemporaryFile(max_size = 2**24, mode = 'w+b') as chunks,
+		):
+
+		def write_chunks(final : bool = False) -> None:
+			"""move full chunks (or all that is left, if `final`) of `contexts` to `chunks`"""
+			while contexts and (final or len(contexts) >= settings.html_chunk):
+				chunk_data : bytes = (
+					f'itodoContext({len(chunk_sizes)}, '
+					+ json.dumps(contexts[:settings.html_chunk]).replace('</', '<\\/')
+					+ ');\n'
+				).encode('utf-8')
+				del contexts[:settings.html_chunk]
+				hasher.update(chunk_data)
+				chunks.write(chunk_data)
+				chunk_sizes.append(len(chunk_data))
+
+		writer : HashingWriter = HashingWriter(body, hasher) # type: ignore
+		for root,root_items,_,_ in roots:
+			if multi_root:
+				header_root : str = f'<a href="{escape(root.path)}"><code>{escape(root.name)}</code></a> -- {_hdr_items_count(len(root_items))}'
+				writer.write(f'<h1 id="h{len(toc)}">{header_root}</h1>\n')
+				toc.append(header_root)
+			for piece in iter_items_html(
+					td_items = root_items,
+					attr_sort_order = list(settings.attr_sort_order), # type: ignore
+					contexts = contexts,
+					toc = toc,
+					tag_order = root.read.tags,
+					header_offset = 1 if multi_root else 0,
+					context_ids = context_ids,
+					presorted = True,
+				):
+				writer.write(piece)
+				write_chunks()
+		write_chunks(final = True)
+
+		content_hash : str = hasher.hexdigest()
+		if (
+				settings.skip_unchanged
+				and path is not None
+				and read_html_content_hash(path) == content_hash
+			):
+			return False
+
+		# context files first, so the page never links to missing ones
+		chunks.seek(0)
+		if dir_context is not None:
+			os.makedirs(dir_context, exist_ok = True)
+			for k,size in enumerate(chunk_sizes):
+				with open_output(os.path.join(dir_context, f'{k}.js'), atomic = True) as fout:
+					fout.write(chunks.read(size).decode('utf-8'))
+			# remove context files of the previous run which are not used anymore
+			for name_old in os.listdir(dir_context):
+				m_old : Optional[re.Match] = re.fullmatch(r'(\d+)\.js', name_old)
+				if m_old is not None and int(m_old.group(1)) >= len(chunk_sizes):
+					os.remove(os.path.join(dir_context, name_old))
+			if not os.listdir(dir_context):
+				os.rmdir(dir_context)
+
+		title : str = escape(HEADER_YAML['title'])
+		timestamp : Optional[str] = get_timestamp(settings.timestamp)
+		with open_output(path, atomic = True) as fout:
+			fout.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n')
+			fout.write(f'<meta name="content_hash" content="{content_hash}">\n')
+			if timestamp is not None:
+				fout.write(f'<meta name="updated" content="{escape(timestamp)}">\n')
+			fout.write(f'<title>{title}</title>\n<style>{HTML_STYLE}</style>\n')
+			fout.write(f'<script type="application/json" id="metadata">{metadata_json}</script>\n</head>\n')
+			fout.write(
+				f'<body data-context="{escape(os.path.basename(dir_context or ""))}" data-chunk="{settings.html_chunk}">\n'
+				f'<script>{HTML_SCRIPT}</script>\n'
+			)
+			fout.write(f'<h1>{title}</h1>\n<p>{_hdr_items_count(metadata["num_items"])} in {metadata["files_with_todos"]} files')
+			fout.write('' if timestamp is None else f', updated {escape(timestamp)}')
+			fout.write('</p>\n<nav><ul>\n')
+			for idx,header in enumerate(toc):
+				fout.write(f'<li><a href="#h{idx}">{header}</a></li>\n')
+			fout.write('</ul></nav>\n')
+
+			body.seek(0)
+			shutil.copyfileobj(body, fout) # type: ignore
+
+			if dir_context is None:
+				for size in chunk_sizes:
+					fout.write(f'<script>{chunks.read(size).decode("utf-8")}</script>\n')
+			fout.write('</body>\n</html>\n')
+
+	return True
+
+
+def read_html_content_hash(path : str) -> Optional[str]:
+	"""`content_hash` from the `<meta>` tag of an existing page written by `write_html_file()`, or `None` if there is no such file or tag"""
+	try:
+		with open(path, 'r', encoding = 'utf-8', errors = 'replace') as f:
+			head : str = f.read(4096)
+	except OSError:
+		return None
+	m_hash : Optional[re.Match] = re.search(r'<meta name="content_hash" content="([0-9a-f]+)">', head)
+	return None if m_hash is None else m_hash.group(1)
+
+
+def yaml_dump(data : Any, sort_keys : bool = False) -> str:
+	"""`yaml.dump()`, using the libyaml emitter if it is available -- same output, but several times faster, which adds up when writing many files"""
+	import yaml
+	return yaml.dump(data, sort_keys = sort_keys, Dumper = getattr(yaml, 'CDumper', yaml.Dumper))
+
+
+class HashingWriter(object):
+	"""minimal text file wrapper which writes to `fout`, and feeds everything written to `hasher` as utf-8"""
+
+	def __init__(self, fout : TextIO, hasher : Any) -> None:
+		self.fout : TextIO = fout
+		self.hasher : Any = hasher
+
+	def write(self, text : str) -> int:
+		self.hasher.update(text.encode('utf-8'))
+		return self.fout.write(text)
+
+	def flush(self) -> None:
+		self.fout.flush()
+
+
+def read_content_hash(path : str) -> Optional[str]:
+	"""`content_hash` from the front matter of an existing output file, or `None` if there is no such file or it has no hash"""
+	try:
+		content_hash : Any = extract_frontmatter_yaml(path).get('content_hash')
+	except Exception:
+		# missing, edited, or not ours -- either way, it gets rewritten
+		return None
+	return None if content_hash is None else str(content_hash)
+
+
+def get_timestamp(timestamp : Optional[str]) -> Optional[str]:
+	"""resolve `write.timestamp`: `'now'` is the current time, unless `SOURCE_DATE_EPOCH` is set (see https://reproducible-builds.org/specs/source-date-epoch/). anything else is used as-is"""
+	if timestamp != 'now':
+		return timestamp
+	source_date_epoch : Optional[str] = os.environ.get('SOURCE_DATE_EPOCH')
+	if source_date_epoch:
+		from datetime import timezone
+		return datetime.fromtimestamp(int(source_date_epoch), tz = timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+	return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -3,4 +3,4 @@ import sys
 from inline_todo.inline_todo import main
 
 if __name__ == "__main__":
-	main(sys.argv)
\ No newline at end of file
+	sys.exit(main(sys.argv))
\ No newline at end of file
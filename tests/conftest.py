@@ -0,0 +1,29 @@
+import os
+from typing import *
+
+import pytest
+
+from inline_todo.inline_todo import main
+
+
+def write_tree(root : str, files : Dict[str,str]) -> None:
+	"""write `files`, a dict of relative path to contents, under `root`"""
+	for path,contents in files.items():
+		path_full : str = os.path.join(root, path)
+		os.makedirs(os.path.dirname(path_full), exist_ok = True)
+		with open(path_full, 'w', encoding = 'utf-8') as f:
+			f.write(contents)
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch) -> Callable[..., int]:
+	"""run the command line in `tmp_path` with the given arguments, returning the exit status"""
+	monkeypatch.chdir(tmp_path)
+	monkeypatch.setenv('SOURCE_DATE_EPOCH', '0')
+	return lambda *args: main(['inline_todo', *args])
+
+
+def read_body(path) -> str:
+	"""contents of a markdown output file after its yaml front matter"""
+	with open(path, 'r', encoding = 'utf-8') as f:
+		return f.read().split('\n---\n', 1)[1]
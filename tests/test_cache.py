@@ -0,0 +1,42 @@
+import os
+
+from inline_todo.inline_todo import CONFIG_DEFAULT, ReadSettings, ScanCache, iter_search_files
+
+from conftest import write_tree
+
+
+def scan(files, cache):
+	return { file : [ x.content for x in items ] for file,items in iter_search_files(files, CONFIG_DEFAULT['read'], jobs = 1, cache = cache) }
+
+
+def test_cache_hit(tmp_path):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\n' })
+	files = [ str(tmp_path / 'a.py') ]
+	cfg_read = ReadSettings.from_dict(CONFIG_DEFAULT['read'])
+
+	cache = ScanCache(str(tmp_path / 'cache'), cfg_read)
+	assert scan(files, cache) == { files[0] : ['TODO: one'] }
+	cache.save()
+
+	cache = ScanCache(str(tmp_path / 'cache'), cfg_read)
+	assert scan(files, cache) == { files[0] : ['TODO: one'] }
+	assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_cache_edit_during_scan(tmp_path):
+	"""an entry stored with the stat from before the scan is stale if the file was edited after that"""
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\n' })
+	file = str(tmp_path / 'a.py')
+	cfg_read = ReadSettings.from_dict(CONFIG_DEFAULT['read'])
+	st = os.stat(file)
+
+	cache = ScanCache(str(tmp_path / 'cache'), cfg_read)
+	# edited while it was being scanned
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\n# TODO: two\n' })
+	os.utime(file, ns = (st.st_atime_ns, st.st_mtime_ns + 10**9))
+	cache.put(file, [], st)
+	cache.save()
+
+	cache = ScanCache(str(tmp_path / 'cache'), cfg_read)
+	assert cache.get(file) is None
+	assert scan([file], cache) == { file : ['TODO: one', 'TODO: two'] }
@@ -0,0 +1,92 @@
+import pytest
+
+from inline_todo.inline_todo import CONFIG_DEFAULT, MAP_EXTENSION_TO_LANGUAGE, ReadSettings, TagMatcher, scrape_items
+
+from conftest import write_tree
+
+READ_PARTIAL = {
+	'tags' : { 'list' : ['TODO', 'FIXME', 'NOTE'] },
+	'MAX_SEARCH_LEN' : 15,
+	'SOURCE_FILES' : ['py', 'c', 'sh', 'js', 'm'],
+	'EXCLUDE' : [],
+}
+
+SOURCES = {
+	'a.py' : '\n'.join([
+		'x = "# TODO: in a string"',
+		'y = 1  # TODO: after code',
+		'def f():',
+		'    """',
+		'    FIXME: in a docstring',
+		'    """',
+		"    return '# NOTE: single quoted'",
+		'',
+	]),
+	'b.c' : '\n'.join([
+		'char *s = "// TODO: in a string";',
+		'int x; /* FIXME: block */',
+		'/*',
+		' * NOTE: block, second line',
+		' */',
+		'int y; // TODO: line comment',
+		'',
+	]),
+	'c.sh' : '\n'.join([
+		'echo "$#" # TODO: after a parameter count',
+		"echo '# FIXME: quoted'",
+		'',
+	]),
+	'd.m' : '\n'.join([
+		"x = y';  % TODO: after a transpose",
+		's = "100% NOTE: in a string";',
+		'%{',
+		'FIXME: block comment',
+		'%}',
+		'',
+	]),
+}
+
+# how a comment is written in the files of each extension, which doesnt always follow from the language the extension is mapped to
+COMMENT_BY_EXTENSION = {
+	**dict.fromkeys(['c', 'h', 'cpp', 'hpp', 'cxx', 'hxx', 'java', 'js'], '// {}'),
+	**dict.fromkeys(['py', 'sh'], '# {}'),
+	**dict.fromkeys(['m', 'tex', 'tikz'], '% {}'),
+	**dict.fromkeys(['html', 'xml'], '<!-- {} -->'),
+}
+
+
+def scrape(path, cfg_read):
+	cfg_read = ReadSettings.coerce(cfg_read)
+	return [ (x.lineNum, x.content) for x in scrape_items(path, cfg_read, TagMatcher.from_config(cfg_read)) ]
+
+
+def test_default_matches_cli():
+	assert ReadSettings.from_dict(READ_PARTIAL).comments == CONFIG_DEFAULT['read']['comments'] == 'language'
+	assert ReadSettings._field_defaults['comments'] == 'language'
+
+
+@pytest.mark.parametrize('engine', ['lines', 'mmap'])
+def test_language_comments(tmp_path, engine):
+	write_tree(str(tmp_path), SOURCES)
+	cfg_read = { **READ_PARTIAL, 'engine' : engine }
+	assert scrape(str(tmp_path / 'a.py'), cfg_read) == [(2, 'TODO: after code'), (5, 'FIXME: in a docstring')]
+	assert scrape(str(tmp_path / 'b.c'), cfg_read) == [(2, 'FIXME: block'), (4, 'NOTE: block, second line'), (6, 'TODO: line comment')]
+	assert scrape(str(tmp_path / 'c.sh'), cfg_read) == [(1, 'TODO: after a parameter count')]
+	assert scrape(str(tmp_path / 'd.m'), cfg_read) == [(1, 'TODO: after a transpose'), (4, 'FIXME: block comment')]
+
+
+def test_every_extension_has_a_comment():
+	assert set(COMMENT_BY_EXTENSION) == set(MAP_EXTENSION_TO_LANGUAGE)
+
+
+@pytest.mark.parametrize('ext', sorted(MAP_EXTENSION_TO_LANGUAGE))
+def test_comment_found_by_extension(tmp_path, ext):
+	write_tree(str(tmp_path), { f'x.{ext}' : 'code\n' + COMMENT_BY_EXTENSION[ext].format('TODO: found') + '\n' })
+	cfg_read = { **READ_PARTIAL, 'SOURCE_FILES' : [ext] }
+	assert scrape(str(tmp_path / f'x.{ext}'), cfg_read) == [(2, 'TODO: found')]
+
+
+def test_prefix_finds_strings(tmp_path):
+	write_tree(str(tmp_path), SOURCES)
+	cfg_read = { **READ_PARTIAL, 'comments' : 'prefix' }
+	assert (1, 'TODO: in a string"') in scrape(str(tmp_path / 'a.py'), cfg_read)
@@ -0,0 +1,73 @@
+import json
+import re
+from html import unescape
+
+from conftest import write_tree
+
+
+def load_contexts(text):
+	"""contexts from `itodoContext(k, [...])` calls, in order of `k`"""
+	chunks = dict()
+	for m in re.finditer(r'itodoContext\((\d+), (\[.*?\])\);', text):
+		chunks[int(m.group(1))] = json.loads(m.group(2))
+	assert sorted(chunks) == list(range(len(chunks)))
+	return [ x for k in sorted(chunks) for x in chunks[k] ]
+
+
+def test_html_page_and_contexts(tmp_path, run):
+	write_tree(str(tmp_path), { f'f{i}.py' : f'# TODO: item {i}\nx = {i}\n\ny = 2\n' for i in range(7) })
+	assert run('write.format=html', 'write.html_chunk=3') == 0
+	page = (tmp_path / 'todo-inline.html').read_text()
+	assert not (tmp_path / 'todo-inline.md').exists()
+
+	# contexts are only in the context files, which each item refers to by index
+	assert 'x = 0' not in page
+	assert re.findall(r'<details data-i="(\d+)"', page) == [ str(i) for i in range(7) ]
+	assert sorted(x.name for x in (tmp_path / 'todo-inline.context').iterdir()) == ['0.js', '1.js', '2.js']
+	contexts = load_contexts(''.join((tmp_path / 'todo-inline.context' / f'{k}.js').read_text() for k in range(3)))
+	assert contexts == [ f'# TODO: item {i}\nx = {i}\ny = 2' for i in range(7) ]
+
+	# fewer chunks, and then no contexts at all
+	assert run('write.format=html', 'write.html_chunk=5') == 0
+	assert sorted(x.name for x in (tmp_path / 'todo-inline.context').iterdir()) == ['0.js', '1.js']
+	assert run('write.format=html', 'write.item_format=md') == 0
+	assert not (tmp_path / 'todo-inline.context').exists()
+	assert '<details' not in (tmp_path / 'todo-inline.html').read_text()
+
+
+def test_html_escaping(tmp_path, run):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: <b>x</b> & "q" </script>\ns = "</script>"\n' })
+	assert run('write.format=html') == 0
+	page = (tmp_path / 'todo-inline.html').read_text()
+	items = re.findall(r'<li>(.*?) <a href="(.*?)">', page)
+	assert [ (unescape(a), unescape(b)) for a,b in items ] == [('TODO: <b>x</b> & "q" </script>', './a.py#L1')]
+	context_file = (tmp_path / 'todo-inline.context' / '0.js').read_text()
+	assert '</script>' not in context_file
+	assert load_contexts(context_file) == ['# TODO: <b>x</b> & "q" </script>\ns = "</script>"']
+
+
+def test_html_stdout_inlines_contexts(tmp_path, run, capsys):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\nx = 1\n', 'b.py' : '# TODO: two\n' })
+	assert run('write.format=html', 'config.file_todo=null', 'write.html_chunk=1') == 0
+	page = capsys.readouterr().out
+	assert page.startswith('<!DOCTYPE html>') and page.rstrip().endswith('</html>')
+	assert re.findall(r'<script>itodoContext\(\d+, ', page) == ['<script>itodoContext(0, ', '<script>itodoContext(1, ']
+	assert load_contexts(page) == ['# TODO: one\nx = 1', '# TODO: two']
+	assert sorted(x.name for x in tmp_path.iterdir()) == ['a.py', 'b.py']
+
+
+def test_html_several_roots(tmp_path, run):
+	write_tree(str(tmp_path), { 'r1/a.py' : '# TODO: one\n', 'r2/b.py' : '# FIXME: two\n' })
+	assert run('write.format=html', 'config.searchDir=[r1,{path: r2, name: second}]') == 0
+	page = (tmp_path / 'todo-inline.html').read_text()
+	assert re.findall(r'<h1 id="h\d+"><a href="(.*?)"><code>(.*?)</code>', page) == [('r1', 'r1'), ('r2', 'second')]
+	assert load_contexts((tmp_path / 'todo-inline.context' / '0.js').read_text()) == ['# TODO: one', '# FIXME: two']
+
+
+def test_context_dir_only_excluded_for_html(tmp_path, run):
+	# a source directory which happens to be named like the context files of the output
+	write_tree(str(tmp_path), { 'todo-inline.context/a.py' : '# TODO: not generated\n' })
+	assert run() == 0
+	assert 'TODO: not generated' in (tmp_path / 'todo-inline.md').read_text()
+	assert run('write.format=html') == 0
+	assert 'TODO: not generated' not in (tmp_path / 'todo-inline.html').read_text()
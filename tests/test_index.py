@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from inline_todo.inline_todo import CONFIG_DEFAULT, ReadSettings, TodoIndex
+
+from conftest import write_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+	write_tree(str(tmp_path), {
+		'src/net/a.py' : '# TODO: a\n# FIXME: b\n',
+		'src/c.py' : '# FIXME: c\n',
+		'lib/d.py' : '# TODO: d\n',
+	})
+
+
+def open_index(tmp_path):
+	return TodoIndex(str(tmp_path / 'index.sqlite'), ReadSettings.from_dict(CONFIG_DEFAULT['read']), str(tmp_path))
+
+
+def test_refresh_counts(tmp_path, tree):
+	files = [ str(tmp_path / x) for x in ('src/net/a.py', 'src/c.py', 'lib/d.py') ]
+	index = open_index(tmp_path)
+	assert index.refresh(files) == { 'scanned' : 3, 'unchanged' : 0, 'removed' : 0 }
+	assert index.refresh(files) == { 'scanned' : 0, 'unchanged' : 3, 'removed' : 0 }
+
+	# touched but not changed, edited, and removed
+	st = os.stat(files[0])
+	os.utime(files[0], ns = (st.st_atime_ns, st.st_mtime_ns + 10**9))
+	write_tree(str(tmp_path), { 'src/c.py' : '# FIXME: c, edited\n' })
+	assert index.refresh(files[:2]) == { 'scanned' : 1, 'unchanged' : 1, 'removed' : 1 }
+	assert [ x.content for x in index.query_items() ] == ['FIXME: c, edited', 'TODO: a', 'FIXME: b']
+
+	# an incomplete list of files doesnt remove the others
+	assert index.refresh(files[:1], complete = False)['removed'] == 0
+	assert len(list(index.query_items())) == 3
+	index.close()
+
+
+def test_edit_during_scan(tmp_path, tree):
+	"""items stored with the stat from before the scan are rescanned if the file was edited after that"""
+	file = str(tmp_path / 'lib/d.py')
+	index = open_index(tmp_path)
+	st = os.stat(file)
+	# edited while it was being scanned, keeping the size
+	write_tree(str(tmp_path), { 'lib/d.py' : '# TODO: e\n' })
+	os.utime(file, ns = (st.st_atime_ns, st.st_mtime_ns + 10**9))
+	with index.conn:
+		index.store(file, [], st)
+
+	assert index.refresh([file])['scanned'] == 1
+	assert [ x.content for x in index.query_items() ] == ['TODO: e']
+	index.close()
+
+
+def query_out(run, capsys, *args):
+	assert run('query', 'index.path=index.sqlite', *args) == 0
+	return capsys.readouterr().out.splitlines()
+
+
+def test_query_filters(run, tree, capsys):
+	assert query_out(run, capsys, '--tag', 'FIXME') == [
+		'./src/c.py:1\tFIXME\tFIXME: c',
+		'./src/net/a.py:2\tFIXME\tFIXME: b',
+	]
+	assert query_out(run, capsys, '--under', 'src/net') == [
+		'./src/net/a.py:1\tTODO\tTODO: a',
+		'./src/net/a.py:2\tFIXME\tFIXME: b',
+	]
+	assert query_out(run, capsys, '--tag', 'TODO', '--tag', 'FIXME', '--under', 'lib', '--no-refresh') == [
+		'./lib/d.py:1\tTODO\tTODO: d',
+	]
+
+
+def test_query_count_by(run, tree, capsys):
+	assert [ json.loads(x) for x in query_out(run, capsys, '--count-by', 'tag,topdir', '--format', 'jsonl') ] == [
+		{ 'tag' : 'FIXME', 'topdir' : 'src', 'count' : 2 },
+		{ 'tag' : 'TODO', 'topdir' : 'lib', 'count' : 1 },
+		{ 'tag' : 'TODO', 'topdir' : 'src', 'count' : 1 },
+	]
+
+
+def test_query_changed_since_without_git(tmp_path, run, tree, capsys, monkeypatch):
+	# not in a repo, even if the tests are run from inside one
+	monkeypatch.setenv('GIT_CEILING_DIRECTORIES', str(tmp_path.parent))
+	assert run('query', 'index.path=index.sqlite', '--changed-since', 'HEAD') == 1
+	captured = capsys.readouterr()
+	assert captured.out == ''
+	assert len(captured.err.strip().splitlines()) == 1
+	assert captured.err.startswith('# query --changed-since HEAD: git failed:')
@@ -0,0 +1,21 @@
+import json
+
+from conftest import write_tree
+
+
+def test_jsonl_does_not_overwrite_markdown(tmp_path, run):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\nx = 1\n# FIXME: two\n' })
+	assert run() == 0
+	markdown = (tmp_path / 'todo-inline.md').read_text()
+
+	assert run('write.format=jsonl') == 0
+	assert (tmp_path / 'todo-inline.md').read_text() == markdown
+	records = [ json.loads(line) for line in (tmp_path / 'todo-inline.jsonl').read_text().splitlines() ]
+	assert [ (r['tag'], r['lineNum'], r['content']) for r in records ] == [('TODO', 1, 'TODO: one'), ('FIXME', 3, 'FIXME: two')]
+
+
+def test_jsonl_stdout(tmp_path, run, capsys):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\n' })
+	assert run('write.format=jsonl', 'config.file_todo=null') == 0
+	assert [ json.loads(line)['content'] for line in capsys.readouterr().out.splitlines() ] == ['TODO: one']
+	assert sorted(x.name for x in tmp_path.iterdir()) == ['a.py']
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from inline_todo.inline_todo import iter_prefetch
+
+from conftest import write_tree, read_body
+
+
+class DelayedReader(object):
+	"""reader which sleeps before returning the file name as bytes, longer for earlier files, and fails for names starting with `bad`"""
+
+	def __init__(self, delay = 0.01):
+		self.delay = delay
+		self.lock = threading.Lock()
+		self.started = list()
+		self.active = 0
+		self.active_max = 0
+
+	def __call__(self, file):
+		with self.lock:
+			self.started.append(file)
+			self.active += 1
+			self.active_max = max(self.active_max, self.active)
+		try:
+			time.sleep(self.delay / (1 + len(self.started)))
+			if file.startswith('bad'):
+				raise OSError(f'cannot read {file}')
+			return file.encode()
+		finally:
+			with self.lock:
+				self.active -= 1
+
+
+def test_order_kept():
+	files = [ f'f{i}' for i in range(50) ]
+	reader = DelayedReader()
+	assert list(iter_prefetch(files, threads = 4, depth = 8, reader = reader)) == [ (f, f.encode()) for f in files ]
+	assert reader.active_max <= 4
+
+
+def test_error_raised_in_turn():
+	reader = DelayedReader()
+	gen = iter_prefetch(['f0', 'f1', 'bad2', 'f3'], threads = 2, depth = 4, reader = reader)
+	assert next(gen) == ('f0', b'f0')
+	assert next(gen) == ('f1', b'f1')
+	with pytest.raises(OSError, match = 'cannot read bad2'):
+		next(gen)
+
+
+def test_close_early_does_not_wait():
+	files = [ f'f{i}' for i in range(1000) ]
+	reader = DelayedReader(delay = 0.05)
+	gen = iter_prefetch(files, threads = 2, depth = 16, reader = reader)
+	assert next(gen) == ('f0', b'f0')
+	t0 = time.perf_counter()
+	gen.close()
+	assert time.perf_counter() - t0 < 0.5
+	# reads are only queued up to `depth` ahead, and the rest are never started
+	time.sleep(0.2)
+	assert len(reader.started) <= 16 + 1
+
+
+def test_scan_same_with_prefetch(tmp_path, run):
+	write_tree(str(tmp_path), { f'd{i % 3}/f{i}.py' : f'# TODO: item {i}\nx = {i}\n' for i in range(40) })
+	assert run() == 0
+	expected = read_body(tmp_path / 'todo-inline.md')
+	assert run('read.prefetch.threads=4', 'read.prefetch.depth=5', 'config.jobs=1') == 0
+	assert read_body(tmp_path / 'todo-inline.md') == expected
@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import write_tree
+
+
+@pytest.fixture
+def two_roots(tmp_path):
+	write_tree(str(tmp_path), {
+		'r1/a.py' : '# TODO: in r1\n',
+		'r2/b.py' : '# FIXME: in r2\n',
+	})
+
+
+def test_report_has_all_roots(tmp_path, run, two_roots):
+	assert run('config.searchDir=[r1,r2]') == 0
+	report = (tmp_path / 'todo-inline.md').read_text()
+	assert 'TODO: in r1' in report and 'FIXME: in r2' in report
+
+
+@pytest.mark.parametrize('command', ['watch', 'query'])
+def test_single_root_commands_reject_several(tmp_path, run, two_roots, command):
+	with pytest.raises(ValueError, match = f'{command} only supports a single directory'):
+		run(command, 'config.searchDir=[r1,r2]')
+	assert not (tmp_path / 'todo-inline.md').exists()
+
+
+def test_query_single_root(tmp_path, run, two_roots, capsys):
+	assert run('query', 'config.searchDir=r2') == 0
+	assert capsys.readouterr().out.split('\t')[1:] == ['FIXME', 'FIXME: in r2\n']
@@ -0,0 +1,46 @@
+from inline_todo.inline_todo import ScanCache
+
+from conftest import write_tree
+
+
+def big_file(n_bytes):
+	return '# TODO: in a big file\n' + ('x = 1\n' * (n_bytes // 6))
+
+
+def test_no_size_limit_by_default(tmp_path, run):
+	write_tree(str(tmp_path), { 'big.py' : big_file(3 * 2**20) })
+	assert run() == 0
+	assert 'TODO: in a big file' in (tmp_path / 'todo-inline.md').read_text()
+
+
+def test_size_limit_reported(tmp_path, run, capsys):
+	write_tree(str(tmp_path), { 'big.py' : big_file(2**16), 'small.py' : '# TODO: small\n' })
+	for engine in ('lines', 'mmap'):
+		assert run('read.max_file_size=1000', f'read.engine={engine}') == 0
+		report = (tmp_path / 'todo-inline.md').read_text()
+		assert 'TODO: small' in report and 'big file' not in report
+		assert '1 files skipped' in capsys.readouterr().err
+
+
+def test_binary_and_invalid_utf8(tmp_path, run):
+	write_tree(str(tmp_path), { 'ok.py' : '# TODO: ok\n' })
+	(tmp_path / 'bin.c').write_bytes(b'// TODO: binary\n\0\0\0')
+	(tmp_path / 'latin1.py').write_bytes(b'# TODO: caf\xe9\n')
+	assert run() == 0
+	report = (tmp_path / 'todo-inline.md').read_text()
+	assert 'TODO: ok' in report and 'binary' not in report.split('\n---\n', 1)[1]
+	assert 'TODO: caf�' in report
+
+
+def test_oversize_files_not_hashed(tmp_path):
+	write_tree(str(tmp_path), { 'big.py' : big_file(2**16) })
+	path = str(tmp_path / 'big.py')
+	assert ScanCache.hash_file(path, max_size = 1000) is None
+	assert ScanCache.hash_file(path, max_size = None) == ScanCache.hash_file(path, max_size = 2**20)
+
+
+def test_index_with_size_limit(tmp_path, run, capsys):
+	write_tree(str(tmp_path), { 'big.py' : big_file(2**16), 'small.py' : '# TODO: small\n' })
+	for _ in range(2):
+		assert run('query', 'read.max_file_size=1000', 'read.tags.list=[TODO]') == 0
+		assert capsys.readouterr().out.strip().split('\t') == ['./small.py:1', 'TODO', 'TODO: small']
@@ -0,0 +1,145 @@
+import json
+from io import StringIO
+
+from inline_todo.inline_todo import (
+	TodoItem, sort_items, group_sorted_items, split_by_attribute, recursive_sortattr,
+	write_items_stream, write_items_ms_template,
+)
+
+from conftest import write_tree
+
+
+def make_items(spec):
+	"""items from `(tag, file, lineNum)` tuples, with the content naming all three"""
+	return [
+		TodoItem(tag = tag, file = file, lineNum = lineNum, content = f'{tag} {file} {lineNum}')
+		for tag,file,lineNum in spec
+	]
+
+
+def grouping_old(td_items, attr_sort_order, lvl = 0):
+	"""how `recursive_sortattr()` grouped items before `sort_items()`: `split_by_attribute()` at every level, in order of first appearance, and the last level sorted by `str()` of the item"""
+	if lvl >= len(attr_sort_order) - 1:
+		return [ x.content for x in sorted(td_items, key = str) ]
+	return [
+		(val, grouping_old(lst_items, attr_sort_order, lvl + 1))
+		for val,lst_items in split_by_attribute(td_items, attr_sort_order[lvl], sortKey = str).items()
+	]
+
+
+def grouping_new(td_items, attr_sort_order, tag_order = None, lvl = 0):
+	if lvl == 0:
+		td_items = sort_items(td_items, attr_sort_order, tag_order)
+	if lvl >= len(attr_sort_order) - 1:
+		return [ x.content for x in td_items ]
+	return [
+		(val, grouping_new(lst_items, attr_sort_order, tag_order, lvl + 1))
+		for val,lst_items in group_sorted_items(td_items, attr_sort_order[lvl])
+	]
+
+
+def leaves(tree):
+	"""items of `recursive_sortattr()` output, in order"""
+	for node in tree:
+		if 'item' in node:
+			yield node['item']
+		else:
+			yield from leaves(next(v for k,v in node.items() if k.startswith('ul')))
+
+
+# tags in each file are in the same order in the config and alphabetically, and line numbers have a single digit -- where the old and new orderings agree
+ITEMS_DISCOVERY = [
+	('CRIT', './a.py', 2),
+	('TODO', './a.py', 1),
+	('TODO', './a.py', 5),
+	('CRIT', './b/c.py', 7),
+	('TODO', './b/c.py', 4),
+	('NOTE', './d.c', 9),
+]
+
+
+def test_same_grouping_as_before():
+	# items come in discovery order: files sorted, then by line
+	for attr_sort_order in (['file', 'tag', 'lineNum'], ['file', 'tag']):
+		td_items = make_items(sorted(ITEMS_DISCOVERY, key = lambda x: (x[1], x[2])))
+		assert grouping_new(td_items, attr_sort_order) == grouping_old(td_items, attr_sort_order)
+
+
+def test_recursive_sortattr_matches_grouping():
+	td_items = make_items(ITEMS_DISCOVERY)
+	for attr_sort_order in (['file', 'tag', 'lineNum'], ['tag', 'file', 'lineNum'], ['tag', 'lineNum']):
+		tree = grouping_new(td_items, attr_sort_order)
+		expected = list()
+		def flatten(node):
+			if isinstance(node, str):
+				expected.append(node)
+			elif isinstance(node, tuple):
+				flatten(node[1])
+			else:
+				for x in node:
+					flatten(x)
+		flatten(tree)
+		got = list(leaves(recursive_sortattr(td_items, attr_sort_order)))
+		assert [ x.split('\n')[0].strip() for x in got ] == [ f'- [ ] {x}' for x in expected ]
+
+
+def test_tags_follow_config_order():
+	td_items = make_items([('NOTE', './a.py', 1), ('TODO', './a.py', 2), ('CRIT', './a.py', 3)])
+	assert [ val for val,_ in grouping_new(td_items, ['tag', 'lineNum']) ] == ['CRIT', 'TODO', 'NOTE']
+	# a custom order, with unknown tags last and sorted alphabetically
+	td_items = make_items([('ZZZ', './a.py', 1), ('NOTE', './a.py', 2), ('AAA', './a.py', 3), ('TODO', './a.py', 4)])
+	assert [ val for val,_ in grouping_new(td_items, ['tag', 'lineNum'], tag_order = ['NOTE', 'TODO']) ] == ['NOTE', 'TODO', 'AAA', 'ZZZ']
+
+
+def test_line_numbers_sort_numerically():
+	td_items = make_items([('TODO', './a.py', 10), ('TODO', './a.py', 9), ('TODO', './a.py', 100)])
+	assert grouping_new(td_items, ['file', 'lineNum']) == [('./a.py', ['TODO ./a.py 9', 'TODO ./a.py 10', 'TODO ./a.py 100'])]
+
+
+def test_line_numbers_sort_before_tags():
+	# used to be sorted by `str()` of the item, which starts with the tag
+	td_items = make_items([('TODO', './a.py', 1), ('CRIT', './a.py', 2)])
+	assert grouping_new(td_items, ['file', 'lineNum']) == [('./a.py', ['TODO ./a.py 1', 'CRIT ./a.py 2'])]
+
+
+def test_ties_keep_input_order():
+	td_items = make_items([('TODO', './b.py', 1), ('TODO', './a.py', 1)])
+	assert [ x.file for x in sort_items(td_items, ['tag']) ] == ['./b.py', './a.py']
+
+
+def test_each_value_is_one_group():
+	td_items = make_items([('TODO', './a.py', 1), ('NOTE', './b.py', 1), ('TODO', './c.py', 1)])
+	assert grouping_new(td_items, ['tag', 'file']) == [
+		('TODO', ['TODO ./a.py 1', 'TODO ./c.py 1']),
+		('NOTE', ['NOTE ./b.py 1']),
+	]
+
+
+def test_renderers_agree():
+	td_items = make_items(ITEMS_DISCOVERY + [('FIXME', './a.py', 10), ('ZZZ', './d.c', 3)])
+	for attr_sort_order in (['file', 'tag', 'lineNum'], ['tag', 'file', 'lineNum'], ['tag', 'lineNum'], ['lineNum']):
+		fout = StringIO()
+		write_items_stream(td_items, fout, attr_sort_order = attr_sort_order)
+		assert fout.getvalue().strip() == write_items_ms_template(td_items, attr_sort_order = attr_sort_order).strip()
+
+
+def test_presorted_renders_the_same():
+	td_items = make_items(ITEMS_DISCOVERY + [('FIXME', './a.py', 10), ('ZZZ', './d.c', 3)])
+	for attr_sort_order in (['file', 'tag', 'lineNum'], ['tag', 'file', 'lineNum']):
+		td_sorted = sort_items(td_items, attr_sort_order)
+		fout, fout_presorted = StringIO(), StringIO()
+		write_items_stream(td_items, fout, attr_sort_order = attr_sort_order)
+		write_items_stream(td_sorted, fout_presorted, attr_sort_order = attr_sort_order, presorted = True)
+		assert fout_presorted.getvalue() == fout.getvalue()
+		assert (
+			write_items_ms_template(td_sorted, attr_sort_order = attr_sort_order, presorted = True)
+			== write_items_ms_template(td_items, attr_sort_order = attr_sort_order)
+		)
+
+
+def test_profile_has_sort_stage(tmp_path, run):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\n', 'b.py' : '# FIXME: two\n' })
+	assert run('--profile') == 0
+	with open(tmp_path / 'todo-inline.profile.json', 'r', encoding = 'utf-8') as f:
+		stages = list(json.load(f)['stages'])
+	assert stages.index('scan') < stages.index('sort') < stages.index('write')
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from conftest import write_tree, read_body
+
+SOURCES = {
+	'src/a.py' : '# TODO: a one\nx = 1\n# FIXME: a two\n',
+	'src/b.py' : '# TODO: b one\n',
+	'lib/c.py' : '# NOTE: c one\n',
+}
+
+
+def split_files(tmp_path):
+	return sorted(x.name for x in tmp_path.iterdir() if x.name.startswith('todo-inline.') and x.name != 'todo-inline.md')
+
+
+def items(text):
+	return sorted(re.findall(r'^ - \[ \] (.*?) $', text, re.M))
+
+
+def test_split_by_file(tmp_path, run):
+	write_tree(str(tmp_path), SOURCES)
+	assert run() == 0
+	items_all = items((tmp_path / 'todo-inline.md').read_text())
+
+	assert run('write.split=true') == 0
+	assert split_files(tmp_path) == ['todo-inline.lib_c.py.md', 'todo-inline.src_a.py.md', 'todo-inline.src_b.py.md']
+	index = read_body(tmp_path / 'todo-inline.md')
+	assert ' - [`./src/a.py`](todo-inline.src_a.py.md) -- 2 items' in index
+	assert sorted(x for name in split_files(tmp_path) for x in items((tmp_path / name).read_text())) == items_all
+
+
+def test_split_regroup_removes_old_files(tmp_path, run):
+	write_tree(str(tmp_path), SOURCES)
+	assert run('write.split=true') == 0
+	assert run('write.split=true', 'write.attr_sort_order=[tag,file,lineNum]') == 0
+	assert split_files(tmp_path) == ['todo-inline.FIXME.md', 'todo-inline.NOTE.md', 'todo-inline.TODO.md']
+
+	# files which are not ours are left alone
+	(tmp_path / 'todo-inline.mine.md').write_text('keep me')
+	(tmp_path / 'lib/c.py').unlink()
+	assert run('write.split=true', 'write.attr_sort_order=[tag,file,lineNum]') == 0
+	assert split_files(tmp_path) == ['todo-inline.FIXME.md', 'todo-inline.TODO.md', 'todo-inline.mine.md']
+
+
+def test_split_unchanged_and_parallel(tmp_path, run):
+	write_tree(str(tmp_path), SOURCES)
+	assert run('write.split=true', 'config.jobs=2') == 0
+	contents = { name : (tmp_path / name).read_text() for name in split_files(tmp_path) }
+	assert run('write.split=true', 'config.jobs=1', '--exit-code') == 3
+	assert { name : (tmp_path / name).read_text() for name in split_files(tmp_path) } == contents
+
+
+def test_split_errors(tmp_path, run):
+	write_tree(str(tmp_path), SOURCES)
+	with pytest.raises(ValueError, match = 'stdout'):
+		run('write.split=true', 'config.file_todo=null')
+	with pytest.raises(ValueError, match = 'at least two'):
+		run('write.split=true', 'write.attr_sort_order=[tag]')
+	with pytest.raises(ValueError, match = 'only supports write.format: markdown'):
+		run('write.split=true', 'write.format=html')
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# must only be imported by the code paths which need them. the time budget is checked by `benchmarks/bench_startup.py`
+LAZY_MODULES = ['omegaconf', 'yaml', 'chevron', 'concurrent.futures', 'ctypes', 'hashlib', 'sqlite3', 'subprocess']
+
+
+def imported_modules(code):
+	"""names of all modules imported by running `code` in a fresh interpreter, from `-X importtime`"""
+	proc = subprocess.run(
+		[sys.executable, '-X', 'importtime', '-c', code],
+		cwd = ROOT,
+		env = { **os.environ, 'PYTHONPATH' : ROOT },
+		capture_output = True,
+		text = True,
+		check = True,
+	)
+	return set(
+		line.rsplit('|', 1)[1].strip()
+		for line in proc.stderr.splitlines()
+		if line.startswith('import time:') and line.count('|') == 2
+	)
+
+
+@pytest.mark.parametrize('code', [
+	'import inline_todo.inline_todo',
+	"from inline_todo.inline_todo import main; main(['inline_todo', '--help'])",
+])
+def test_lazy_imports(code):
+	modules = imported_modules(code)
+	assert 'inline_todo.inline_todo' in modules
+	assert [ m for m in LAZY_MODULES if m in modules ] == []
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from inline_todo.inline_todo import EXIT_UNCHANGED
+
+from conftest import write_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+	write_tree(str(tmp_path), { 'a.py' : '# TODO: one\nx = 1\n', 'b.py' : '# FIXME: two\n' })
+
+
+@pytest.mark.parametrize('fmt,output', [('markdown', 'todo-inline.md'), ('html', 'todo-inline.html')])
+def test_exit_code_when_unchanged(tmp_path, run, tree, fmt, output):
+	path = tmp_path / output
+	assert run(f'write.format={fmt}') == 0
+	mtime = os.stat(path).st_mtime_ns
+	contents = path.read_text()
+
+	# options which only change how the output is made dont count as changes
+	assert run(f'write.format={fmt}', '--exit-code') == EXIT_UNCHANGED
+	assert run(f'write.format={fmt}', '--exit-code', 'config.jobs=1', 'config.profile=true') == EXIT_UNCHANGED
+	assert os.stat(path).st_mtime_ns == mtime
+	assert path.read_text() == contents
+
+	# but changed items, or options which change the content, do
+	write_tree(str(tmp_path), { 'b.py' : '# FIXME: two, edited\n' })
+	assert run(f'write.format={fmt}', '--exit-code') == 0
+	assert 'two, edited' in path.read_text()
+	assert run(f'write.format={fmt}', '--exit-code', 'write.item_format=md') == 0
+	assert run(f'write.format={fmt}', '--exit-code', 'write.item_format=md') == EXIT_UNCHANGED
+
+
+def test_skip_unchanged_disabled(tmp_path, run, tree):
+	assert run() == 0
+	assert run('--exit-code', 'write.skip_unchanged=false') == 0
+
+
+def test_timestamp_not_hashed(tmp_path, run, tree, monkeypatch):
+	assert run() == 0
+	monkeypatch.setenv('SOURCE_DATE_EPOCH', '1000000000')
+	assert run('--exit-code') == EXIT_UNCHANGED
+	assert '1970-01-01' in (tmp_path / 'todo-inline.md').read_text()